@@ -0,0 +1 @@
+"""Benchmarks for upils, run with python -m benchmarks.<module>"""
@@ -0,0 +1,157 @@
+"""Module to generate a seeded corpus of realistic Slate documents."""
+
+import json
+import random
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+WORDS = (
+    "platform benchmark meluncurkan laporan baru soal daftar handphone android "
+    "dengan performa terkencang di dunia untuk periode februari smartphone dapur "
+    "pacu menjadi juaranya pengukuran berdasarkan beberapa aspek komponen seperti "
+    "memori penyimpanan hingga skor yang ditampilkan merupakan hasil sejumlah "
+    "pengujian perangkat via aplikasi minimal kali dalam sebulan prosesor buatan "
+    "bersaing ketat tercepat selama berikut lengkapnya peringkat pertama ditempati"
+).split()
+SENTENCE_ENDINGS = (".", ".", ".", "!", "?", "")
+MARK_TYPES = ("bold", "italic", "underline")
+
+
+@dataclass(frozen=True)
+class CorpusProfile:
+    """Shape of the documents generated for a corpus."""
+
+    name: str
+    min_blocks: int = 5
+    max_blocks: int = 30
+    # Maximum nesting of lists inside list items
+    max_list_depth: int = 1
+    # Share of top-level blocks that are lists, figures and medium headings
+    list_ratio: float = 0.1
+    figure_ratio: float = 0.1
+    heading_ratio: float = 0.05
+    # Share of leaves with marks, and of text nodes followed by a link
+    marked_leaf_ratio: float = 0.1
+    link_ratio: float = 0.2
+
+
+PROFILES = {
+    profile.name: profile
+    for profile in [
+        CorpusProfile("short", min_blocks=3, max_blocks=10),
+        CorpusProfile("long", min_blocks=300, max_blocks=600),
+        CorpusProfile("nested", max_list_depth=6, list_ratio=0.4),
+        CorpusProfile("list-heavy", list_ratio=0.6, max_list_depth=2),
+        CorpusProfile("marked", marked_leaf_ratio=0.6, link_ratio=0.5),
+        CorpusProfile("figure-heavy", figure_ratio=0.6),
+    ]
+}
+
+
+def generate_corpus(profile: CorpusProfile, count: int, seed: int = 0) -> List[Dict]:
+    """Generates count Slate documents. The same seed always gives the same corpus."""
+    rng = random.Random(f"{profile.name}:{seed}")
+    return [generate_document(profile, rng) for _ in range(count)]
+
+
+def generate_document(profile: CorpusProfile, rng: random.Random) -> Dict:
+    """Generates a Slate document dictionary, starting with a large heading."""
+    nodes = [_block("heading-large", [_text_node(rng, profile, words=8)])]
+    for _ in range(rng.randint(profile.min_blocks, profile.max_blocks)):
+        choice = rng.random()
+        if choice < profile.list_ratio:
+            nodes.append(_list(rng, profile, depth=1))
+        elif choice < profile.list_ratio + profile.figure_ratio:
+            nodes.append(_figure(rng, profile))
+        elif choice < profile.list_ratio + profile.figure_ratio + profile.heading_ratio:
+            nodes.append(_block("heading-medium", [_text_node(rng, profile, words=5)]))
+        else:
+            nodes.append(_paragraph(rng, profile))
+    return {"object": "value", "document": {"object": "document", "nodes": nodes}}
+
+
+def to_json(document: Dict) -> str:
+    """Serializes a document the way Slate documents are usually stored."""
+    return json.dumps(document, ensure_ascii=False, separators=(",", ":"))
+
+
+def _block(node_type: str, nodes: List[Dict], data: Optional[Dict] = None) -> Dict:
+    return {"object": "block", "type": node_type, "data": data or {}, "nodes": nodes}
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(max(1, words)))
+    return text[0].upper() + text[1:] + rng.choice(SENTENCE_ENDINGS)
+
+
+def _leaf(rng: random.Random, profile: CorpusProfile, text: str) -> Dict:
+    marks = []
+    if rng.random() < profile.marked_leaf_ratio:
+        marks = [
+            {"object": "mark", "type": mark_type, "data": {}}
+            for mark_type in rng.sample(MARK_TYPES, rng.randint(1, len(MARK_TYPES)))
+        ]
+    return {"object": "leaf", "text": text, "marks": marks}
+
+
+def _text_node(rng: random.Random, profile: CorpusProfile, words: int) -> Dict:
+    leaves = []
+    for _ in range(rng.randint(1, 3)):
+        text = _sentence(rng, rng.randint(1, words))
+        leaves.append(_leaf(rng, profile, text + rng.choice(("", " "))))
+    return {"object": "text", "leaves": leaves}
+
+
+def _paragraph(rng: random.Random, profile: CorpusProfile) -> Dict:
+    nodes = [_text_node(rng, profile, words=25)]
+    for _ in range(rng.randint(0, 3)):
+        if rng.random() < profile.link_ratio:
+            link = {
+                "object": "inline",
+                "type": "link",
+                "data": {"href": f"https://kumparan.com/topic/{rng.choice(WORDS)}"},
+                "nodes": [_text_node(rng, profile, words=2)],
+            }
+            nodes.extend([link, _text_node(rng, profile, words=25)])
+    return _block("paragraph", nodes)
+
+
+def _list(rng: random.Random, profile: CorpusProfile, depth: int) -> Dict:
+    items = []
+    for _ in range(rng.randint(2, 8)):
+        item_nodes = [_block("paragraph", [_text_node(rng, profile, words=6)])]
+        if depth < profile.max_list_depth and rng.random() < 0.3:
+            item_nodes.append(_list(rng, profile, depth + 1))
+        items.append(_block("list-item", item_nodes))
+    return _block(rng.choice(("bulleted-list", "numbered-list")), items)
+
+
+def _figure(rng: random.Random, profile: CorpusProfile) -> Dict:
+    public_id = "".join(
+        rng.choice("0123456789abcdefghjkmnpqrstvwxyz") for _ in range(26)
+    )
+    image = {
+        "id": str(rng.getrandbits(60)),
+        "title": "Untitled Image",
+        "description": "",
+        "publicID": public_id,
+        "externalURL": f"https://blue.kumparan.com/image/upload/{public_id}.jpg",
+        "awsS3Key": f"2025/Mar/image/{public_id}/",
+        "height": rng.randint(300, 1200),
+        "width": rng.randint(300, 1600),
+        "locationName": None,
+        "mediaType": "IMAGE",
+        "internalTags": [rng.choice(WORDS) for _ in range(rng.randint(0, 20))],
+        "__typename": "Media",
+    }
+    return _block(
+        "figure",
+        [
+            _block(
+                "image",
+                [{"object": "text", "leaves": [_leaf(rng, profile, "")]}],
+                data={"image": image},
+            ),
+            _block("caption", [_text_node(rng, profile, words=10)]),
+        ],
+    )
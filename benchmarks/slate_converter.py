@@ -0,0 +1,229 @@
+"""
+Benchmarks for upils.slate_converter.
+
+Run with python -m benchmarks.slate_converter, or make bench. Every run is
+compared against the stored baseline, which --save-baseline replaces.
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.corpus import PROFILES, generate_corpus, to_json
+from upils.slate_converter import (
+    NEWLINE,
+    NODE_TYPE_BULLETED_LIST,
+    NODE_TYPE_NUMBERED_LIST,
+    SPACE_SEPARATOR,
+    SlateDocument,
+    clean_up_list,
+    serialize_slate_leaves,
+    serialize_slate_nodes,
+)
+
+BASELINE_PATH = Path(__file__).with_name("slate_converter_baseline.json")
+MEGABYTE = 1024 * 1024
+
+
+@dataclass
+class BenchmarkResult:
+    """Throughput and memory of one operation over one corpus."""
+
+    profile: str
+    operation: str
+    documents_per_second: float
+    megabytes_per_second: float
+    peak_memory: int
+
+
+def prepare_operations(
+    documents: List[Dict],
+) -> Dict[str, Tuple[Callable[[Any], Any], List[Any], int]]:
+    """
+    Returns, for every benchmarked operation, the function to call, the inputs
+    it is called with over the whole corpus, and the size of those inputs in bytes.
+    """
+    document_jsons = [to_json(document) for document in documents]
+    parsed = [SlateDocument.from_dict(document) for document in documents]
+    leaves_lists, list_texts = _collect_leaves_and_list_texts(parsed)
+    json_bytes = sum(len(document_json.encode()) for document_json in document_jsons)
+
+    return {
+        "parse": (SlateDocument.parse, document_jsons, json_bytes),
+        "from_dict": (SlateDocument.from_dict, documents, json_bytes),
+        "to_plain_text": (SlateDocument.to_plain_text, parsed, json_bytes),
+        "serialize_slate_leaves": (
+            lambda leaves: serialize_slate_leaves(leaves, SPACE_SEPARATOR),
+            leaves_lists,
+            sum(len(leaf.text.encode()) for leaves in leaves_lists for leaf in leaves),
+        ),
+        "clean_up_list": (
+            clean_up_list,
+            list_texts,
+            sum(len(text.encode()) for text in list_texts),
+        ),
+    }
+
+
+def run_operation(
+    function: Callable[[Any], Any], inputs: List[Any], repeat: int
+) -> Tuple[float, int]:
+    """
+    Returns the best time of calling function on every input, and its peak memory.
+    Like timeit, garbage collection is disabled while timing, as the corpus
+    kept alive would otherwise make every collection expensive.
+    """
+    best = float("inf")
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for item in inputs:
+                function(item)
+            best = min(best, time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        for item in inputs:
+            function(item)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run_benchmarks(
+    profiles: List[str], count: int, seed: int = 0, repeat: int = 3
+) -> List[BenchmarkResult]:
+    """Runs every operation over a generated corpus of each profile."""
+    results = []
+    for profile_name in profiles:
+        documents = generate_corpus(PROFILES[profile_name], count, seed)
+        for operation, (function, inputs, size) in prepare_operations(
+            documents
+        ).items():
+            seconds, peak = run_operation(function, inputs, repeat)
+            seconds = max(seconds, 1e-9)
+            results.append(
+                BenchmarkResult(
+                    profile=profile_name,
+                    operation=operation,
+                    documents_per_second=count / seconds,
+                    megabytes_per_second=size / MEGABYTE / seconds,
+                    peak_memory=peak,
+                )
+            )
+    return results
+
+
+def compare_with_baseline(
+    results: List[BenchmarkResult], baseline: Dict, tolerance: float
+) -> List[str]:
+    """
+    Prints every result next to its baseline. Returns the results that are
+    slower, or use more memory, than the baseline by more than tolerance.
+    """
+    regressions = []
+    print(
+        f"{'profile':<14}{'operation':<24}{'docs/s':>12}{'MB/s':>10}"
+        f"{'peak KiB':>11}{'vs baseline':>13}"
+    )
+    for result in results:
+        base = baseline.get(result.profile, {}).get(result.operation)
+        comparison = ""
+        if base:
+            speed = result.documents_per_second / base["documents_per_second"]
+            memory = result.peak_memory / max(base["peak_memory"], 1)
+            comparison = f"{speed:.2f}x"
+            if speed < 1 - tolerance or memory > 1 + tolerance:
+                comparison += " REGRESSION"
+                regressions.append(f"{result.profile}/{result.operation}")
+        print(
+            f"{result.profile:<14}{result.operation:<24}"
+            f"{result.documents_per_second:>12.1f}{result.megabytes_per_second:>10.2f}"
+            f"{result.peak_memory / 1024:>11.1f}{comparison:>13}"
+        )
+    return regressions
+
+
+def load_baseline(path: Path) -> Dict:
+    """Returns the stored baseline, keyed by profile then operation."""
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_baseline(results: List[BenchmarkResult], path: Path) -> None:
+    """Stores results as the new baseline."""
+    baseline: Dict[str, Dict] = {}
+    for result in results:
+        values = asdict(result)
+        profile, operation = values.pop("profile"), values.pop("operation")
+        baseline.setdefault(profile, {})[operation] = values
+    path.write_text(json.dumps(baseline, indent=2) + "\n", encoding="utf-8")
+
+
+def _collect_leaves_and_list_texts(
+    documents: List[SlateDocument],
+) -> Tuple[List[List], List[str]]:
+    """Returns the leaves of every node, and the text of every list before clean up."""
+    leaves_lists, list_texts = [], []
+    stack = [node for document in documents for node in document.nodes]
+    while stack:
+        node = stack.pop()
+        if node.leaves:
+            leaves_lists.append(node.leaves)
+        if node.type in (NODE_TYPE_BULLETED_LIST, NODE_TYPE_NUMBERED_LIST):
+            list_texts.append(
+                serialize_slate_nodes(node.nodes, NEWLINE, SPACE_SEPARATOR)
+            )
+        stack.extend(node.nodes)
+    return leaves_lists, list_texts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Runs the benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--profiles", nargs="+", choices=sorted(PROFILES), default=sorted(PROFILES)
+    )
+    parser.add_argument("--count", type=int, default=100, help="documents per corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="allowed slowdown or memory growth against the baseline",
+    )
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.profiles, args.count, args.seed, args.repeat)
+    regressions = compare_with_baseline(
+        results, load_baseline(args.baseline), args.tolerance
+    )
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+    elif regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+        if args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
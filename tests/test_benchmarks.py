@@ -0,0 +1,49 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+
+from benchmarks import logging as logging_benchmarks
+from benchmarks.corpus import PROFILES, generate_corpus, to_json
+from benchmarks.slate_converter import compare_with_baseline, run_benchmarks
+from upils.slate_converter import SlateDocument
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_corpus_is_seeded(self):
+        for profile in PROFILES.values():
+            first = generate_corpus(profile, 3, seed=7)
+            self.assertEqual(first, generate_corpus(profile, 3, seed=7))
+            self.assertNotEqual(first, generate_corpus(profile, 3, seed=8))
+
+    def test_corpus_documents_convert(self):
+        for profile in PROFILES.values():
+            for document in generate_corpus(profile, 2):
+                self.assertTrue(SlateDocument.parse(to_json(document)).to_plain_text())
+
+    def test_run_benchmarks(self):
+        results = run_benchmarks(["short"], count=2, repeat=1)
+        self.assertEqual(
+            [result.operation for result in results],
+            [
+                "parse",
+                "from_dict",
+                "to_plain_text",
+                "serialize_slate_leaves",
+                "clean_up_list",
+            ],
+        )
+        baseline = {
+            "short": {"parse": {"documents_per_second": 1e12, "peak_memory": 1}}
+        }
+        with redirect_stdout(io.StringIO()):
+            regressions = compare_with_baseline(results, baseline, tolerance=0.2)
+        self.assertEqual(regressions, ["short/parse"])
+
+    def test_run_logging_benchmarks(self):
+        results = logging_benchmarks.run_benchmarks(
+            list(logging_benchmarks.RECORD_SHAPES), count=2, repeat=1
+        )
+        self.assertEqual(list(results), list(logging_benchmarks.RECORD_SHAPES))
+        for result in results.values():
+            self.assertGreater(result["generic"], 0)
+            self.assertGreater(result["encoder"], 0)
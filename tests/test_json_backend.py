@@ -0,0 +1,188 @@
+import contextlib
+import datetime
+import enum
+import importlib.util
+import json
+import unittest
+import uuid
+from dataclasses import dataclass
+from unittest import mock
+
+from loguru import logger
+
+from tests.test_slate_converter import ANTUTU_DOCUMENT_JSON, MIXED_DOCUMENT_JSON
+from upils import json_backend
+from upils.logging import serialize
+from upils.slate_converter import SlateDocument
+
+HAS_ORJSON = importlib.util.find_spec("orjson") is not None
+
+
+class Color(enum.Enum):
+    RED = "red"
+
+
+class Size(enum.IntEnum):
+    SMALL = 1
+
+
+class Name(str):
+    def __str__(self):
+        return "name"
+
+
+@dataclass
+class Point:
+    x: int
+    y: int
+
+
+def nested(depth):
+    value = []
+    for _ in range(depth):
+        value = [value]
+    return value
+
+
+ENCODED_VALUES = [
+    None,
+    True,
+    0,
+    -(2**63),
+    2**64,
+    2**100,
+    0.0,
+    -0.0,
+    0.1,
+    1e-4,
+    1e-5,
+    123456.789,
+    1e15,
+    1e16,
+    1.5e300,
+    5e-324,
+    float("nan"),
+    float("inf"),
+    "",
+    "plain",
+    "é 😀   \x7f",
+    '\x00\x1f"\\/\n\t',
+    [1, "two", [3.5, None]],
+    (1, 2),
+    {"nested": {"list": [{"a": 1}], "empty": {}}},
+    {1: "int key"},
+    {None: "null key", True: "bool key"},
+    Color.RED,
+    Size.SMALL,
+    Name("value"),
+    uuid.UUID(int=5),
+    b"bytes",
+    Point(1, 2),
+    datetime.datetime(2023, 10, 4, 12, 3, 53, 43106, tzinfo=datetime.timezone.utc),
+    datetime.date(2023, 10, 4),
+    datetime.time(12, 3),
+    ValueError("failed"),
+    nested(300),
+    {"key": [i * 0.5 for i in range(json_backend.MAX_CHECKED_CONTAINERS + 5)]},
+    [{} for _ in range(json_backend.MAX_CHECKED_CONTAINERS + 5)],
+]
+
+DECODED_DOCUMENTS = [
+    ANTUTU_DOCUMENT_JSON,
+    ANTUTU_DOCUMENT_JSON.encode(),
+    memoryview(ANTUTU_DOCUMENT_JSON.encode()),
+    memoryview('{"utf-16": "é"}'.encode("utf-16")),
+    MIXED_DOCUMENT_JSON,
+    " [1, 2.5, -0, 1E2, 18446744073709551615] ",
+    '{"a": 1, "a": 2}',
+    '{"value": NaN, "other": -Infinity}',
+    '"\\u00e9\\ud83d\\ude00"',
+    '"\\ud800"',
+]
+
+INVALID_DOCUMENTS = ["", "{not json", "[1,]", b"\xff"]
+
+
+@unittest.skipUnless(HAS_ORJSON, "orjson is not installed")
+class JSONBackendParityCase(unittest.TestCase):
+    def setUp(self):
+        self.backends = [json_backend.StdlibJSONBackend(), json_backend.OrjsonBackend()]
+
+    def test_dumps_gives_same_text(self):
+        for value in ENCODED_VALUES:
+            texts = [backend.dumps(value) for backend in self.backends]
+            assert texts[0] == texts[1], value
+
+    def test_dumps_raises_same_errors(self):
+        circular = []
+        circular.append(circular)
+
+        for backend in self.backends:
+            with self.assertRaises(ValueError):
+                backend.dumps(circular)
+
+    def test_loads_gives_same_values(self):
+        for document in DECODED_DOCUMENTS:
+            values = [
+                json.dumps(backend.loads(document), sort_keys=True)
+                for backend in self.backends
+            ]
+            assert values[0] == values[1], document
+
+    def test_loads_raises_same_errors(self):
+        for document in INVALID_DOCUMENTS:
+            errors = []
+            for backend in self.backends:
+                with self.assertRaises(ValueError) as context:
+                    backend.loads(document)
+                errors.append((type(context.exception), str(context.exception)))
+            assert errors[0] == errors[1], document
+
+    def test_slate_plain_text_is_same(self):
+        for document in [ANTUTU_DOCUMENT_JSON, MIXED_DOCUMENT_JSON]:
+            texts = []
+            for backend in self.backends:
+                with mock.patch.object(json_backend, "loads", backend.loads):
+                    texts.append(SlateDocument.parse(document).to_plain_text())
+            assert texts[0] == texts[1]
+
+    def test_log_lines_are_same(self):
+        # Like configure_logger, keep records out of the default stderr handler
+        with contextlib.suppress(ValueError):
+            logger.remove(0)
+        records = []
+        handler_id = logger.add(records.append, format="{message}")
+        try:
+            logger.bind(user="ajung", size=Size.SMALL, ratio=1e-7).info("info é")
+            try:
+                raise ValueError("failed")
+            except ValueError:
+                logger.exception("with exception")
+        finally:
+            logger.remove(handler_id)
+
+        for message in records:
+            lines = []
+            for backend in self.backends:
+                with mock.patch.object(json_backend, "dumps", backend.dumps):
+                    lines.append(serialize(message.record))
+            assert lines[0] == lines[1]
+            assert json.loads(lines[0])["message"] == message.record["message"]
+
+
+class JSONBackendCase(unittest.TestCase):
+    def test_select_backend(self):
+        assert json_backend.select_backend("json").name == "json"
+        assert json_backend.select_backend().name == (
+            "orjson" if HAS_ORJSON else "json"
+        )
+        with self.assertRaises(ValueError):
+            json_backend.select_backend("simplejson")
+
+    def test_dumps_is_compact(self):
+        value = {"a": [1, 2], "b": "é", "c": datetime.date(2023, 10, 4)}
+        assert json_backend.dumps(value) == '{"a":[1,2],"b":"é","c":"2023-10-04"}'
+
+
+if __name__ == "__main__":
+    unittest.main()
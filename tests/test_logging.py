@@ -0,0 +1,828 @@
+import datetime
+import enum
+import io
+import json
+import os
+import signal
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from loguru import logger
+
+from upils import json_backend
+from upils import logging as upils_logging
+from upils import logging_sinks
+from upils.logging import (
+    DROPPED_BUFFER_FULL,
+    DROPPED_QUEUE_FULL,
+    DROPPED_RATE_LIMITED,
+    DROPPED_WRITE_FAILED,
+    LATENCY_BUCKETS,
+    OVERFLOW_BLOCK,
+    OVERFLOW_DROP_NEW,
+    OVERFLOW_DROP_OLDEST,
+    FileSink,
+    LogMetrics,
+    LogRateLimiter,
+    QueuedSink,
+    RateLimit,
+    RecordEncoder,
+    SocketSink,
+    configure_logger,
+    disable_log_metrics,
+    enable_log_metrics,
+    format_record,
+    log_metrics,
+    log_metrics_snapshot,
+    serialize,
+)
+
+
+class BlockingStream(io.StringIO):
+    """Stream whose writes wait until release is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def write(self, text):
+        self.entered.set()
+        self.release.wait()
+        return super().write(text)
+
+
+class FailingStream(io.StringIO):
+    def write(self, text):
+        raise OSError("broken pipe")
+
+
+class QueuedSinkCase(unittest.TestCase):
+    def tearDown(self):
+        logger.remove()
+
+    def test_configure_logger_with_queued_sink(self):
+        stream = io.StringIO()
+        sink = QueuedSink(stream)
+        log = configure_logger("INFO", sink=sink)
+        for index in range(100):
+            log.bind(index=index).info("queued")
+        log.debug("filtered")
+        assert sink.wait(timeout=5)
+
+        lines = [json.loads(line) for line in stream.getvalue().splitlines() if line]
+        assert [line["extra"]["index"] for line in lines] == list(range(100))
+        assert sink.dropped == sink.failed == 0
+
+    def test_stop_writes_queued_lines(self):
+        stream = BlockingStream()
+        sink = QueuedSink(stream)
+        sink.write("first\n")
+        assert stream.entered.wait(timeout=5)
+        sink.write("second\n")
+        sink.write("third\n")
+
+        stream.release.set()
+        sink.stop()
+        assert stream.getvalue() == "first\nsecond\nthird\n"
+
+        # The sink can be used again once stopped
+        sink.write("again\n")
+        sink.stop()
+        assert stream.getvalue().endswith("third\nagain\n")
+
+    @unittest.skipUnless(hasattr(os, "fork"), "fork is not available")
+    def test_forked_child_writes_its_own_lines(self):
+        stream = BlockingStream()
+        sink = QueuedSink(stream, max_size=2)
+        sink.write("0\n")
+        assert stream.entered.wait(timeout=5)
+        sink.write("1\n")
+        sink.write("2\n")
+
+        def child():
+            # The queue copied from the parent is full, with no writer thread
+            sink.stream = io.StringIO()
+            for line in ["3\n", "4\n", "5\n"]:
+                sink.write(line)
+            sink.stop()
+            assert sink.stream.getvalue() == "3\n4\n5\n"
+
+        assert run_in_child(child)
+        stream.release.set()
+        sink.stop()
+        assert stream.getvalue() == "0\n1\n2\n"
+
+    def test_overflow_drops_lines(self):
+        for overflow, kept in [
+            (OVERFLOW_DROP_NEW, "0\n1\n2\n"),
+            (OVERFLOW_DROP_OLDEST, "0\n3\n4\n"),
+        ]:
+            stream = BlockingStream()
+            sink = QueuedSink(stream, max_size=2, overflow=overflow)
+            sink.write("0\n")
+            assert stream.entered.wait(timeout=5)
+            for index in range(1, 5):
+                sink.write(f"{index}\n")
+
+            stream.release.set()
+            sink.stop()
+            assert stream.getvalue() == kept
+            assert sink.dropped == 2
+
+    def test_overflow_blocks(self):
+        stream = BlockingStream()
+        sink = QueuedSink(stream, max_size=1, overflow=OVERFLOW_BLOCK)
+        sink.write("0\n")
+        assert stream.entered.wait(timeout=5)
+        sink.write("1\n")
+
+        writer = threading.Thread(target=sink.write, args=("2\n",))
+        writer.start()
+        writer.join(timeout=0.1)
+        assert writer.is_alive()
+
+        stream.release.set()
+        writer.join(timeout=5)
+        sink.stop()
+        assert stream.getvalue() == "0\n1\n2\n"
+        assert sink.dropped == 0
+
+    def test_failed_writes_are_counted(self):
+        sink = QueuedSink(FailingStream())
+        sink.write("lost\n")
+        sink.stop()
+        assert sink.failed == 1
+
+    def test_invalid_options(self):
+        with self.assertRaises(ValueError):
+            QueuedSink(max_size=0)
+        with self.assertRaises(ValueError):
+            QueuedSink(overflow="drop-all")
+
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def run_in_child(function, timeout=10):
+    """Runs function in a forked child, and returns whether it succeeded."""
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            function()
+            code = 0
+        finally:
+            os._exit(code)
+    deadline = time.monotonic() + timeout
+    while True:
+        finished, status = os.waitpid(pid, os.WNOHANG)
+        if finished:
+            return os.waitstatus_to_exitcode(status) == 0
+        if time.monotonic() > deadline:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            return False
+        time.sleep(0.01)
+
+
+class FileSinkCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "app.log")
+
+    def tearDown(self):
+        logger.remove()
+
+    def read(self, path=None):
+        with open(path or self.path, encoding="utf-8") as file:
+            return file.read()
+
+    def test_configure_logger_with_file_sink(self):
+        sink = FileSink(self.path, flush_interval=60)
+        log = configure_logger("INFO", sink=sink)
+        for index in range(100):
+            log.bind(index=index).info("buffered")
+        assert not os.path.exists(self.path)
+
+        logger.remove()
+        lines = [json.loads(line) for line in self.read().splitlines() if line]
+        assert [line["extra"]["index"] for line in lines] == list(range(100))
+        assert sink.batches == 1
+
+    def write_batch(self, sink, line):
+        """Writes line, and waits until the writer thread wrote it."""
+        batches = sink.batches
+        sink.write(line)
+        assert wait_until(lambda: sink.batches > batches)
+
+    def test_flushes_by_bytes_and_interval(self):
+        sink = FileSink(self.path, flush_bytes=10, flush_interval=60)
+        sink.write("12345\n")
+        assert not os.path.exists(self.path)
+        sink.write("67890\n")
+        assert wait_until(lambda: sink.batches == 1)
+        assert self.read() == "12345\n67890\n"
+        sink.stop()
+
+        sink = FileSink(self.path, flush_interval=0.01)
+        sink.write("later\n")
+        assert wait_until(lambda: self.read().endswith("later\n"))
+        sink.stop()
+        assert sink.batches == 1
+
+    @unittest.skipUnless(hasattr(os, "fork"), "fork is not available")
+    def test_forked_child_writes_its_own_lines(self):
+        sink = FileSink(self.path, flush_interval=60)
+        sink.write("parent\n")
+
+        def child():
+            sink.write("child\n")
+            sink.stop()
+
+        assert run_in_child(child)
+        assert self.read() == "child\n"
+        sink.stop()
+        assert self.read() == "child\nparent\n"
+
+    def test_rotates_by_size(self):
+        sink = FileSink(self.path, max_bytes=10, backup_count=2, flush_bytes=1)
+        for line in ["a" * 5, "b" * 4, "c" * 5, "d" * 9, "e" * 20]:
+            self.write_batch(sink, line + "\n")
+        sink.stop()
+
+        assert self.read() == "e" * 20 + "\n"
+        assert self.read(self.path + ".1") == "d" * 9 + "\n"
+        assert self.read(self.path + ".2") == "c" * 5 + "\n"
+        assert not os.path.exists(self.path + ".3")
+
+    def test_rotates_by_time(self):
+        clock = FakeClock()
+        with mock.patch.object(logging_sinks, "monotonic", clock):
+            sink = FileSink(
+                self.path, rotate_interval=60, backup_count=0, flush_bytes=1
+            )
+            self.write_batch(sink, "first\n")
+            clock.now = 30
+            self.write_batch(sink, "second\n")
+            clock.now = 61
+            self.write_batch(sink, "third\n")
+            sink.stop()
+        assert self.read() == "third\n"
+        assert not os.path.exists(self.path + ".1")
+
+    def test_failed_batches_are_retried(self):
+        sink = FileSink(
+            os.path.join(self.path, "missing", "app.log"),
+            flush_bytes=1,
+            max_buffer_bytes=6,
+            retry_interval=0,
+        )
+        for line in ["1\n", "2\n", "3\n", "4\n"]:
+            sink.write(line)
+        sink.stop()
+        assert (sink.dropped, sink.batches) == (1, 0)
+
+        os.makedirs(os.path.join(self.path, "missing"))
+        sink.stop()
+        assert self.read(sink.path) == "2\n3\n4\n"
+        assert sink.batches == 1
+
+    def test_writes_do_not_wait_for_batches(self):
+        sink = FileSink(self.path, flush_bytes=1)
+        writing, release = threading.Event(), threading.Event()
+
+        def write_batch(data):
+            writing.set()
+            release.wait()
+
+        with mock.patch.object(sink, "_write_batch", write_batch):
+            sink.write("first\n")
+            assert writing.wait(timeout=5)
+            start = time.monotonic()
+            for _ in range(100):
+                sink.write("while writing\n")
+            assert time.monotonic() - start < 1
+            release.set()
+            sink.stop()
+        assert sink.batches == 2
+
+    def test_invalid_options(self):
+        for options in [
+            {"max_bytes": 0},
+            {"rotate_interval": 0},
+            {"backup_count": -1},
+            {"flush_bytes": 0},
+            {"flush_interval": 0},
+            {"flush_bytes": 10, "max_buffer_bytes": 5},
+        ]:
+            with self.assertRaises(ValueError):
+                FileSink(self.path, **options)
+
+
+class LineServer:
+    """Listener collecting everything sent to it, one connection at a time."""
+
+    def __init__(self, family, address):
+        self.listener = socket.socket(family, socket.SOCK_STREAM)
+        self.listener.bind(address)
+        self.listener.listen()
+        self.address = self.listener.getsockname()
+        self.connections = 0
+        self.received = bytearray()
+        self.connection = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                connection, _ = self.listener.accept()
+            except OSError:
+                return
+            self.connections += 1
+            self.connection = connection
+            with connection:
+                while True:
+                    data = connection.recv(65536)
+                    if not data:
+                        break
+                    self.received += data
+
+    def close(self):
+        # Closing alone does not wake the thread waiting in accept
+        self.listener.shutdown(socket.SHUT_RDWR)
+        self.listener.close()
+        if self.connection is not None:
+            try:
+                self.connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass  # Already closed by the client
+        self.thread.join(timeout=5)
+
+
+class SocketSinkCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.unix_path = os.path.join(directory.name, "log.sock")
+
+    def tearDown(self):
+        logger.remove()
+
+    def test_configure_logger_with_tcp_sink(self):
+        server = LineServer(socket.AF_INET, ("127.0.0.1", 0))
+        self.addCleanup(server.close)
+        sink = SocketSink(server.address, flush_bytes=1024)
+        log = configure_logger("INFO", sink=sink)
+        for index in range(100):
+            log.bind(index=index).info("sent")
+        logger.remove()
+
+        assert wait_until(lambda: server.received.count(b"\n") >= 200)
+        lines = [json.loads(line) for line in server.received.splitlines() if line]
+        assert [line["extra"]["index"] for line in lines] == list(range(100))
+        assert server.connections == 1
+        assert sink.batches < 100
+
+    def test_reconnects_to_unix_socket(self):
+        sink = SocketSink(
+            self.unix_path, flush_bytes=1, max_buffer_bytes=6, retry_interval=0
+        )
+        for line in ["1\n", "2\n", "3\n", "4\n"]:
+            sink.write(line)
+        sink.stop()
+        assert (sink.dropped, sink.batches) == (1, 0)
+
+        server = LineServer(socket.AF_UNIX, self.unix_path)
+        # The buffer is still full, and the new line drops the oldest one
+        sink.write("5\n")
+        assert wait_until(lambda: server.received == b"3\n4\n5\n")
+
+        # The batch sent once the server is gone fails, and the next one reconnects
+        server.close()
+        os.remove(self.unix_path)
+        server = LineServer(socket.AF_UNIX, self.unix_path)
+        self.addCleanup(server.close)
+        sink.write("6\n")
+        sink.write("7\n")
+        assert wait_until(lambda: server.received == b"6\n7\n")
+        sink.stop()
+        assert sink.dropped == 2
+
+
+class FormatRecordCase(unittest.TestCase):
+    def setUp(self):
+        self.serialize = mock.Mock(wraps=serialize)
+        patcher = mock.patch.object(upils_logging, "serialize", self.serialize)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        logger.remove()
+
+    def test_only_written_records_are_serialized(self):
+        stream = io.StringIO()
+        log = configure_logger("INFO", sink=stream)
+        messages = []
+        logger.add(messages.append, level="DEBUG", format="{message}")
+
+        log.debug("debug")
+        assert self.serialize.call_count == 0
+        log.bind(user="ajung").info("info")
+        assert self.serialize.call_count == 1
+
+        lines = stream.getvalue().split("\n")
+        assert lines[1:] == ["", ""]
+        line = json.loads(lines[0])
+        assert (line["message"], line["extra"]) == ("info", {"user": "ajung"})
+        assert len(messages) == 2
+
+    def test_records_are_serialized_once_for_every_sink(self):
+        first, second = io.StringIO(), io.StringIO()
+        log = configure_logger("INFO", sink=first)
+        logger.add(second, format=format_record)
+
+        log.warning("twice")
+        assert self.serialize.call_count == 1
+        assert first.getvalue() == second.getvalue()
+
+    def test_exception_traceback_follows_the_line(self):
+        stream = io.StringIO()
+        log = configure_logger("INFO", sink=stream)
+        try:
+            raise ValueError("failed")
+        except ValueError:
+            log.exception("with exception")
+
+        line, rest = stream.getvalue().split("\n", 1)
+        assert json.loads(line)["exception"]["type"] == "ValueError"
+        assert rest.startswith("\nTraceback")
+
+
+class Color(enum.Enum):
+    RED = "red"
+
+
+class Size(enum.IntEnum):
+    SMALL = 1
+
+
+CUSTOM_LEVEL = 'CUSTOM "LEVEL"'
+logger.level(CUSTOM_LEVEL, no=15)
+
+
+def capture_records():
+    """Returns loguru records of many shapes, with every time format."""
+    records = []
+    handler_id = logger.add(records.append, format="{message}", level=0)
+    times = [
+        None,
+        datetime.datetime(2023, 10, 4, 12, 3, 53, 43106),
+        datetime.datetime(2023, 10, 4, 12, 3, 53, 500000),
+        datetime.datetime(2023, 10, 4, 12, 3, 53),
+        datetime.datetime(1969, 12, 31, 23, 59, 59, 1),
+        # Exponent timestamps in UTC
+        datetime.datetime(1970, 1, 1, 0, 0, 0, 4),
+        datetime.datetime(1970, 1, 1, 0, 0, 0, 99),
+        datetime.datetime(1970, 1, 1, 0, 0, 0, 100),
+        datetime.datetime(2100, 1, 1, 0, 0, 0, 999999),
+    ]
+    timezones = [
+        datetime.timezone.utc,
+        datetime.timezone(datetime.timedelta(hours=7), "WIB"),
+        datetime.timezone(datetime.timedelta(hours=-3, minutes=-30)),
+    ]
+    extras = [
+        {},
+        {"user": "ajung", "count": 3, "ok": True, "missing": None},
+        {"ratio": 0.1, "tiny": 1e-7, "huge": 1e16, "big": 2**70, "neg": -0.0},
+        {"text": 'é 😀 "quoted" \\ \n\t\x00\x7f', "lone": "\ud800"},
+        {"nan": float("nan")},
+        {"nested": {"a": [1, 2]}, "color": Color.RED, "day": datetime.date(2023, 1, 1)},
+        {"size": Size.SMALL},
+    ]
+    try:
+        for index, extra in enumerate(extras):
+            for time in times:
+                for timezone in timezones:
+
+                    def patch(record, time=time, timezone=timezone):
+                        if time is not None:
+                            record["time"] = time.replace(tzinfo=timezone)
+
+                    log = logger.patch(patch).bind(**extra)
+                    log.log(
+                        ["INFO", "DEBUG", "WARNING"][index % 3], "message {}", index
+                    )
+        logger.log(CUSTOM_LEVEL, "custom level")
+        try:
+            raise ValueError("failed")
+        except ValueError:
+            logger.exception("with exception")
+    finally:
+        logger.remove(handler_id)
+    return [message.record for message in records]
+
+
+class RecordEncoderCase(unittest.TestCase):
+    def test_lines_are_byte_identical(self):
+        records = capture_records()
+        backends = [json_backend.StdlibJSONBackend()]
+        if json_backend.BACKEND.name == "orjson":
+            backends.append(json_backend.BACKEND)
+
+        for backend in backends:
+            with mock.patch.object(json_backend, "dumps", backend.dumps):
+                encoder = RecordEncoder()
+                for _ in range(2):
+                    for record in records:
+                        expected = upils_logging._serialize_generic(record)
+                        assert encoder.encode(record) == expected, expected
+
+    def test_serialize_uses_the_encoder(self):
+        record = capture_records()[0]
+        assert serialize(record) == upils_logging._serialize_generic(record)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class LogRateLimiterCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.stream = io.StringIO()
+
+    def tearDown(self):
+        logger.remove()
+
+    def configure(self, **options):
+        limiter = LogRateLimiter(clock=self.clock, summary_interval=10, **options)
+        self.addCleanup(limiter.close)
+        return (
+            configure_logger("DEBUG", sink=self.stream, rate_limiter=limiter),
+            limiter,
+        )
+
+    def lines(self):
+        return [
+            json.loads(line) for line in self.stream.getvalue().splitlines() if line
+        ]
+
+    def test_sampling_by_level(self):
+        log, _ = self.configure(levels={"DEBUG": RateLimit(sample_every=10)})
+        for index in range(25):
+            log.debug("debug {}", index)
+            log.info("info {}", index)
+
+        lines = self.lines()
+        debug = [line["message"] for line in lines if line["level"] == "DEBUG"]
+        assert debug == ["debug 0", "debug 10", "debug 20"]
+        assert len([line for line in lines if line["level"] == "INFO"]) == 25
+
+    def test_token_bucket_and_summary(self):
+        log, limiter = self.configure(default=RateLimit(rate=2, burst=3))
+
+        def burst(count):
+            for _ in range(count):
+                log.warning("hot loop")
+
+        burst(10)
+        assert len(self.lines()) == 3
+        self.clock.now = 1
+        burst(10)
+        assert len(self.lines()) == 5
+
+        self.clock.now = 10
+        burst(1)
+        # The summary is logged before the record that is let through
+        lines = self.lines()
+        summary = lines[-2]
+        assert summary["message"] == "15 records suppressed"
+        assert summary["extra"]["suppressed"] == 15
+        assert summary["extra"]["call_site"].startswith(__file__)
+        assert summary["extra"]["call_site_level"] == "WARNING"
+        assert lines[-1]["message"] == "hot loop"
+
+        burst(5)
+        limiter.flush_summaries()
+        assert self.lines()[-1]["message"] == "3 records suppressed"
+
+    def test_summaries_of_quiet_call_sites(self):
+        limiter = LogRateLimiter(
+            levels={"DEBUG": RateLimit(sample_every=10)}, summary_interval=0.05
+        )
+        self.addCleanup(limiter.close)
+        log = configure_logger("DEBUG", sink=self.stream, rate_limiter=limiter)
+        for _ in range(25):
+            log.debug("burst")
+
+        # The call site logs nothing more, and the summary is logged on time
+        assert wait_until(lambda: len(self.lines()) == 4)
+        assert self.lines()[-1]["message"] == "22 records suppressed"
+
+        # close logs the summaries not due yet
+        for _ in range(5):
+            log.debug("another burst")
+        limiter.close()
+        assert self.lines()[-1]["message"] == "4 records suppressed"
+        assert limiter._thread is None
+
+    @unittest.skipUnless(hasattr(os, "fork"), "fork is not available")
+    def test_forked_child_counts_its_own_records(self):
+        log, limiter = self.configure(levels={"DEBUG": RateLimit(sample_every=10)})
+        for _ in range(5):
+            log.debug("burst")
+
+        def child():
+            for _ in range(3):
+                log.debug("burst")
+            limiter.close()
+            assert self.lines()[-2]["message"] == "burst"
+            assert self.lines()[-1]["message"] == "2 records suppressed"
+
+        assert run_in_child(child)
+        limiter.close()
+        assert self.lines()[-1]["message"] == "4 records suppressed"
+
+    def test_limits_by_message_template(self):
+        log, _ = self.configure(
+            messages={"retrying {} in {}s": RateLimit(sample_every=2)},
+            default=RateLimit(sample_every=3),
+        )
+        for index in range(6):
+            log.info("retrying {} in {}s", index, 5)
+            log.info("other {}", index)
+
+        messages = [line["message"] for line in self.lines()]
+        assert [m for m in messages if m.startswith("retrying")] == [
+            "retrying 0 in 5s",
+            "retrying 2 in 5s",
+            "retrying 4 in 5s",
+        ]
+        assert [m for m in messages if m.startswith("other")] == ["other 0", "other 3"]
+
+    def test_unlimited_call_sites(self):
+        log, limiter = self.configure(levels={"ERROR": RateLimit(rate=1)})
+        for _ in range(50):
+            log.info("allowed")
+        assert len(self.lines()) == 50
+        assert list(limiter._sites.values()) == [upils_logging._UNLIMITED]
+
+    def test_invalid_limits(self):
+        for options in [{"sample_every": 0}, {"rate": 0}, {"rate": 1, "burst": 0}]:
+            with self.assertRaises(ValueError):
+                RateLimit(**options)
+
+
+class LogMetricsCase(unittest.TestCase):
+    def tearDown(self):
+        disable_log_metrics()
+        logger.remove()
+
+    def test_records_bytes_and_latencies(self):
+        stream = io.StringIO()
+        with log_metrics() as metrics:
+            log = configure_logger("INFO", sink=stream)
+            for _ in range(3):
+                log.info("counted")
+            log.warning("counted")
+            log.debug("filtered")
+            snapshot = log_metrics_snapshot()
+        assert log_metrics_snapshot() is None
+
+        lines = [line for line in stream.getvalue().splitlines() if line]
+        assert snapshot == metrics.snapshot()
+        assert snapshot["records"] == {"INFO": 3, "WARNING": 1}
+        assert snapshot["serialized_bytes"] == sum(len(line) + 1 for line in lines)
+        for histogram in [snapshot["serialization"], snapshot["sink_writes"]]:
+            assert histogram["count"] == 4
+            assert sum(count for _, count in histogram["buckets"]) == 4
+            assert [bound for bound, _ in histogram["buckets"]] == [
+                *LATENCY_BUCKETS,
+                None,
+            ]
+        json.dumps(snapshot)
+
+        metrics.reset()
+        assert metrics.snapshot()["records"] == {}
+
+    def test_dropped_records(self):
+        metrics = enable_log_metrics()
+        limiter = LogRateLimiter(default=RateLimit(sample_every=2))
+        log = configure_logger("INFO", sink=io.StringIO(), rate_limiter=limiter)
+        for _ in range(4):
+            log.info("sampled")
+
+        stream = BlockingStream()
+        sink = QueuedSink(stream, max_size=1, overflow=OVERFLOW_DROP_NEW)
+        for line in ["0\n", "1\n", "2\n"]:
+            sink.write(line)
+            assert stream.entered.wait(timeout=5)
+        stream.release.set()
+        sink.stop()
+
+        with tempfile.TemporaryDirectory() as directory:
+            sink = FileSink(
+                os.path.join(directory, "missing", "app.log"),
+                flush_bytes=1,
+                max_buffer_bytes=4,
+            )
+            for line in ["1\n", "2\n", "3\n", "4\n"]:
+                sink.write(line)
+            sink.stop()
+
+        assert metrics.snapshot()["dropped"] == {
+            DROPPED_RATE_LIMITED: 2,
+            DROPPED_QUEUE_FULL: 1,
+            DROPPED_BUFFER_FULL: 2,
+        }
+
+    def test_batch_sink_writes(self):
+        metrics = enable_log_metrics()
+        stream = BlockingStream()
+        log = configure_logger("INFO", sink=QueuedSink(stream))
+        log.info("first")
+        assert stream.entered.wait(timeout=5)
+        log.info("second")
+        log.info("third")
+        stream.release.set()
+        logger.remove()
+        assert len([line for line in stream.getvalue().splitlines() if line]) == 3
+        # Measured once per batch, not once per line
+        assert metrics.snapshot()["sink_writes"]["count"] == 2
+
+        metrics.reset()
+        sink = QueuedSink(FailingStream())
+        sink.write("0\n")
+        sink.stop()
+        with tempfile.TemporaryDirectory() as directory:
+            for path in ["missing/app.log", "app.log"]:
+                sink = FileSink(os.path.join(directory, path))
+                sink.write("1\n")
+                sink.write("2\n")
+                sink.stop()
+
+        snapshot = metrics.snapshot()
+        assert snapshot["sink_writes"]["count"] == 3
+        assert snapshot["failed_sink_writes"] == 2
+        assert snapshot["dropped"] == {DROPPED_WRITE_FAILED: 1}
+
+    def test_blocked_sink_writes(self):
+        metrics = enable_log_metrics()
+        stream = BlockingStream()
+        sink = QueuedSink(stream, max_size=1, overflow=OVERFLOW_BLOCK)
+        sink.write("0\n")
+        assert stream.entered.wait(timeout=5)
+        sink.write("1\n")
+        writer = threading.Thread(target=sink.write, args=("2\n",))
+        writer.start()
+        writer.join(timeout=0.1)
+
+        stream.release.set()
+        writer.join(timeout=5)
+        sink.stop()
+        assert metrics.snapshot()["sink_blocked"] == 1
+
+    def test_periodic_report(self):
+        stream = io.StringIO()
+        log = configure_logger("INFO", sink=stream)
+        metrics = LogMetrics()
+        assert enable_log_metrics(metrics, interval=0.01) is metrics
+        log.info("counted")
+
+        def reports():
+            lines = [
+                json.loads(line) for line in stream.getvalue().splitlines() if line
+            ]
+            return [line for line in lines if line["message"] == "logging metrics"]
+
+        assert wait_until(reports)
+        disable_log_metrics()
+        report = reports()[0]["extra"]["log_metrics"]
+        assert report["records"]["INFO"] >= 1
+        # Sinks configured before metrics were enabled are not measured
+        assert report["sink_writes"]["count"] == 0
+
+        with self.assertRaises(ValueError):
+            enable_log_metrics(interval=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from tests.test_slate_converter import (
+    ANTUTU_DOCUMENT_JSON,
+    ANTUTU_PLAIN_TEXT,
+    MIXED_DOCUMENT_JSON,
+)
+from upils.slate_cli import ConversionStats, convert, iter_documents, main
+from upils.slate_converter import SlateDocument
+
+MIXED_PLAIN_TEXT = SlateDocument.parse(MIXED_DOCUMENT_JSON).to_plain_text()
+
+
+class SlateCLICase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def test_iter_documents(self):
+        jsonl = self.write("a.jsonl", f"{ANTUTU_DOCUMENT_JSON}\n\n{{not json\n")
+        single = self.write(
+            "b.json", json.dumps(json.loads(MIXED_DOCUMENT_JSON), indent=2)
+        )
+        stdin = io.BytesIO(MIXED_DOCUMENT_JSON.encode())
+
+        locations = [
+            location for location, _ in iter_documents([jsonl, single, "-"], stdin)
+        ]
+        assert locations == [f"{jsonl}:1", f"{jsonl}:3", single, "<stdin>:1"]
+
+    def test_convert_jsonl(self):
+        self.write("b.jsonl", MIXED_DOCUMENT_JSON + "\n")
+        self.write("a.jsonl", f"{ANTUTU_DOCUMENT_JSON}\n{{not json\n")
+        self.write("ignored.txt", "{not json")
+
+        output = io.StringIO()
+        stats = convert([self.directory.name], output, workers=2, chunk_size=1)
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+
+        a_path = os.path.join(self.directory.name, "a.jsonl")
+        assert lines[0] == {"source": f"{a_path}:1", "text": ANTUTU_PLAIN_TEXT}
+        assert lines[1]["source"] == f"{a_path}:2"
+        assert lines[1]["error"].startswith("JSONDecodeError: ")
+        assert lines[2]["text"] == MIXED_PLAIN_TEXT
+        assert len(lines) == 3
+
+        assert (stats.documents, stats.errors) == (3, 1)
+        b_path = os.path.join(self.directory.name, "b.jsonl")
+        assert stats.bytes_read == os.path.getsize(a_path) + os.path.getsize(b_path)
+        assert len(stats.slowest) == 3
+        assert stats.slowest == sorted(stats.slowest, reverse=True)
+
+    def test_convert_text_from_stdin(self):
+        empty = '{"document": {"nodes": []}}'
+        stdin = io.BytesIO(
+            f"{empty}\n{ANTUTU_DOCUMENT_JSON}\n{{not json\n{MIXED_DOCUMENT_JSON}".encode()
+        )
+        output = io.StringIO()
+        stats = convert([], output, output_format="text", workers=1, stdin=stdin)
+
+        # Every document gives a text, which is empty if it failed
+        assert output.getvalue().split("\n\n") == [
+            "",
+            ANTUTU_PLAIN_TEXT,
+            "",
+            MIXED_PLAIN_TEXT,
+            "",
+        ]
+        assert stats.errors == 1
+
+    def test_convert_single_document_from_stdin(self):
+        document = json.dumps(json.loads(ANTUTU_DOCUMENT_JSON), indent=2)
+        output = io.StringIO()
+        stats = convert(
+            [], output, workers=1, stdin=io.BytesIO(document.encode()), stdin_json=True
+        )
+
+        assert json.loads(output.getvalue()) == {
+            "source": "<stdin>",
+            "text": ANTUTU_PLAIN_TEXT,
+        }
+        assert (stats.documents, stats.errors) == (1, 0)
+
+    def test_main(self):
+        path = self.write("a.jsonl", ANTUTU_DOCUMENT_JSON + "\n{not json\n")
+        output_path = os.path.join(self.directory.name, "out.jsonl")
+
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            assert main([path, "-o", output_path, "--workers", "1"]) == 0
+            assert main([path, "-o", output_path, "--fail-on-error"]) == 1
+        with open(output_path, encoding="utf-8") as file:
+            assert json.loads(file.readline())["text"] == ANTUTU_PLAIN_TEXT
+        assert "documents: 2\nerrors: 1\n" in stderr.getvalue()
+        assert "slowest documents:" in stderr.getvalue()
+
+        with contextlib.redirect_stderr(io.StringIO()):
+            for argv in [["missing.jsonl"], [path, "--workers", "0"]]:
+                with self.assertRaises(SystemExit):
+                    main(argv)
+
+    def test_stats_report(self):
+        stats = ConversionStats(
+            documents=10, bytes_read=2 * 1024**2, elapsed=2.0, slowest=[(0.25, "a:1")]
+        )
+        assert stats.documents_per_second == 5.0
+        assert stats.megabytes_per_second == 1.0
+        assert stats.report().endswith("slowest documents:\n  250.0ms a:1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,266 @@
 # Based on the go-utils slate_converter_test https://github.com/kumparan/go-utils/blob/master/slate_converter_test.go
 
+import asyncio
+import copy
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import tracemalloc
+import pickle
+import timeit
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
 
-from upils.slate_converter import SlateDocument, SlateLeaf, SlateNode
+from upils.slate_converter import (
+    DOT_SEPARATOR,
+    DOT_SPACE_REGEX,
+    EMPTY_LIST,
+    MULTIPLE_DOTS_REGEX,
+    NEWLINE,
+    NODE_TYPE_FIGURE,
+    NODE_TYPE_PARAGRAPH,
+    PRUNED_NODES,
+    SENTENCE_SEPARATOR,
+    AsyncSlateConverter,
+    FrozenList,
+    SlateCacheStats,
+    SlateConversionResult,
+    SlateDocument,
+    SlateJSONLReader,
+    SlateJSONLStats,
+    SlateLeaf,
+    SlateLineResult,
+    SlateNode,
+    SlatePlainTextCache,
+    SlateProfile,
+    SlateTextExtraction,
+    batch_to_plain_text,
+    clean_up_list,
+    iter_plain_text,
+    iter_plain_text_chunks,
+    plain_text_from_dict,
+    register_node_type,
+    serialize_slate_leaves,
+    serialize_slate_nodes,
+    slate_profiling,
+    unregister_node_type,
+)
+
+ANTUTU_DOCUMENT_JSON = """{"document":{"nodes":[{"object":"block","type":"heading-large","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"10 HP Android Paling Ngebut Versi AnTuTu Februari 2025, Ini Juaranya","marks":[]}]}]},{"object":"block","type":"figure","data":{},"nodes":[{"object":"block","type":"image","data":{"image":{"id":"1741342849091738823","title":"Untitled Image","description":"","publicID":"01jnr1ydtm32jndtmgaytxzp4y","externalURL":"https://blue.kumparan.com/image/upload/v1634025439/01jnr1ydtm32jndtmgaytxzp4y.jpg","awsS3Key":"2025/Mar/image/01jnr1ydtm32jndtmgaytxzp4y/","height":433,"width":768,"locationName":null,"locationLat":0,"locationLon":0,"mediaType":"IMAGE","mediaSourceID":"7","photographer":"","eventDate":"2025-03-07T10:20:49.091685Z","internalTags":[],"__typename":"Media"}},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"","marks":[]}]}]},{"object":"block","type":"caption","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"OnePlus Ace 5 Pro. Foto: OnePlus","marks":[]}]}]}]},{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Platform benchmark AnTuTu meluncurkan laporan baru soal daftar handphone (","marks":[]}]},{"object":"inline","type":"link","data":{"href":"https://kumparan.com/topic/hp"},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"HP","marks":[]}]}]},{"object":"text","leaves":[{"object":"leaf","text":") Android dengan performa terkencang di dunia. Untuk periode Februari 2025, smartphone dengan dapur pacu Snapdragon 8 Elite menjadi juaranya.","marks":[]}]}]},{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Pengukuran AnTuTu berdasarkan beberapa aspek komponen di ","marks":[]}]},{"object":"inline","type":"link","data":{"href":"https://kumparan.com/topic/smartphone"},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"smartphone","marks":[]}]}]},{"object":"text","leaves":[{"object":"leaf","text":", seperti CPU, GPU, RAM, memori penyimpanan, hingga UX. Skor yang ditampilkan merupakan hasil sejumlah pengujian benchmark perangkat via aplikasi AnTuTu, minimal 1.000 kali dalam sebulan","marks":[]}]}]},{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Prosesor Snapdragon 8 Elite dari Qualcomm dan Dimensity 9400 buatan MediaTek bersaing ketat dalam daftar 10 HP ","marks":[]}]},{"object":"inline","type":"link","data":{"href":"https://kumparan.com/topic/android"},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Android","marks":[]}]}]},{"object":"text","leaves":[{"object":"leaf","text":" dengan performa tercepat selama Februari 2025. Berikut daftar lengkapnya:","marks":[]}]}]},{"object":"block","type":"numbered-list","data":{},"nodes":[{"object":"block","type":"list-item","data":{},"nodes":[{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"OnePlus Ace 5 Pro","marks":[]}]}]}]},{"object":"block","type":"list-item","data":{},"nodes":[{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"vivo X200 Pro","marks":[]}]}]}]},{"object":"block","type":"list-item","data":{},"nodes":[{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Red Magic 10 Pro+","marks":[]}]}]}]},{"object":"block","type":"list-item","data":{},"nodes":[{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"iQoo 13","marks":[]}]}]}]},{"object":"block","type":"list-item","data":{},"nodes":[{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"iQoo Neo 10 Pro","marks":[]}]}]}]},{"object":"block","type":"list-item","data":{},"nodes":[{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"OnePlus 13","marks":[]}]}]}]},{"object":"block","type":"list-item","data":{},"nodes":[{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Realme GT 7 Pro","marks":[]}]}]}]},{"object":"block","type":"list-item","data":{},"nodes":[{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Oppo Find X8 Pro","marks":[]}]}]}]},{"object":"block","type":"list-item","data":{},"nodes":[{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Redmi K80 Pro","marks":[]}]}]}]},{"object":"block","type":"list-item","data":{},"nodes":[{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Oppo Find X8","marks":[]}]}]}]}]},{"object":"block","type":"figure","data":{},"nodes":[{"object":"block","type":"image","data":{"image":{"id":"1741342007934594403","title":"Untitled Image","description":"","publicID":"01jnr14renhw6ssnzjpd824eb7","externalURL":"https://blue.kumparan.com/image/upload/v1634025439/01jnr14renhw6ssnzjpd824eb7.jpg","awsS3Key":"2025/Mar/image/01jnr14renhw6ssnzjpd824eb7/","height":556,"width":738,"locationName":null,"locationLat":0,"locationLon":0,"mediaType":"IMAGE","mediaSourceID":"7","photographer":"","eventDate":"2025-03-07T10:06:47.934489Z","internalTags":[],"__typename":"Media"}},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"","marks":[]}]}]},{"object":"block","type":"caption","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Daftar 10 HP Android flagship paling ngebut versi AnTuTu periode Februari 2025. Foto: AnTuTu","marks":[]}]}]}]},{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Peringkat pertama ditempati OnePlus Ace 5 Pro berbasis Snapdragon 8 Elite, dengan skor AnTuTu mencapai 2.890.600. Sementara itu, runner up-nya adalah vivo X200 Pro yang menggunakan cip Dimensity 9400, dengan skor AnTuTu 2.884.682.","marks":[]}]}]},{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"RedMagic 10 Pro+ berada di posisi ketiga dengan skor AnTuTu 2.879.356, diikuti oleh iQoo 13 di peringkat keempat dengan skor AnTuTu 2.853.651. Kemudian, peringkat top 5 terakhir ditempati oleh iQoo Neo 10 Pro dengan skor AnTuTu 2.836.633.","marks":[]}]}]}]}}"""
+
+ANTUTU_PLAIN_TEXT = """Platform benchmark AnTuTu meluncurkan laporan baru soal daftar handphone (HP) Android dengan performa terkencang di dunia. Untuk periode Februari 2025, smartphone dengan dapur pacu Snapdragon 8 Elite menjadi juaranya.
+Pengukuran AnTuTu berdasarkan beberapa aspek komponen di smartphone, seperti CPU, GPU, RAM, memori penyimpanan, hingga UX. Skor yang ditampilkan merupakan hasil sejumlah pengujian benchmark perangkat via aplikasi AnTuTu, minimal 1.000 kali dalam sebulan.
+Prosesor Snapdragon 8 Elite dari Qualcomm dan Dimensity 9400 buatan MediaTek bersaing ketat dalam daftar 10 HP Android dengan performa tercepat selama Februari 2025. Berikut daftar lengkapnya:
+OnePlus Ace 5 Pro, vivo X200 Pro, Red Magic 10 Pro+, iQoo 13, iQoo Neo 10 Pro, OnePlus 13, Realme GT 7 Pro, Oppo Find X8 Pro, Redmi K80 Pro, Oppo Find X8. Peringkat pertama ditempati OnePlus Ace 5 Pro berbasis Snapdragon 8 Elite, dengan skor AnTuTu mencapai 2.890.600. Sementara itu, runner up-nya adalah vivo X200 Pro yang menggunakan cip Dimensity 9400, dengan skor AnTuTu 2.884.682.
+RedMagic 10 Pro+ berada di posisi ketiga dengan skor AnTuTu 2.879.356, diikuti oleh iQoo 13 di peringkat keempat dengan skor AnTuTu 2.853.651. Kemudian, peringkat top 5 terakhir ditempati oleh iQoo Neo 10 Pro dengan skor AnTuTu 2.836.633."""
+
+# Covers separators changed by sibling nodes, nested lists and empty blocks
+MIXED_DOCUMENT_JSON = json.dumps(
+    {
+        "object": "value",
+        "document": {
+            "object": "document",
+            "data": {"version": 2},
+            "nodes": [
+                {"object": "block", "type": "paragraph", "nodes": []},
+                {
+                    "object": "block",
+                    "type": "heading-medium",
+                    "nodes": [{"object": "text", "leaves": [{"text": "Sub"}]}],
+                },
+                {
+                    "object": "block",
+                    "type": "paragraph",
+                    "nodes": [
+                        {"object": "text", "leaves": [{"text": "after heading  "}]}
+                    ],
+                },
+                {
+                    "object": "block",
+                    "type": "bulleted-list",
+                    "nodes": [
+                        {
+                            "object": "block",
+                            "type": "list-item",
+                            "nodes": [
+                                {
+                                    "object": "block",
+                                    "type": "paragraph",
+                                    "nodes": [
+                                        {
+                                            "object": "text",
+                                            "leaves": [{"text": "first..."}],
+                                        }
+                                    ],
+                                },
+                                {
+                                    "object": "block",
+                                    "type": "numbered-list",
+                                    "nodes": [
+                                        {
+                                            "object": "block",
+                                            "type": "list-item",
+                                            "nodes": [
+                                                {
+                                                    "object": "block",
+                                                    "type": "paragraph",
+                                                    "leaves": [{"text": "nested 1.5"}],
+                                                }
+                                            ],
+                                        }
+                                    ],
+                                },
+                            ],
+                        },
+                        {
+                            "object": "block",
+                            "type": "list-item",
+                            "nodes": [
+                                {
+                                    "object": "block",
+                                    "type": "paragraph",
+                                    "nodes": [
+                                        {
+                                            "object": "text",
+                                            "leaves": [
+                                                {"text": "bold ", "marks": [{}]},
+                                                {"text": " last"},
+                                            ],
+                                        }
+                                    ],
+                                }
+                            ],
+                        },
+                    ],
+                },
+                {"object": "block", "type": "heading-large", "leaves": [{"text": "T"}]},
+                {
+                    "object": "block",
+                    "type": "list-item",
+                    "nodes": [{"object": "text", "leaves": [{"text": "stray"}]}],
+                },
+                {
+                    "object": "block",
+                    "type": "paragraph",
+                    "nodes": [
+                        {
+                            "object": "inline",
+                            "type": "inline",
+                            "nodes": [{"object": "text", "leaves": [{"text": "in"}]}],
+                        },
+                        {"object": "text", "leaves": [{"text": "line!"}]},
+                    ],
+                },
+                {
+                    "object": "block",
+                    "type": "figure",
+                    "nodes": [
+                        {
+                            "object": "block",
+                            "type": "caption",
+                            "nodes": [{"object": "text", "leaves": [{"text": "c"}]}],
+                        }
+                    ],
+                },
+            ],
+        },
+    }
+)
+
+
+@dataclass
+class LegacySlateLeaf:
+    """SlateLeaf layout before the compact representation, to measure against."""
+
+    object: str = "leaf"
+    text: str = ""
+    marks: List[Any] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, leaf: Dict) -> "LegacySlateLeaf":
+        return cls(
+            object=leaf.get("object", "leaf"),
+            text=leaf.get("text", ""),
+            marks=leaf.get("marks", []),
+        )
+
+
+@dataclass
+class LegacySlateNode:
+    """SlateNode layout before the compact representation, to measure against."""
+
+    object: str = "block"
+    type: str = ""
+    nodes: List["LegacySlateNode"] = field(default_factory=list)
+    leaves: List[LegacySlateLeaf] = field(default_factory=list)
+    is_last_in_list: bool = False
+
+    @classmethod
+    def from_dict(cls, node: Dict) -> "LegacySlateNode":
+        return cls(
+            object=node.get("object", "block"),
+            type=node.get("type", ""),
+            nodes=[cls.from_dict(node_data) for node_data in node.get("nodes", [])],
+            leaves=[
+                LegacySlateLeaf.from_dict(leaf_data)
+                for leaf_data in node.get("leaves", [])
+            ],
+        )
+
+
+def measure_retained_memory(build):
+    """Returns the bytes still allocated by the object that build returns."""
+    tracemalloc.start()
+    try:
+        result = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+class GatedExecutor(ThreadPoolExecutor):
+    """Holds every submitted call until gate is set, counting submitted and running calls."""
+
+    def __init__(self, max_workers):
+        super().__init__(max_workers=max_workers)
+        self.gate = threading.Event()
+        self.lock = threading.Lock()
+        self.submitted = self.running = self.max_running = 0
+
+    def submit(self, fn, /, *args, **kwargs):
+        def gated():
+            with self.lock:
+                self.running += 1
+                self.max_running = max(self.max_running, self.running)
+            try:
+                self.gate.wait()
+                return fn(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.running -= 1
+
+        with self.lock:
+            self.submitted += 1
+        return super().submit(gated)
+
+
+def measure_best_times(*functions, number=3, rounds=20):
+    """
+    Returns the best time of each function over a few rounds. The rounds are
+    interleaved, so that noise on a busy machine affects every function alike.
+    """
+    times = [float("inf")] * len(functions)
+    for _ in range(rounds):
+        for index, function in enumerate(functions):
+            times[index] = min(times[index], timeit.timeit(function, number=number))
+    return times
 
 
 class SlateConverterCase(unittest.TestCase):
@@ -147,19 +405,17 @@ class SlateConverterCase(unittest.TestCase):
         assert len(input.nodes) == expected_node_length
 
     def test_to_plain_text(self):
-        input_json = """{"document":{"nodes":[{"object":"block","type":"heading-large","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"10 HP Android Paling Ngebut Versi AnTuTu Februari 2025, Ini Juaranya","marks":[]}]}]},{"object":"block","type":"figure","data":{},"nodes":[{"object":"block","type":"image","data":{"image":{"id":"1741342849091738823","title":"Untitled Image","description":"","publicID":"01jnr1ydtm32jndtmgaytxzp4y","externalURL":"https://blue.kumparan.com/image/upload/v1634025439/01jnr1ydtm32jndtmgaytxzp4y.jpg","awsS3Key":"2025/Mar/image/01jnr1ydtm32jndtmgaytxzp4y/","height":433,"width":768,"locationName":null,"locationLat":0,"locationLon":0,"mediaType":"IMAGE","mediaSourceID":"7","photographer":"","eventDate":"2025-03-07T10:20:49.091685Z","internalTags":[],"__typename":"Media"}},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"","marks":[]}]}]},{"object":"block","type":"caption","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"OnePlus Ace 5 Pro. Foto: OnePlus","marks":[]}]}]}]},{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Platform benchmark AnTuTu meluncurkan laporan baru soal daftar handphone (","marks":[]}]},{"object":"inline","type":"link","data":{"href":"https://kumparan.com/topic/hp"},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"HP","marks":[]}]}]},{"object":"text","leaves":[{"object":"leaf","text":") Android dengan performa terkencang di dunia. Untuk periode Februari 2025, smartphone dengan dapur pacu Snapdragon 8 Elite menjadi juaranya.","marks":[]}]}]},{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Pengukuran AnTuTu berdasarkan beberapa aspek komponen di ","marks":[]}]},{"object":"inline","type":"link","data":{"href":"https://kumparan.com/topic/smartphone"},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"smartphone","marks":[]}]}]},{"object":"text","leaves":[{"object":"leaf","text":", seperti CPU, GPU, RAM, memori penyimpanan, hingga UX. Skor yang ditampilkan merupakan hasil sejumlah pengujian benchmark perangkat via aplikasi AnTuTu, minimal 1.000 kali dalam sebulan","marks":[]}]}]},{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Prosesor Snapdragon 8 Elite dari Qualcomm dan Dimensity 9400 buatan MediaTek bersaing ketat dalam daftar 10 HP ","marks":[]}]},{"object":"inline","type":"link","data":{"href":"https://kumparan.com/topic/android"},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Android","marks":[]}]}]},{"object":"text","leaves":[{"object":"leaf","text":" dengan performa tercepat selama Februari 2025. Berikut daftar lengkapnya:","marks":[]}]}]},{"object":"block","type":"numbered-list","data":{},"nodes":[{"object":"block","type":"list-item","data":{},"nodes":[{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"OnePlus Ace 5 Pro","marks":[]}]}]}]},{"object":"block","type":"list-item","data":{},"nodes":[{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"vivo X200 Pro","marks":[]}]}]}]},{"object":"block","type":"list-item","data":{},"nodes":[{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Red Magic 10 Pro+","marks":[]}]}]}]},{"object":"block","type":"list-item","data":{},"nodes":[{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"iQoo 13","marks":[]}]}]}]},{"object":"block","type":"list-item","data":{},"nodes":[{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"iQoo Neo 10 Pro","marks":[]}]}]}]},{"object":"block","type":"list-item","data":{},"nodes":[{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"OnePlus 13","marks":[]}]}]}]},{"object":"block","type":"list-item","data":{},"nodes":[{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Realme GT 7 Pro","marks":[]}]}]}]},{"object":"block","type":"list-item","data":{},"nodes":[{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Oppo Find X8 Pro","marks":[]}]}]}]},{"object":"block","type":"list-item","data":{},"nodes":[{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Redmi K80 Pro","marks":[]}]}]}]},{"object":"block","type":"list-item","data":{},"nodes":[{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Oppo Find X8","marks":[]}]}]}]}]},{"object":"block","type":"figure","data":{},"nodes":[{"object":"block","type":"image","data":{"image":{"id":"1741342007934594403","title":"Untitled Image","description":"","publicID":"01jnr14renhw6ssnzjpd824eb7","externalURL":"https://blue.kumparan.com/image/upload/v1634025439/01jnr14renhw6ssnzjpd824eb7.jpg","awsS3Key":"2025/Mar/image/01jnr14renhw6ssnzjpd824eb7/","height":556,"width":738,"locationName":null,"locationLat":0,"locationLon":0,"mediaType":"IMAGE","mediaSourceID":"7","photographer":"","eventDate":"2025-03-07T10:06:47.934489Z","internalTags":[],"__typename":"Media"}},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"","marks":[]}]}]},{"object":"block","type":"caption","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Daftar 10 HP Android flagship paling ngebut versi AnTuTu periode Februari 2025. Foto: AnTuTu","marks":[]}]}]}]},{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"Peringkat pertama ditempati OnePlus Ace 5 Pro berbasis Snapdragon 8 Elite, dengan skor AnTuTu mencapai 2.890.600. Sementara itu, runner up-nya adalah vivo X200 Pro yang menggunakan cip Dimensity 9400, dengan skor AnTuTu 2.884.682.","marks":[]}]}]},{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"RedMagic 10 Pro+ berada di posisi ketiga dengan skor AnTuTu 2.879.356, diikuti oleh iQoo 13 di peringkat keempat dengan skor AnTuTu 2.853.651. Kemudian, peringkat top 5 terakhir ditempati oleh iQoo Neo 10 Pro dengan skor AnTuTu 2.836.633.","marks":[]}]}]}]}}"""
-
-        expected = """Platform benchmark AnTuTu meluncurkan laporan baru soal daftar handphone (HP) Android dengan performa terkencang di dunia. Untuk periode Februari 2025, smartphone dengan dapur pacu Snapdragon 8 Elite menjadi juaranya.
-Pengukuran AnTuTu berdasarkan beberapa aspek komponen di smartphone, seperti CPU, GPU, RAM, memori penyimpanan, hingga UX. Skor yang ditampilkan merupakan hasil sejumlah pengujian benchmark perangkat via aplikasi AnTuTu, minimal 1.000 kali dalam sebulan.
-Prosesor Snapdragon 8 Elite dari Qualcomm dan Dimensity 9400 buatan MediaTek bersaing ketat dalam daftar 10 HP Android dengan performa tercepat selama Februari 2025. Berikut daftar lengkapnya:
-OnePlus Ace 5 Pro, vivo X200 Pro, Red Magic 10 Pro+, iQoo 13, iQoo Neo 10 Pro, OnePlus 13, Realme GT 7 Pro, Oppo Find X8 Pro, Redmi K80 Pro, Oppo Find X8. Peringkat pertama ditempati OnePlus Ace 5 Pro berbasis Snapdragon 8 Elite, dengan skor AnTuTu mencapai 2.890.600. Sementara itu, runner up-nya adalah vivo X200 Pro yang menggunakan cip Dimensity 9400, dengan skor AnTuTu 2.884.682.
-RedMagic 10 Pro+ berada di posisi ketiga dengan skor AnTuTu 2.879.356, diikuti oleh iQoo 13 di peringkat keempat dengan skor AnTuTu 2.853.651. Kemudian, peringkat top 5 terakhir ditempati oleh iQoo Neo 10 Pro dengan skor AnTuTu 2.836.633."""
-
-        input = SlateDocument.parse(input_json)
+        input = SlateDocument.parse(ANTUTU_DOCUMENT_JSON)
         assert input is not None
 
         result = input.to_plain_text()
-        assert result == expected
+        assert result == ANTUTU_PLAIN_TEXT
+
+    def test_parse_bytes_and_memoryview(self):
+        encoded = ANTUTU_DOCUMENT_JSON.encode()
+        for document_json in [encoded, bytearray(encoded), memoryview(encoded)]:
+            result = SlateDocument.parse(document_json).to_plain_text()
+            assert result == ANTUTU_PLAIN_TEXT
 
     def test_text_link_not_contain_space(self):
         input_json = """{"document":{"nodes":[{"object":"block","type":"heading-large","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"ini adalah judul","marks":[]}]}]},{"object":"block","type":"paragraph","data":{},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"tanda kemunculan ","marks":[]}]},{"object":"inline","type":"link","data":{"href":"https://kumparan.com"},"nodes":[{"object":"text","leaves":[{"object":"leaf","text":"suzuki fronx","marks":[]}]}]},{"object":"text","leaves":[{"object":"leaf","text":" di indonesia.","marks":[]}]}]}]}}"""
@@ -279,6 +535,967 @@ RedMagic 10 Pro+ berada di posisi ketiga dengan skor AnTuTu 2.879.356, diikuti o
         result = input_doc.to_plain_text()
         assert result == expected
 
+    def test_iter_plain_text_matches_to_plain_text(self):
+        for input_json in [ANTUTU_DOCUMENT_JSON, MIXED_DOCUMENT_JSON]:
+            expected = SlateDocument.parse(input_json).to_plain_text()
+
+            assert "".join(iter_plain_text(input_json)) == expected
+            assert (
+                "".join(iter_plain_text(io.StringIO(input_json), chunk_size=7))
+                == expected
+            )
+
+    def test_iter_plain_text_yields_per_block(self):
+        result = list(iter_plain_text(ANTUTU_DOCUMENT_JSON))
+
+        assert len(result) > 1
+        assert "".join(result) == ANTUTU_PLAIN_TEXT
+
+    def test_iter_plain_text_empty_document(self):
+        assert list(iter_plain_text("{}")) == []
+        assert list(iter_plain_text('{"document": {"nodes": []}}')) == []
+
+    def test_iter_plain_text_invalid_json(self):
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_plain_text('{"document": {"nodes": [{"type": "paragraph"'))
+
+    def test_iter_plain_text_rejects_extra_data(self):
+        for extra in ["garbage", "{}", "]"]:
+            document_json = ANTUTU_DOCUMENT_JSON + "\n" + extra
+            with self.assertRaises(json.JSONDecodeError):
+                SlateDocument.parse(document_json)
+            for source in [document_json, io.StringIO(document_json)]:
+                with self.assertRaises(json.JSONDecodeError):
+                    list(iter_plain_text(source, chunk_size=64))
+        text = "".join(iter_plain_text(ANTUTU_DOCUMENT_JSON + "\n \t"))
+        assert text == ANTUTU_PLAIN_TEXT
+
+    def test_iter_plain_text_memory_is_bounded_by_block(self):
+        """
+        Ensure streaming a file does not hold the whole document in memory.
+        """
+        paragraph = {
+            "object": "block",
+            "type": "paragraph",
+            "nodes": [{"object": "text", "leaves": [{"text": "lorem ipsum " * 20}]}],
+        }
+        document = {"document": {"nodes": [paragraph] * 5000}}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "document.json")
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(document, file)
+            file_size = os.path.getsize(path)
+
+            tracemalloc.start()
+            try:
+                with open(path, encoding="utf-8") as file:
+                    for _ in iter_plain_text(file, chunk_size=4096):
+                        pass
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+        assert peak < file_size / 10
+
+    def test_batch_to_plain_text_keeps_input_order(self):
+        documents = [ANTUTU_DOCUMENT_JSON, MIXED_DOCUMENT_JSON] * 5
+        documents.append(ANTUTU_DOCUMENT_JSON.encode())
+        expected = [
+            SlateConversionResult(text=SlateDocument.parse(document).to_plain_text())
+            for document in documents
+        ]
+
+        result = list(batch_to_plain_text(iter(documents), max_workers=2, chunk_size=3))
+        assert result == expected
+
+    def test_batch_to_plain_text_captures_errors(self):
+        documents = [
+            '{"document": {"nodes": []}}',
+            "{not json",
+            "[]",
+            MIXED_DOCUMENT_JSON,
+        ]
+
+        result = list(batch_to_plain_text(documents, max_workers=2, chunk_size=1))
+
+        assert len(result) == len(documents)
+        assert result[0] == SlateConversionResult(text="")
+        assert result[1].text is None
+        assert result[1].error.startswith("JSONDecodeError")
+        assert result[2].error.startswith("AttributeError")
+        assert (
+            result[3].text == SlateDocument.parse(MIXED_DOCUMENT_JSON).to_plain_text()
+        )
+
+    def test_batch_to_plain_text_invalid_options(self):
+        with self.assertRaises(ValueError):
+            list(batch_to_plain_text([], chunk_size=0))
+        with self.assertRaises(ValueError):
+            list(batch_to_plain_text([], max_workers=0))
+
+    def test_async_to_plain_text(self):
+        documents = [ANTUTU_DOCUMENT_JSON, MIXED_DOCUMENT_JSON.encode(), "{not json"]
+
+        async def convert():
+            async with AsyncSlateConverter(max_concurrency=2) as converter:
+                text = await converter.to_plain_text(ANTUTU_DOCUMENT_JSON)
+                results = await converter.to_plain_texts(documents)
+            return text, results
+
+        text, results = asyncio.run(convert())
+
+        assert text == ANTUTU_PLAIN_TEXT
+        assert results[:2] == [
+            SlateConversionResult(text=ANTUTU_PLAIN_TEXT),
+            SlateConversionResult(
+                text=SlateDocument.parse(MIXED_DOCUMENT_JSON).to_plain_text()
+            ),
+        ]
+        assert results[2].error.startswith("JSONDecodeError: ")
+
+    def test_async_to_plain_text_bounds_concurrency(self):
+        executor = GatedExecutor(max_workers=4)
+
+        async def convert():
+            converter = AsyncSlateConverter(executor, max_concurrency=2)
+            tasks = [
+                asyncio.ensure_future(converter.to_plain_text(MIXED_DOCUMENT_JSON))
+                for _ in range(6)
+            ]
+            await asyncio.sleep(0.05)
+            submitted = executor.submitted
+            executor.gate.set()
+            return submitted, await asyncio.gather(*tasks)
+
+        try:
+            submitted, texts = asyncio.run(convert())
+        finally:
+            executor.gate.set()
+            executor.shutdown()
+
+        assert submitted == 2
+        assert executor.submitted == 6
+        assert executor.max_running == 2
+        assert set(texts) == {SlateDocument.parse(MIXED_DOCUMENT_JSON).to_plain_text()}
+
+    def test_async_to_plain_text_cancellation_and_timeout(self):
+        executor = GatedExecutor(max_workers=2)
+
+        async def convert():
+            converter = AsyncSlateConverter(executor, max_concurrency=1)
+            running = asyncio.ensure_future(converter.to_plain_text("{}"))
+            waiting = asyncio.ensure_future(converter.to_plain_text("{}"))
+            await asyncio.sleep(0.05)
+            waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            with self.assertRaises(asyncio.TimeoutError):
+                await converter.to_plain_text("{}", timeout=0.05)
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(asyncio.shield(running), 0.05)
+
+            # The running conversion keeps its slot until it ends
+            executor.gate.set()
+            assert await running == ""
+            assert await converter.to_plain_text("{}", timeout=5) == ""
+
+        try:
+            asyncio.run(convert())
+        finally:
+            executor.gate.set()
+            executor.shutdown()
+
+        # Neither the cancelled nor the timed out conversion was run
+        assert executor.submitted == 2
+
+    def test_async_to_plain_texts_reports_cancelled_conversions(self):
+        executor = GatedExecutor(max_workers=1)
+
+        async def convert():
+            converter = AsyncSlateConverter(executor, max_concurrency=2)
+            results = asyncio.ensure_future(converter.to_plain_texts(["{}", "{}"]))
+            await asyncio.sleep(0.05)
+            # The second conversion is still queued in the executor
+            executor.shutdown(wait=False, cancel_futures=True)
+            executor.gate.set()
+            return await results
+
+        try:
+            results = asyncio.run(convert())
+        finally:
+            executor.gate.set()
+            executor.shutdown()
+
+        assert results[0] == SlateConversionResult(text="")
+        assert results[1].text is None
+        assert results[1].error.startswith("CancelledError")
+
+    def test_async_converter_invalid_max_concurrency(self):
+        with self.assertRaises(ValueError):
+            AsyncSlateConverter(ThreadPoolExecutor(max_workers=1), max_concurrency=0)
+
+    def test_async_to_plain_text_does_not_block_event_loop(self):
+        document = json.loads(ANTUTU_DOCUMENT_JSON)
+        document["document"]["nodes"] *= 100
+        document_json = json.dumps(document)
+        inline_time = min(
+            timeit.repeat(
+                lambda: SlateDocument.parse(document_json).to_plain_text(),
+                number=1,
+                repeat=3,
+            )
+        )
+
+        async def measure_lag():
+            lags = []
+            async with AsyncSlateConverter(max_concurrency=2) as converter:
+                await converter.to_plain_text("{}")
+                conversions = asyncio.gather(
+                    *(converter.to_plain_text(document_json) for _ in range(4))
+                )
+                while not conversions.done():
+                    start = timeit.default_timer()
+                    await asyncio.sleep(0.001)
+                    lags.append(timeit.default_timer() - start - 0.001)
+                await conversions
+            return max(lags)
+
+        assert asyncio.run(measure_lag()) < inline_time / 2
+
+    def test_serialize_deeply_nested_nodes(self):
+        """
+        Ensure nesting deeper than the recursion limit does not raise RecursionError.
+        """
+        depth = sys.getrecursionlimit() * 2
+        node = SlateNode(type="paragraph", leaves=[SlateLeaf(text="deep")])
+        for index in range(depth):
+            node = SlateNode(type="link" if index % 2 else "block-quote", nodes=[node])
+        root = SlateNode(
+            type="numbered-list", nodes=[SlateNode(type="list-item", nodes=[node])]
+        )
+
+        result = SlateDocument(nodes=[root]).to_plain_text()
+        assert result == "deep."
+
+    def test_serialize_slate_nodes_nested_separators(self):
+        nodes = SlateDocument.parse(MIXED_DOCUMENT_JSON).nodes
+
+        result = serialize_slate_nodes(nodes, "\n", " ")
+        assert result == (
+            "after heading.first.,nested 1.5.   bold last. Tstray in line,"
+        )
+
+    def test_serialize_slate_leaves_separator(self):
+        leaves = [
+            SlateLeaf(text="a"),
+            SlateLeaf(text=" bold ", marks=[{"type": "bold"}]),
+            SlateLeaf(text=""),
+            SlateLeaf(text="(b"),
+            SlateLeaf(text=")"),
+        ]
+
+        assert serialize_slate_leaves(leaves, " ") == "a bold (b)"
+        assert serialize_slate_leaves(leaves, "") == "abold(b)"
+
+    def test_frozen_list(self):
+        frozen = FrozenList([{"type": "bold"}])
+
+        assert frozen == [{"type": "bold"}]
+        assert pickle.loads(pickle.dumps(frozen)) == frozen
+        assert isinstance(pickle.loads(pickle.dumps(frozen)), FrozenList)
+        for mutate in [
+            lambda: frozen.append(1),
+            lambda: frozen.extend([1]),
+            lambda: frozen.pop(),
+            lambda: frozen.clear(),
+            lambda: frozen.__setitem__(0, 1),
+            lambda: frozen.__delitem__(0),
+        ]:
+            with self.assertRaises(TypeError):
+                mutate()
+        assert frozen == [{"type": "bold"}]
+
+    def test_from_dict_shares_empty_lists_and_marks(self):
+        node = SlateNode.from_dict(
+            {
+                "type": "paragraph",
+                "leaves": [
+                    {"text": "a", "marks": [{"object": "mark", "type": "bold"}]},
+                    {"text": "b", "marks": [{"object": "mark", "type": "bold"}]},
+                    {"text": "c", "marks": [{"type": "bold", "data": {}}]},
+                    {"text": "d"},
+                ],
+            }
+        )
+
+        assert node.nodes is EMPTY_LIST
+        assert node.leaves[0].marks is node.leaves[1].marks
+        assert node.leaves[0].marks == [{"object": "mark", "type": "bold"}]
+        assert node.leaves[2].marks == [{"type": "bold", "data": {}}]
+        assert node.leaves[3].marks is EMPTY_LIST
+        assert not hasattr(node, "__dict__")
+        assert not hasattr(node.leaves[0], "__dict__")
+
+    def test_from_dict_uses_less_memory_and_time(self):
+        """
+        Ensure the compact representation is smaller and faster to build
+        than the previous plain dataclasses.
+        """
+        document = json.loads(ANTUTU_DOCUMENT_JSON)
+        nodes = document["document"]["nodes"] * 20
+        for node in nodes[:40]:
+            node["leaves"] = [
+                {"object": "leaf", "text": "bold", "marks": [{"type": "bold"}]},
+                {"object": "leaf", "text": " plain ", "marks": []},
+            ]
+
+        def build_compact():
+            return [SlateNode.from_dict(node) for node in nodes]
+
+        def build_legacy():
+            return [LegacySlateNode.from_dict(node) for node in nodes]
+
+        assert measure_retained_memory(build_compact) < 0.75 * measure_retained_memory(
+            build_legacy
+        )
+        compact_time, legacy_time = measure_best_times(build_compact, build_legacy)
+        assert compact_time < legacy_time
+
+    def test_text_only_parse(self):
+        for input_json in [ANTUTU_DOCUMENT_JSON, MIXED_DOCUMENT_JSON]:
+            expected = SlateDocument.parse(input_json).to_plain_text()
+
+            input_doc = SlateDocument.parse(input_json, text_only=True)
+            assert input_doc.to_plain_text() == expected
+
+        figure = SlateDocument.parse(ANTUTU_DOCUMENT_JSON, text_only=True).nodes[1]
+        assert figure.type == "figure"
+        assert figure.nodes is PRUNED_NODES
+
+    def test_text_only_keeps_skipped_nodes_without_children(self):
+        input_doc = SlateDocument.from_dict(
+            {
+                "document": {
+                    "nodes": [
+                        {"type": "heading-large", "leaves": [{"text": "title"}]},
+                        {"type": "paragraph", "leaves": [{"text": "body"}]},
+                    ]
+                }
+            },
+            text_only=True,
+        )
+
+        assert input_doc.nodes[0].leaves[0].text == "title"
+        assert input_doc.to_plain_text() == "title\nbody."
+
+    def test_text_only_parse_figure_heavy_document(self):
+        """
+        Ensure text-only parsing of a figure-heavy document allocates less and
+        is faster than a full parse.
+        """
+        document = json.loads(ANTUTU_DOCUMENT_JSON)
+        figure = document["document"]["nodes"][1]
+        paragraph = document["document"]["nodes"][2]
+        document["document"]["nodes"] = [figure, figure, figure, paragraph] * 100
+
+        def parse_full():
+            return SlateDocument.from_dict(document)
+
+        def parse_text_only():
+            return SlateDocument.from_dict(document, text_only=True)
+
+        assert parse_text_only().to_plain_text() == parse_full().to_plain_text()
+        assert measure_retained_memory(parse_text_only) < 0.5 * measure_retained_memory(
+            parse_full
+        )
+        text_only_time, full_time = measure_best_times(parse_text_only, parse_full)
+        assert text_only_time < full_time
+
+    def test_to_plain_text_does_not_modify_document(self):
+        input_doc = SlateDocument.parse(ANTUTU_DOCUMENT_JSON)
+
+        assert input_doc.to_plain_text() == ANTUTU_PLAIN_TEXT
+        assert input_doc.to_plain_text() == ANTUTU_PLAIN_TEXT
+        assert input_doc == SlateDocument.parse(ANTUTU_DOCUMENT_JSON)
+        list_items = input_doc.nodes[5].nodes
+        assert not any(list_item.is_last_in_list for list_item in list_items)
+
+    def test_to_plain_text_respects_is_last_in_list(self):
+        list_item = {
+            "type": "list-item",
+            "nodes": [
+                {
+                    "type": "paragraph",
+                    "nodes": [{"object": "text", "leaves": [{"text": "item"}]}],
+                }
+            ],
+        }
+        input_doc = SlateDocument.from_dict(
+            {
+                "document": {
+                    "nodes": [{"type": "bulleted-list", "nodes": [list_item] * 2}]
+                }
+            }
+        )
+        assert input_doc.to_plain_text() == "item, item."
+
+        input_doc.nodes[0].nodes[0].is_last_in_list = True
+        assert input_doc.to_plain_text() == "item. item."
+
+    def test_to_plain_text_shared_between_threads(self):
+        input_doc = SlateDocument.parse(ANTUTU_DOCUMENT_JSON)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: input_doc.to_plain_text(), range(64)))
+
+        assert results == [ANTUTU_PLAIN_TEXT] * 64
+
+    def test_freeze(self):
+        input_doc = SlateDocument.parse(ANTUTU_DOCUMENT_JSON)
+
+        frozen = input_doc.freeze()
+
+        assert frozen == input_doc
+        assert isinstance(frozen.nodes, FrozenList)
+        assert isinstance(frozen.nodes[2].nodes[0].leaves, FrozenList)
+        assert frozen.to_plain_text() == ANTUTU_PLAIN_TEXT
+        assert frozen.to_plain_text() is frozen.to_plain_text()
+
+        input_doc.nodes[2].nodes[0].leaves[0].text = "changed"
+        assert frozen.to_plain_text() == ANTUTU_PLAIN_TEXT
+        assert frozen.nodes[2].nodes[0].leaves[0].text != "changed"
+
+    def test_plain_text_cache(self):
+        cache = SlatePlainTextCache(max_entries=2)
+
+        assert cache.to_plain_text(ANTUTU_DOCUMENT_JSON) == ANTUTU_PLAIN_TEXT
+        assert cache.to_plain_text(ANTUTU_DOCUMENT_JSON) == ANTUTU_PLAIN_TEXT
+        assert cache.to_plain_text(ANTUTU_DOCUMENT_JSON.encode()) == ANTUTU_PLAIN_TEXT
+        assert cache.stats == SlateCacheStats(hits=2, misses=1)
+
+    def test_plain_text_cache_evicts_least_recently_used(self):
+        cache = SlatePlainTextCache(max_entries=2)
+        documents = [
+            json.dumps({"document": {"nodes": [{"leaves": [{"text": text}]}]}})
+            for text in ["one", "two", "three"]
+        ]
+
+        cache.to_plain_text(documents[0])
+        cache.to_plain_text(documents[1])
+        cache.to_plain_text(documents[0])
+        cache.to_plain_text(documents[2])
+        assert len(cache) == 2
+        assert cache.stats == SlateCacheStats(hits=1, misses=3, evictions=1)
+
+        assert cache.to_plain_text(documents[0]) == "one"
+        assert cache.to_plain_text(documents[1]) == "two"
+        assert cache.stats == SlateCacheStats(hits=2, misses=4, evictions=2)
+
+    def test_plain_text_cache_on_disk(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.sqlite")
+            with SlatePlainTextCache(path=path) as cache:
+                assert cache.to_plain_text(ANTUTU_DOCUMENT_JSON) == ANTUTU_PLAIN_TEXT
+                assert cache.stats.misses == 1
+
+            with SlatePlainTextCache(path=path) as cache:
+                assert cache.to_plain_text(ANTUTU_DOCUMENT_JSON) == ANTUTU_PLAIN_TEXT
+                assert cache.to_plain_text(ANTUTU_DOCUMENT_JSON) == ANTUTU_PLAIN_TEXT
+                assert cache.stats == SlateCacheStats(hits=1, disk_hits=1)
+
+                cache.clear()
+                assert cache.to_plain_text(ANTUTU_DOCUMENT_JSON) == ANTUTU_PLAIN_TEXT
+                assert cache.stats.misses == 1
+
+    def test_plain_text_cache_keys_include_registered_node_types(self):
+        document = json.dumps(
+            {"document": {"nodes": [{"type": "quote", "leaves": [{"text": "a"}]}]}}
+        )
+        self.addCleanup(unregister_node_type, "quote")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.sqlite")
+            with SlatePlainTextCache(path=path) as cache:
+                assert cache.to_plain_text(document) == "a"
+                register_node_type("quote", render=lambda node: "[quote]")
+                assert cache.to_plain_text(document) == "[quote]"
+
+            with SlatePlainTextCache(path=path) as cache:
+                assert cache.to_plain_text(document) == "[quote]"
+                unregister_node_type("quote")
+                assert cache.to_plain_text(document) == "a"
+                assert cache.stats == SlateCacheStats(disk_hits=2)
+
+    def test_plain_text_cache_does_not_cache_errors(self):
+        cache = SlatePlainTextCache()
+
+        for _ in range(2):
+            with self.assertRaises(json.JSONDecodeError):
+                cache.to_plain_text("{not json")
+        assert len(cache) == 0
+        assert cache.stats == SlateCacheStats(misses=2)
+
+    def test_plain_text_from_dict_matches_to_plain_text(self):
+        documents = [
+            json.loads(ANTUTU_DOCUMENT_JSON),
+            json.loads(MIXED_DOCUMENT_JSON),
+            {},
+            {"document": {}},
+            {
+                "document": {
+                    "nodes": [
+                        {
+                            "type": "paragraph",
+                            "leaves": [
+                                {"text": "plain "},
+                                {"text": " bold ", "marks": [{"type": "bold"}]},
+                                {"text": "  tail  "},
+                            ],
+                        },
+                        {"type": "heading-large", "leaves": [{"text": "title"}]},
+                        {"type": "paragraph", "nodes": [{"leaves": [{"text": "end"}]}]},
+                    ]
+                }
+            },
+        ]
+
+        for document in documents:
+            expected = SlateDocument.from_dict(document).to_plain_text()
+            assert plain_text_from_dict(document) == expected
+
+    def test_plain_text_from_dict_is_faster(self):
+        document = json.loads(ANTUTU_DOCUMENT_JSON)
+
+        def convert_dict():
+            return plain_text_from_dict(document)
+
+        def convert_nodes():
+            return SlateDocument.from_dict(document).to_plain_text()
+
+        dict_time, nodes_time = measure_best_times(
+            convert_dict, convert_nodes, number=20
+        )
+        assert dict_time < nodes_time
+
+    def test_extract_text(self):
+        document = SlateDocument(
+            nodes=[
+                SlateNode(
+                    type="paragraph",
+                    nodes=[
+                        SlateNode(leaves=[SlateLeaf(text="First sentence. Second one")])
+                    ],
+                ),
+                SlateNode(type="figure", nodes=[SlateNode(type="caption")]),
+                SlateNode(
+                    type="paragraph",
+                    nodes=[SlateNode(leaves=[SlateLeaf(text="Is it third? Yes")])],
+                ),
+            ]
+        )
+
+        extraction = document.extract_text()
+
+        assert extraction == SlateTextExtraction(
+            text="First sentence. Second one.\nIs it third? Yes.",
+            block_offsets=[(0, 27), (27, 27), (28, 45)],
+            sentence_offsets=[(0, 15), (16, 27), (28, 40), (41, 45)],
+            word_count=8,
+            char_count=45,
+            node_type_counts={"paragraph": 2, "": 2, "figure": 1},
+        )
+
+    def test_extract_text_matches_to_plain_text(self):
+        for document_json in [ANTUTU_DOCUMENT_JSON, MIXED_DOCUMENT_JSON, "{}"]:
+            document = SlateDocument.parse(document_json)
+            text = document.to_plain_text()
+
+            extraction = document.extract_text()
+
+            assert extraction.text == text
+            assert extraction.char_count == len(text)
+            assert extraction.word_count == len(text.split())
+            assert len(extraction.block_offsets) == len(document.nodes)
+            blocks_text = "".join(
+                text[start:end] for start, end in extraction.block_offsets
+            )
+            assert "".join(blocks_text.split()) == "".join(text.split())
+            sentences_text = "".join(
+                text[start:end] for start, end in extraction.sentence_offsets
+            )
+            assert "".join(sentences_text.split()) == "".join(text.split())
+
+        extraction = SlateDocument.parse(ANTUTU_DOCUMENT_JSON).extract_text()
+        assert extraction.node_type_counts["list-item"] == 10
+        assert extraction.node_type_counts["figure"] == 2
+        assert "caption" not in extraction.node_type_counts
+
+    def test_iter_plain_text_chunks(self):
+        document = SlateDocument(
+            nodes=[
+                SlateNode(
+                    type="paragraph",
+                    nodes=[SlateNode(leaves=[SlateLeaf(text=text)])],
+                )
+                for text in [
+                    "First sentence. Second one",
+                    "Is it third? Yes",
+                    "A sentence that is much too long to fit",
+                ]
+            ]
+        )
+
+        assert list(iter_plain_text_chunks(document, 30)) == [
+            "First sentence. Second one.",
+            "Is it third? Yes.",
+            "A sentence that is much too",
+            "long to fit.",
+        ]
+        assert list(iter_plain_text_chunks(document, 30, overlap=12)) == [
+            "First sentence. Second one.",
+            "Second one.\nIs it third? Yes.",
+            "A sentence that is much too",
+            "long to fit.",
+        ]
+        assert list(iter_plain_text_chunks(document, 4)) == [
+            "Firs",
+            "t",
+            "sent",
+            "ence",
+            ".",
+            "Seco",
+            "nd",
+            "one.",
+            "Is",
+            "it",
+            "thir",
+            "d?",
+            "Yes.",
+            "A",
+            "sent",
+            "ence",
+            "that",
+            "is",
+            "much",
+            "too",
+            "long",
+            "to",
+            "fit.",
+        ]
+
+    def test_iter_plain_text_chunks_matches_to_plain_text(self):
+        for document_json in [ANTUTU_DOCUMENT_JSON, MIXED_DOCUMENT_JSON]:
+            document = SlateDocument.parse(document_json)
+            text = document.to_plain_text()
+            for max_chars, overlap in [(1, 0), (20, 0), (80, 0), (80, 40), (10000, 0)]:
+                chunks = list(iter_plain_text_chunks(document, max_chars, overlap))
+                streamed = list(
+                    iter_plain_text_chunks(
+                        io.StringIO(document_json), max_chars, overlap, chunk_size=64
+                    )
+                )
+
+                assert chunks == streamed
+                for chunk in chunks:
+                    assert 0 < len(chunk) <= max_chars
+                    assert chunk in text
+                if not overlap:
+                    assert "".join("".join(chunks).split()) == "".join(text.split())
+
+        text = SlateDocument.parse(ANTUTU_DOCUMENT_JSON).to_plain_text()
+        assert list(iter_plain_text_chunks(ANTUTU_DOCUMENT_JSON, 10000)) == [text]
+
+    def test_iter_plain_text_chunks_rejects_invalid_sizes(self):
+        for max_chars, overlap in [(0, 0), (10, 10), (10, -1)]:
+            with self.assertRaises(ValueError):
+                next(iter_plain_text_chunks("{}", max_chars, overlap))
+
+    def test_clean_up_list_matches_two_pass_rules(self):
+        def two_pass_clean_up_list(text):
+            cleaned = MULTIPLE_DOTS_REGEX.sub(SENTENCE_SEPARATOR, text)
+            return DOT_SPACE_REGEX.sub(DOT_SEPARATOR, cleaned)
+
+        parts = [".", "..", ". ", ".\n", " ", "\t", "\n", "a", "é", "\u3000", "\x1c"]
+        texts = ["", "no dots", "one. two.. three...\nfour. . five"]
+        texts += [a + b + c for a in parts for b in parts for c in parts]
+        for text in texts:
+            assert clean_up_list(text) == two_pass_clean_up_list(text), repr(text)
+
+        text = "Nothing to clean up. Really"
+        assert clean_up_list(text) is text
+
+    def test_update_block_texts_matches_to_plain_text(self):
+        for document_json in [ANTUTU_DOCUMENT_JSON, MIXED_DOCUMENT_JSON]:
+            previous = SlateDocument.parse(document_json)
+            previous_texts = previous.to_block_texts()
+            assert previous_texts.text == previous.to_plain_text()
+
+            nodes = previous.nodes
+            paragraph = SlateNode(
+                type="paragraph", nodes=[SlateNode(leaves=[SlateLeaf(text="new")])]
+            )
+            edits = [
+                nodes,
+                [],
+                [paragraph] + nodes,
+                nodes + [paragraph],
+                nodes[:2] + [paragraph] + nodes[3:],
+                nodes[:1] + nodes[2:],
+                nodes[1:],
+                nodes[:-1],
+                list(reversed(nodes)),
+            ]
+            for edited_nodes in edits:
+                edited = SlateDocument(nodes=edited_nodes)
+                texts = edited.update_block_texts(previous, previous_texts)
+                assert texts.text == edited.to_plain_text()
+                assert texts == edited.to_block_texts()
+
+                # Blocks parsed again compare equal to the previous ones
+                reparsed = SlateDocument(nodes=copy.deepcopy(edited_nodes))
+                assert reparsed.update_block_texts(previous, previous_texts) == texts
+
+    def test_update_block_texts_rejects_other_texts(self):
+        previous = SlateDocument.parse(ANTUTU_DOCUMENT_JSON)
+        other_texts = SlateDocument.parse(MIXED_DOCUMENT_JSON).to_block_texts()
+
+        with self.assertRaises(ValueError):
+            previous.update_block_texts(previous, other_texts)
+
+    def test_update_block_texts_is_faster(self):
+        previous = SlateDocument(
+            nodes=SlateDocument.parse(ANTUTU_DOCUMENT_JSON).nodes * 50
+        )
+        previous_texts = previous.to_block_texts()
+        edited = SlateDocument(nodes=list(previous.nodes))
+        edited.nodes[200] = SlateNode(
+            type="paragraph", nodes=[SlateNode(leaves=[SlateLeaf(text="edited")])]
+        )
+
+        def update():
+            return edited.update_block_texts(previous, previous_texts)
+
+        update_time, full_time = measure_best_times(update, edited.to_plain_text)
+        assert update().text == edited.to_plain_text()
+        assert update_time * 5 < full_time
+
+    def test_update_block_texts_of_parsed_documents_is_faster(self):
+        document = json.loads(ANTUTU_DOCUMENT_JSON)
+        document["document"]["nodes"] *= 50
+        previous = SlateDocument.parse(json.dumps(document))
+        previous_texts = previous.to_block_texts()
+        document["document"]["nodes"][200] = {
+            "object": "block",
+            "type": "paragraph",
+            "nodes": [{"object": "text", "leaves": [{"text": "edited"}]}],
+        }
+        edited = SlateDocument.parse(json.dumps(document))
+
+        def update():
+            return edited.update_block_texts(previous, previous_texts)
+
+        update_time, full_time = measure_best_times(update, edited.to_plain_text)
+        assert update() == edited.to_block_texts()
+        assert update_time < full_time
+
+    def test_update_block_texts_of_deeply_nested_nodes(self):
+        def nested_document(text):
+            node = SlateNode(type="paragraph", leaves=[SlateLeaf(text=text)])
+            for _ in range(5000):
+                node = SlateNode(type="block-quote", nodes=[node])
+            first = SlateNode(type="paragraph", leaves=[SlateLeaf(text="first")])
+            return SlateDocument(nodes=[first, node])
+
+        previous = nested_document("deep")
+        previous_texts = previous.to_block_texts()
+        for text in ["deep", "deeper"]:
+            edited = nested_document(text)
+            texts = edited.update_block_texts(previous, previous_texts)
+            assert texts == edited.to_block_texts()
+
+    def test_jsonl_reader(self):
+        lines = [ANTUTU_DOCUMENT_JSON, "", "{not json", "  \r", MIXED_DOCUMENT_JSON]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "documents.jsonl")
+            with open(path, "w", encoding="utf-8", newline="") as file:
+                file.write("\r\n".join(lines))
+
+            reports = []
+            reader = SlateJSONLReader(path, progress=reports.append, max_slowest=2)
+            results = list(reader)
+            size = os.path.getsize(path)
+
+        assert results[0] == SlateLineResult(1, text=ANTUTU_PLAIN_TEXT)
+        assert results[1].line_number == 3
+        assert results[1].error.startswith("JSONDecodeError: ")
+        assert results[2] == SlateLineResult(
+            5, text=SlateDocument.parse(MIXED_DOCUMENT_JSON).to_plain_text()
+        )
+        assert len(results) == 3
+
+        stats = reader.stats
+        assert (stats.documents, stats.errors) == (3, 1)
+        assert stats.bytes_read == stats.total_bytes == size
+        assert stats.progress == 1.0
+        assert stats.documents_per_second > 0 and stats.megabytes_per_second > 0
+        assert len(stats.slowest) == 2
+        assert {line for _, line in stats.slowest} <= {1, 3, 5}
+        assert stats.slowest == sorted(stats.slowest, reverse=True)
+        assert reports[-1] is stats
+
+    def test_jsonl_reader_empty_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "empty.jsonl")
+            open(path, "wb").close()
+            reports = []
+            assert not list(SlateJSONLReader(path, progress=reports.append))
+
+        assert len(reports) == 1
+        assert reports[0].progress == 1.0
+
+    def test_jsonl_reader_reports_progress(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "documents.jsonl")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write("\n".join([ANTUTU_DOCUMENT_JSON] * 3) + "\n")
+
+            progress = []
+            reader = SlateJSONLReader(
+                path,
+                progress=lambda stats: progress.append(stats.progress),
+                progress_interval=0,
+            )
+            assert len(list(reader)) == 3
+
+        assert progress == sorted(progress)
+        assert len(progress) == 4
+        assert progress[0] == 1 / 3 and progress[-1] == 1.0
+
+    def test_register_node_type(self):
+        def block(node_type, *nodes):
+            return {"object": "block", "type": node_type, "nodes": list(nodes)}
+
+        def text(value):
+            return {"object": "text", "leaves": [{"object": "leaf", "text": value}]}
+
+        document = {
+            "document": {
+                "nodes": [
+                    block("quote", text("Quoted")),
+                    block("embed", text("Embedded")),
+                    block(
+                        "table",
+                        block("table-row", text("a"), text("b")),
+                        block("table-row", text("c")),
+                    ),
+                    block("tweet", text("ignored")),
+                    block(NODE_TYPE_PARAGRAPH, text("End")),
+                ]
+            }
+        }
+        for node_type in ["quote", "embed", "table", "tweet"]:
+            self.addCleanup(unregister_node_type, node_type)
+
+        default_text = plain_text_from_dict(document)
+        assert default_text == "Quoted\nEmbedded\nabc\nignored\nEnd."
+
+        register_node_type("quote", like=NODE_TYPE_PARAGRAPH)
+        register_node_type("embed", like=NODE_TYPE_FIGURE)
+        register_node_type("table", separator=NEWLINE)
+        register_node_type("tweet", render=lambda node: "[tweet]")
+        expected = "Quoted.\nab\nc\n[tweet]\nEnd."
+        assert plain_text_from_dict(document) == expected
+        assert SlateDocument.from_dict(document).to_plain_text() == expected
+        assert SlateDocument.from_dict(document, text_only=True).to_plain_text() == (
+            expected
+        )
+
+        for node_type in ["quote", "embed", "table", "tweet"]:
+            unregister_node_type(node_type)
+        assert plain_text_from_dict(document) == default_text
+
+    def test_register_node_type_overrides_builtin_types(self):
+        self.addCleanup(unregister_node_type, NODE_TYPE_FIGURE)
+        document = SlateDocument.parse(ANTUTU_DOCUMENT_JSON)
+
+        register_node_type(NODE_TYPE_FIGURE, render=lambda node: "[figure]")
+        assert document.to_plain_text().count("[figure]") == 2
+
+        unregister_node_type(NODE_TYPE_FIGURE)
+        assert document.to_plain_text() == ANTUTU_PLAIN_TEXT
+
+        with self.assertRaises(ValueError):
+            register_node_type("embed", like=NODE_TYPE_FIGURE, separator=NEWLINE)
+        with self.assertRaises(ValueError):
+            register_node_type("embed", like="paragrpah")
+
+    def test_slate_profiling(self):
+        document = SlateDocument.parse(ANTUTU_DOCUMENT_JSON)
+        with slate_profiling() as profile:
+            assert document.to_plain_text() == ANTUTU_PLAIN_TEXT
+            serialize_slate_leaves(document.nodes[2].nodes[0].leaves, "")
+        snapshot = profile.snapshot()
+
+        expected_counts = {
+            node_type or "text": count
+            for node_type, count in document.extract_text().node_type_counts.items()
+        }
+        expected_counts["text"] += 1
+        counts = {
+            node_type: stats["count"]
+            for node_type, stats in snapshot["node_types"].items()
+        }
+        assert counts == expected_counts
+        assert snapshot["max_depth"] == 4
+        # The list text, which continues on the line of the next paragraph
+        list_chars = snapshot["node_types"]["numbered-list"]["output_chars"]
+        list_line = ANTUTU_PLAIN_TEXT.splitlines()[3]
+        assert list_line[:list_chars].endswith("Oppo Find X8. ")
+        for stats in snapshot["node_types"].values():
+            assert stats["seconds"] >= 0
+        json.dumps(snapshot)
+
+        # Nothing is recorded once the block ends
+        document.to_plain_text()
+        assert profile.snapshot() == snapshot
+        profile.reset()
+        assert profile.snapshot() == {"max_depth": 0, "node_types": {}}
+
+    def test_slate_profiling_output_chars(self):
+        def list_item(text):
+            leaves = {"object": "text", "leaves": [{"text": text}]}
+            return {"object": "block", "type": "list-item", "nodes": [leaves]}
+
+        items = [list_item(text) for text in ["one.", "two.", "three."]]
+        document = {
+            "document": {
+                "nodes": [{"object": "block", "type": "bulleted-list", "nodes": items}]
+            }
+        }
+        with slate_profiling() as profile:
+            assert plain_text_from_dict(document) == "one. two. three."
+
+        output_chars = {
+            node_type: stats.output_chars
+            for node_type, stats in profile.node_types.items()
+        }
+        # Texts do not include the separators their list items write after them
+        assert output_chars == {
+            "text": len("one.two.three."),
+            "list-item": len("one. two. three. "),
+            "bulleted-list": len("one. two. three. "),
+        }
+
+    def test_slate_profiling_nesting(self):
+        outer_profile = SlateProfile()
+        with slate_profiling(outer_profile):
+            with slate_profiling() as inner_profile:
+                plain_text_from_dict(json.loads(MIXED_DOCUMENT_JSON))
+            plain_text_from_dict(json.loads(ANTUTU_DOCUMENT_JSON))
+
+        assert "heading-medium" in inner_profile.node_types
+        assert "heading-medium" not in outer_profile.node_types
+        assert outer_profile.node_types["figure"].count == 2
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,165 @@
+"""
+Module to encode and decode JSON with the fastest backend installed.
+
+orjson is used when it is installed, otherwise the standard library json.
+The backend is selected once at import, and can be chosen with the
+UPILS_JSON_BACKEND environment variable, set to "orjson" or "json".
+Both backends decode to the same values and encode to the same text.
+"""
+
+import json
+import os
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Union
+
+BACKEND_ENV_VAR = "UPILS_JSON_BACKEND"
+
+# JSON documents can be given as text, or as UTF-8, UTF-16 or UTF-32 bytes
+JSONInput = Union[str, bytes, bytearray, memoryview]
+
+# Containers checked before encoding with orjson. Larger values, including
+# self-referencing ones, are encoded by the standard library instead.
+MAX_CHECKED_CONTAINERS = 1024
+
+# Types encoded the same way by both backends
+_PLAIN_TYPES = frozenset([str, int, bool, type(None)])
+_STR_TYPE = frozenset([str])
+
+# Subclasses of these are encoded differently by orjson
+_NATIVE_TYPES = (str, int, float, dict, list, tuple, Enum)
+
+
+class StdlibJSONBackend:
+    """Encodes and decodes JSON with the standard library json."""
+
+    name = "json"
+
+    def __init__(self) -> None:
+        self._encoder = json.JSONEncoder(
+            ensure_ascii=False, separators=(",", ":"), default=str
+        )
+
+    def loads(self, data: JSONInput) -> Any:
+        """Decodes a JSON document."""
+        if isinstance(data, memoryview):
+            # Decode straight from the buffer, with the encoding json.loads
+            # would detect for bytes, instead of copying it to bytes first
+            encoding = json.detect_encoding(data[:4].tobytes())
+            data = str(data, encoding, "surrogatepass")
+        return json.loads(data)
+
+    def dumps(self, value: Any) -> str:
+        """
+        Encodes value as compact JSON, without escaping non-ASCII characters.
+        Values that JSON cannot represent are encoded as their str().
+        """
+        return self._encoder.encode(value)
+
+
+class OrjsonBackend(StdlibJSONBackend):
+    """
+    Encodes and decodes JSON with orjson, falling back to the standard
+    library for the values that orjson rejects or would encode differently.
+    """
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        super().__init__()
+        import orjson  # pylint: disable=import-outside-toplevel
+
+        self._orjson = orjson
+        # Let default=str handle these, like the standard library does
+        self._options = (
+            orjson.OPT_PASSTHROUGH_DATACLASS
+            | orjson.OPT_PASSTHROUGH_DATETIME
+            | orjson.OPT_PASSTHROUGH_SUBCLASS
+        )
+
+    def loads(self, data: JSONInput) -> Any:
+        """
+        Decodes a JSON document. Documents that orjson rejects, like NaN or
+        lone surrogates, are decoded by the standard library, which also
+        raises the same errors as StdlibJSONBackend.
+
+        orjson decodes integers that do not fit in 64 bits as floats.
+        """
+        try:
+            return self._orjson.loads(data)
+        except self._orjson.JSONDecodeError:
+            return super().loads(data)
+
+    def dumps(self, value: Any) -> str:
+        """See StdlibJSONBackend.dumps, which gives the same text."""
+        if _encodes_like_stdlib(value):
+            try:
+                return self._orjson.dumps(
+                    value, default=str, option=self._options
+                ).decode()
+            except self._orjson.JSONEncodeError:
+                pass
+        return super().dumps(value)
+
+
+def _encodes_like_stdlib(value: Any) -> bool:
+    """
+    Whether orjson encodes value the same way as the standard library.
+    Floats are written differently outside the range below, and subclasses
+    of JSON types, like enums, are not converted the same way.
+    """
+    stack = [value]
+    containers = 0
+    while stack:
+        value = stack.pop()
+        value_type = type(value)
+        if value_type is dict:
+            if not _STR_TYPE.issuperset(map(type, value)):
+                return False
+            items = value.values()
+        elif value_type is list or value_type is tuple:
+            items = value
+        elif value_type is float:
+            if not (value == 0 or 1e-4 <= abs(value) < 1e16):
+                return False
+            continue
+        elif _is_native_subclass(value_type):
+            return False
+        else:
+            continue
+
+        containers += 1
+        if containers > MAX_CHECKED_CONTAINERS:
+            return False
+        # Most containers only hold plain values, which need no further checks
+        if not _PLAIN_TYPES.issuperset(map(type, items)):
+            stack.extend(items)
+    return True
+
+
+@lru_cache(maxsize=256)
+def _is_native_subclass(value_type: type) -> bool:
+    """Whether value_type subclasses a type that orjson encodes natively."""
+    return value_type not in _PLAIN_TYPES and issubclass(value_type, _NATIVE_TYPES)
+
+
+def select_backend(name: str = "") -> StdlibJSONBackend:
+    """
+    Returns the backend with the given name. Without a name, orjson is used
+    when it is installed, otherwise the standard library.
+    """
+    if name == StdlibJSONBackend.name:
+        return StdlibJSONBackend()
+    if name == OrjsonBackend.name:
+        return OrjsonBackend()
+    if name:
+        raise ValueError(f"Unknown JSON backend {name!r}.")
+    try:
+        return OrjsonBackend()
+    except ImportError:
+        return StdlibJSONBackend()
+
+
+BACKEND = select_backend(os.environ.get(BACKEND_ENV_VAR, ""))
+loads = BACKEND.loads
+dumps = BACKEND.dumps
@@ -1,14 +1,58 @@
 """Module providing custom configuration for loguru"""
 
-import json
+import atexit
+import re
 import sys
-from typing import Union
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from json.encoder import encode_basestring
+from math import ceil, isfinite
+from string import Formatter
+from time import monotonic, perf_counter
+from typing import Any, Callable, Dict, Optional, Pattern, Tuple, Union
 
 from loguru import logger
 
+from upils import json_backend
+
+# Metrics and sinks are also imported from here, where they were defined first
+# pylint: disable=unused-import
+from upils.logging_metrics import (
+    DROPPED_BUFFER_FULL,
+    DROPPED_QUEUE_FULL,
+    DROPPED_RATE_LIMITED,
+    DROPPED_WRITE_FAILED,
+    LATENCY_BUCKETS,
+    LogMetrics,
+    active_log_metrics,
+    disable_log_metrics,
+    enable_log_metrics,
+    log_metrics,
+    log_metrics_snapshot,
+)
+from upils.logging_sinks import (
+    OVERFLOW_BLOCK,
+    OVERFLOW_DROP_NEW,
+    OVERFLOW_DROP_OLDEST,
+    OVERFLOW_POLICIES,
+    FileSink,
+    QueuedSink,
+    SocketSink,
+    measured_sink,
+    reset_after_fork,
+)
+
+# pylint: enable=unused-import
+
 
 def serialize(record):
     """Create custom serializer for logging"""
+    return _RECORD_ENCODER.encode(record)
+
+
+def _serialize_generic(record) -> str:
+    """Serializes any record, see serialize."""
     exception = record["exception"]
 
     if exception:
@@ -27,20 +71,420 @@ def serialize(record):
         "exception": exception,
         "extra": record["extra"],
     }
-    return json.dumps(subset, default=str, ensure_ascii=False) + "\n"
+    return json_backend.dumps(subset) + "\n"
+
+
+# Epoch seconds between which the timestamp of a record can be written from
+# its digits, as float repr gives the same text from 1e-4 up to 2**31, and
+# uses exponents below 1e-4
+_MIN_FAST_TIMESTAMP = 1e-4
+_MAX_FAST_TIMESTAMP = 2**31
+# Seconds whose formatted time is kept by a RecordEncoder
+_MAX_CACHED_SECONDS = 64
+
+
+class RecordEncoder:
+    """
+    Encodes log records as JSON lines, like the record shape of serialize
+    encoded with json_backend, but faster for the common records.
+
+    The level, file and line fragments are cached by level and call site,
+    the time is formatted from a per-second cache instead of str(), and extra
+    values of plain types are encoded directly. Records with an exception,
+    or extra values of other types, are encoded generically. Both give
+    byte-identical lines.
+
+    An encoder can be shared between threads.
+    """
+
+    def __init__(self) -> None:
+        self._level_prefixes: Dict[str, str] = {}
+        # File path to line to (file name, fragment)
+        self._call_sites: Dict[str, Dict[int, Tuple[str, str]]] = {}
+        # Epoch second to (tzinfo, date and time, UTC offset, second)
+        self._seconds: Dict[int, Tuple[Any, str, str, str]] = {}
+
+    def encode(self, record) -> str:
+        """Returns the JSON line of record, ending with a newline."""
+        extra = record["extra"]
+        if record["exception"]:
+            return _serialize_generic(record)
+        if extra:
+            extra_text = _encode_plain_dict(extra)
+            if extra_text is None:
+                return _serialize_generic(record)
+        else:
+            extra_text = "{}"
+
+        time = record["time"]
+        timestamp = time.timestamp()
+        if not _MIN_FAST_TIMESTAMP <= timestamp < _MAX_FAST_TIMESTAMP:
+            return _serialize_generic(record)
+        time_text = self._encode_time(time, int(timestamp))
+
+        level = record["level"].name
+        prefix = self._level_prefixes.get(level)
+        if prefix is None:
+            prefix = '{"level":' + encode_basestring(level) + ',"time":{"repr":"'
+            self._level_prefixes[level] = prefix
+
+        file = record["file"]
+        line = record["line"]
+        lines = self._call_sites.get(file.path)
+        if lines is None:
+            lines = self._call_sites.setdefault(file.path, {})
+        call_site = lines.get(line)
+        if call_site is None or call_site[0] != file.name:
+            fragment = (
+                ',"file":'
+                + json_backend.dumps({"name": file.name, "path": file.path})
+                + f',"line":{line},"exception":null,"extra":'
+            )
+            call_site = lines[line] = (file.name, fragment)
+
+        return (
+            prefix
+            + time_text
+            + '"message":'
+            + encode_basestring(record["message"])
+            + call_site[1]
+            + extra_text
+            + "}\n"
+        )
+
+    def _encode_time(self, time: datetime, second: int) -> str:
+        """Returns the time fragment, from the repr to the timestamp."""
+        entry = self._seconds.get(second)
+        if entry is None or entry[0] != time.tzinfo:
+            if len(self._seconds) >= _MAX_CACHED_SECONDS:
+                self._seconds.clear()
+            text = str(time.replace(microsecond=0))
+            entry = (time.tzinfo, text[:19], text[19:], str(second))
+            self._seconds[second] = entry
+
+        microsecond = time.microsecond
+        if not microsecond:
+            return f'{entry[1]}{entry[2]}","timestamp":{entry[3]}.0}},'
+        digits = f"{microsecond:06d}"
+        return (
+            f'{entry[1]}.{digits}{entry[2]}","timestamp":'
+            f'{entry[3]}.{digits.rstrip("0")}}},'
+        )
+
+
+def _encode_plain_dict(value: Dict) -> Optional[str]:
+    """
+    Encodes a dictionary of str keys and str, int, bool, None or finite float
+    values. Returns None when it has anything else.
+    """
+    items = []
+    for key, item in value.items():
+        item_type = type(item)
+        if item_type is str:
+            text = encode_basestring(item)
+        elif item_type is int:
+            text = int.__repr__(item)
+        elif item_type is bool:
+            text = "true" if item else "false"
+        elif item is None:
+            text = "null"
+        elif item_type is float and isfinite(item):
+            text = float.__repr__(item)
+        else:
+            return None
+        # Keys of any other type, including subclasses of str, take the generic path
+        if type(key) is not str:  # pylint: disable=unidiomatic-typecheck
+            return None
+        items.append(encode_basestring(key) + ":" + text)
+    return "{" + ",".join(items) + "}"
+
+
+_RECORD_ENCODER = RecordEncoder()
 
 
 def patching(record):
-    """Custom patching for logger serializer"""
+    """
+    Custom patching for logger serializer.
+    configure_logger uses format_record instead, which only serializes the
+    records that are written.
+    """
     record["extra"]["serialized"] = serialize(record)
 
 
-def configure_logger(level: Union[str, int]) -> logger:
+# Same text as the "{extra[serialized]}" format, to which loguru appends this
+SERIALIZED_FORMAT = "{extra[serialized]}\n{exception}"
+
+
+def format_record(record) -> str:
+    """
+    loguru format function writing records as JSON lines.
+
+    loguru only formats the records that a sink writes, so records filtered
+    out by every sink are never serialized. A record written by several
+    sinks is serialized once, and kept in extra["serialized"].
+    """
+    extra = record["extra"]
+    if "serialized" not in extra:
+        metrics = active_log_metrics()
+        if metrics is None:
+            extra["serialized"] = serialize(record)
+        else:
+            start = perf_counter()
+            line = extra["serialized"] = serialize(record)
+            metrics._add_serialized(  # pylint: disable=protected-access
+                record["level"].name, line, perf_counter() - start
+            )
+    return SERIALIZED_FORMAT
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """
+    Limit of the records logged by each call site. Only the first of every
+    sample_every records is kept, and with rate, at most rate kept records
+    per second are let through, in bursts of up to burst records, which
+    defaults to rate rounded up.
+    """
+
+    sample_every: int = 1
+    rate: Optional[float] = None
+    burst: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        if self.sample_every < 1:
+            raise ValueError("sample_every must be at least 1.")
+        if self.rate is not None and self.rate <= 0:
+            raise ValueError("rate must be positive.")
+        if self.burst is not None and self.burst < 1:
+            raise ValueError("burst must be at least 1.")
+
+
+class _CallSite:
+    """Records seen and suppressed at a call site, with its token bucket."""
+
+    __slots__ = (
+        "limit",
+        "burst",
+        "location",
+        "level",
+        "seen",
+        "tokens",
+        "updated",
+        "suppressed",
+        "reported",
+    )
+
+    def __init__(self, limit: RateLimit, location: str, level: str, now: float):
+        self.limit = limit
+        self.burst = limit.burst or ceil(limit.rate or 1)
+        self.location = location
+        self.level = level
+        self.seen = 0
+        self.tokens = float(self.burst)
+        self.updated = now
+        self.suppressed = 0
+        self.reported = now
+
+
+# Marks the call sites without a limit, so their records are let through at once
+_UNLIMITED = object()
+
+
+class LogRateLimiter:
+    """
+    Samples and rate limits the records of each call site, as a loguru
+    filter, see configure_logger.
+
+    The limit of a call site is the first of: the limit of the message
+    template matching its first message, the limit of its level, and
+    default. Templates are loguru messages like "user {} logged in", where
+    every field matches any text. Call sites without a limit cost a single
+    dictionary lookup per record.
+
+    Every summary_interval seconds, a call site that suppressed records logs
+    a WARNING "N records suppressed" record, with the call site in extra,
+    on its next record, or from a background thread once it goes quiet. The
+    thread starts with the first suppressed record, and close, also called
+    at exit, stops it and logs the summaries still due.
+
+    A limiter counts the records of a single handler, and can be shared
+    between threads. In a forked child, it starts counting again, leaving
+    the summaries of the records suppressed before the fork to the parent.
+    """
+
+    def __init__(
+        self,
+        default: Optional[RateLimit] = None,
+        levels: Optional[Dict[str, RateLimit]] = None,
+        messages: Optional[Dict[str, RateLimit]] = None,
+        summary_interval: float = 10.0,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        self.default = default
+        self.levels = dict(levels or {})
+        self.messages = [
+            (_template_pattern(template), limit)
+            for template, limit in (messages or {}).items()
+        ]
+        self.summary_interval = summary_interval
+        self._clock = clock
+        self._sites: Dict[Tuple[str, int, int], Any] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        reset_after_fork(self)
+
+    def __call__(self, record) -> bool:
+        """Whether record is let through."""
+        key = (record["file"].path, record["line"], record["level"].no)
+        site = self._sites.get(key)
+        if site is _UNLIMITED:
+            return True
+        if site is None:
+            site = self._add_site(key, record)
+            if site is _UNLIMITED:
+                return True
+
+        with self._lock:
+            now = self._clock()
+            site.seen += 1
+            limit = site.limit
+            allowed = (site.seen - 1) % limit.sample_every == 0
+            if allowed and limit.rate is not None:
+                site.tokens = min(
+                    site.burst, site.tokens + (now - site.updated) * limit.rate
+                )
+                site.updated = now
+                if site.tokens >= 1:
+                    site.tokens -= 1
+                else:
+                    allowed = False
+            if not allowed:
+                site.suppressed += 1
+                if self._thread is None:
+                    self._start()
+            suppressed = self._take_summary(site, now)
+        if suppressed:
+            _log_suppressed(site, suppressed)
+        if not allowed:
+            metrics = active_log_metrics()
+            if metrics is not None:
+                metrics._add_dropped(  # pylint: disable=protected-access
+                    DROPPED_RATE_LIMITED
+                )
+        return allowed
+
+    def flush_summaries(self) -> None:
+        """Logs the summary of every call site that suppressed records."""
+        self._log_summaries(force=True)
+
+    def close(self) -> None:
+        """Stops the summary thread, and logs the summaries still due."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping.set()
+            thread.join()
+            self._stopping.clear()
+            atexit.unregister(self.close)
+        self.flush_summaries()
+
+    def _reset_after_fork(self) -> None:
+        """Forgets the call sites of the parent, and its summary thread."""
+        self._sites = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        if self._thread is not None:
+            self._thread = None
+            atexit.unregister(self.close)
+
+    def _start(self) -> None:
+        """Starts the thread logging the summaries of quiet call sites."""
+        self._thread = threading.Thread(
+            target=self._run, name="upils-log-summaries", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self) -> None:
+        """Logs the summaries due every summary_interval, until closed."""
+        while not self._stopping.wait(self.summary_interval):
+            self._log_summaries()
+
+    def _log_summaries(self, force: bool = False) -> None:
+        """Logs the summaries that are due, or every summary with force."""
+        summaries = []
+        with self._lock:
+            now = self._clock()
+            for site in self._sites.values():
+                if site is not _UNLIMITED:
+                    suppressed = self._take_summary(site, now, force)
+                    if suppressed:
+                        summaries.append((site, suppressed))
+        for site, suppressed in summaries:
+            _log_suppressed(site, suppressed)
+
+    def _add_site(self, key: Tuple[str, int, int], record) -> Any:
+        """Finds the limit of a new call site."""
+        limit = None
+        if record["function"] != _log_suppressed.__name__ or key[0] != __file__:
+            for pattern, message_limit in self.messages:
+                if pattern.fullmatch(record["message"]):
+                    limit = message_limit
+                    break
+            else:
+                limit = self.levels.get(record["level"].name, self.default)
+        site = _UNLIMITED
+        if limit is not None and (limit.sample_every > 1 or limit.rate is not None):
+            site = _CallSite(
+                limit, f"{key[0]}:{key[1]}", record["level"].name, self._clock()
+            )
+        return self._sites.setdefault(key, site)
+
+    def _take_summary(self, site: _CallSite, now: float, force: bool = False) -> int:
+        """Returns the records to report as suppressed, if a summary is due."""
+        if not site.suppressed or (
+            not force and now - site.reported < self.summary_interval
+        ):
+            return 0
+        suppressed, site.suppressed, site.reported = site.suppressed, 0, now
+        return suppressed
+
+
+def _log_suppressed(site: _CallSite, suppressed: int) -> None:
+    """Logs the summary of the records a call site suppressed."""
+    logger.bind(
+        suppressed=suppressed, call_site=site.location, call_site_level=site.level
+    ).warning("{} records suppressed", suppressed)
+
+
+def _template_pattern(template: str) -> Pattern:
+    """Compiles a message template into a pattern where every field matches any text."""
+    parts = []
+    for literal, field_name, _, _ in Formatter().parse(template):
+        parts.append(re.escape(literal))
+        if field_name is not None:
+            parts.append(".*?")
+    return re.compile("".join(parts), re.DOTALL)
+
+
+def configure_logger(
+    level: Union[str, int],
+    sink: Any = None,
+    rate_limiter: Optional[LogRateLimiter] = None,
+) -> logger:
     """
     Configuration for custom loguru
 
     :param level: logging level. can be str or int.
     https://docs.python.org/3/library/logging.html#logging-levels
+    :param sink: where log lines are written, stdout by default. Can be anything
+    loguru accepts as a sink, like a QueuedSink to write from a background thread,
+    or a FileSink or SocketSink to write batches of lines to a file or socket.
+    :param rate_limiter: samples and rate limits the records of every call site.
+
+    When log metrics are enabled, the writes of a file-like sink are measured.
+    QueuedSink, FileSink and SocketSink measure their batch writes themselves.
     """
 
     # Remove default option from loguru, if we don't remove this, it will result in duplicated logs.
@@ -51,11 +495,15 @@ def configure_logger(level: Union[str, int]) -> logger:
     except ValueError:
         pass
 
-    loguru_logger = logger.patch(patching)  # use custom serializer
-    loguru_logger.add(
-        sink=sys.stdout,
+    if sink is None:
+        sink = sys.stdout
+    sink = measured_sink(sink)
+
+    logger.add(
+        sink=sink,
         level=level,
-        format="{extra[serialized]}",
+        format=format_record,  # use custom serializer
+        filter=rate_limiter,
     )
 
-    return loguru_logger
+    return logger
@@ -0,0 +1,205 @@
+"""Module measuring the logging done by upils.logging"""
+
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from loguru import logger
+
+DROPPED_RATE_LIMITED = "rate_limited"
+DROPPED_QUEUE_FULL = "queue_full"
+DROPPED_BUFFER_FULL = "buffer_full"
+DROPPED_WRITE_FAILED = "write_failed"
+# Upper bounds in seconds of the buckets of LogMetrics histograms
+LATENCY_BUCKETS = (
+    1e-6,
+    2.5e-6,
+    5e-6,
+    1e-5,
+    2.5e-5,
+    5e-5,
+    1e-4,
+    2.5e-4,
+    5e-4,
+    1e-3,
+    1e-2,
+    1e-1,
+    1.0,
+)
+
+
+class _Histogram:
+    """Counts of durations in seconds, by bucket of LATENCY_BUCKETS."""
+
+    def __init__(self) -> None:
+        # The last bucket counts the durations above every bound
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.seconds = 0.0
+
+    def add(self, seconds: float) -> None:
+        """Counts a duration in the bucket of the first bound at or above it."""
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.seconds += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the histogram as a dictionary, where buckets are pairs of
+        upper bound and count, and the last bound is None.
+        """
+        return {
+            "count": self.count,
+            "seconds": self.seconds,
+            "buckets": [
+                [bound, count]
+                for bound, count in zip(LATENCY_BUCKETS + (None,), self.counts)
+            ],
+        }
+
+
+class LogMetrics:
+    """
+    Counters of the logging done while metrics are enabled: records
+    serialized by level, serialized bytes, a histogram of serialization
+    times, a histogram of sink write times, the sink writes that failed,
+    records dropped by reason, and the times a QueuedSink blocked a logging
+    call because it was full.
+
+    QueuedSink, FileSink and SocketSink measure the writes of their batches,
+    including those that fail, and count the lines of a failed QueuedSink
+    batch as dropped. Other sinks have every line write measured when they
+    are given to configure_logger while metrics are enabled, and are
+    file-like objects.
+    """
+
+    def __init__(self) -> None:
+        self.records: Dict[str, int] = {}
+        self.serialized_bytes = 0
+        self.serialization = _Histogram()
+        self.sink_writes = _Histogram()
+        self.failed_sink_writes = 0
+        self.dropped: Dict[str, int] = {}
+        self.sink_blocked = 0
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the counters as a dictionary, which can be encoded as JSON."""
+        with self._lock:
+            return {
+                "records": dict(self.records),
+                "serialized_bytes": self.serialized_bytes,
+                "serialization": self.serialization.snapshot(),
+                "sink_writes": self.sink_writes.snapshot(),
+                "failed_sink_writes": self.failed_sink_writes,
+                "dropped": dict(self.dropped),
+                "sink_blocked": self.sink_blocked,
+            }
+
+    def reset(self) -> None:
+        """Clears the counters recorded so far."""
+        with self._lock:
+            self.records = {}
+            self.serialized_bytes = 0
+            self.serialization = _Histogram()
+            self.sink_writes = _Histogram()
+            self.failed_sink_writes = 0
+            self.dropped = {}
+            self.sink_blocked = 0
+
+    def _add_serialized(self, level: str, line: str, seconds: float) -> None:
+        size = len(line) if line.isascii() else len(line.encode("utf-8"))
+        with self._lock:
+            self.records[level] = self.records.get(level, 0) + 1
+            self.serialized_bytes += size
+            self.serialization.add(seconds)
+
+    def _add_sink_write(self, seconds: float, failed: bool = False) -> None:
+        with self._lock:
+            self.sink_writes.add(seconds)
+            if failed:
+                self.failed_sink_writes += 1
+
+    def _add_dropped(self, reason: str, count: int = 1) -> None:
+        with self._lock:
+            self.dropped[reason] = self.dropped.get(reason, 0) + count
+
+    def _add_sink_blocked(self) -> None:
+        with self._lock:
+            self.sink_blocked += 1
+
+
+# Metrics recording the logging done, set by enable_log_metrics
+_active_metrics: Optional[LogMetrics] = None
+# Stops the thread logging the metrics periodically
+_metrics_reporter_stop: Optional[threading.Event] = None
+
+
+def enable_log_metrics(
+    metrics: Optional[LogMetrics] = None, interval: Optional[float] = None
+) -> LogMetrics:
+    """
+    Starts recording the logging done in metrics, or in a new LogMetrics,
+    and returns it. With interval, the snapshot of the metrics is also
+    logged every interval seconds, as an INFO "logging metrics" record with
+    the snapshot in extra["log_metrics"].
+    """
+    global _active_metrics, _metrics_reporter_stop  # pylint: disable=global-statement
+    if interval is not None and interval <= 0:
+        raise ValueError("interval must be positive.")
+    disable_log_metrics()
+    _active_metrics = metrics or LogMetrics()
+    if interval is not None:
+        _metrics_reporter_stop = threading.Event()
+        threading.Thread(
+            target=_report_metrics,
+            args=(_active_metrics, interval, _metrics_reporter_stop),
+            name="upils-log-metrics",
+            daemon=True,
+        ).start()
+    return _active_metrics
+
+
+def disable_log_metrics() -> None:
+    """Stops recording the logging done, and logging the metrics periodically."""
+    global _active_metrics, _metrics_reporter_stop  # pylint: disable=global-statement
+    if _metrics_reporter_stop is not None:
+        _metrics_reporter_stop.set()
+    _active_metrics = None
+    _metrics_reporter_stop = None
+
+
+@contextmanager
+def log_metrics(metrics: Optional[LogMetrics] = None) -> Iterator[LogMetrics]:
+    """
+    Records the logging done inside the with block, then restores the
+    metrics that were enabled before, if any, without periodic logging.
+    """
+    previous = _active_metrics
+    try:
+        yield enable_log_metrics(metrics)
+    finally:
+        if previous is None:
+            disable_log_metrics()
+        else:
+            enable_log_metrics(previous)
+
+
+def log_metrics_snapshot() -> Optional[Dict[str, Any]]:
+    """Returns the snapshot of the enabled metrics, or None when disabled."""
+    metrics = _active_metrics
+    return None if metrics is None else metrics.snapshot()
+
+
+def _report_metrics(
+    metrics: LogMetrics, interval: float, stop: threading.Event
+) -> None:
+    """Logs the snapshot of metrics every interval seconds, until stopped."""
+    while not stop.wait(interval):
+        logger.bind(log_metrics=metrics.snapshot()).info("logging metrics")
+
+
+def active_log_metrics() -> Optional[LogMetrics]:
+    """Returns the enabled metrics, or None when disabled."""
+    return _active_metrics
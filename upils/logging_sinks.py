@@ -0,0 +1,542 @@
+"""Module providing loguru sinks writing log lines from background threads"""
+
+import os
+import socket
+import sys
+import threading
+import weakref
+from collections import deque
+from time import monotonic, perf_counter
+from typing import Any, Deque, List, Optional, TextIO, Tuple, Union
+
+from upils.logging_metrics import (
+    DROPPED_BUFFER_FULL,
+    DROPPED_QUEUE_FULL,
+    DROPPED_WRITE_FAILED,
+    active_log_metrics,
+)
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP_OLDEST = "drop-oldest"
+OVERFLOW_DROP_NEW = "drop-new"
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEW)
+
+# Sinks and limiters whose threads and locks are reset in forked children
+_fork_resets: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+
+def reset_after_fork(instance: Any) -> None:
+    """
+    Calls the _reset_after_fork method of instance in forked children, where
+    its threads are gone and its locks may have been held by those threads,
+    for as long as instance is alive.
+    """
+    _fork_resets.add(instance)
+
+
+def _reset_forked_child() -> None:
+    """Resets the sinks and limiters in a forked child."""
+    for instance in list(_fork_resets):
+        instance._reset_after_fork()  # pylint: disable=protected-access
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_forked_child)
+
+
+class _MeteredSink:
+    """
+    Wraps a file-like sink, to measure its writes while metrics are enabled.
+    Flushes the stream itself, so that flushing is measured too.
+    """
+
+    def __init__(self, stream: Any) -> None:
+        self.stream = stream
+        flush = getattr(stream, "flush", None)
+        self._flush = flush if callable(flush) else None
+
+    def write(self, message: str) -> None:
+        """Writes and flushes a log line, measuring how long it takes."""
+        metrics = active_log_metrics()
+        start = perf_counter()
+        self.stream.write(message)
+        if self._flush is not None:
+            self._flush()
+        if metrics is not None:
+            metrics._add_sink_write(  # pylint: disable=protected-access
+                perf_counter() - start
+            )
+
+    def stop(self) -> None:
+        """Stops the stream, if it can be stopped like a sink."""
+        stop = getattr(self.stream, "stop", None)
+        if callable(stop):
+            stop()
+
+
+class QueuedSink:
+    """
+    Sink writing log lines to a stream, stdout by default, from a background
+    thread, so logging calls never wait on a slow stream.
+
+    Lines go into a queue of at most max_size lines, and the writer thread
+    writes everything queued at once, flushing the stream after each batch.
+    When the queue is full, overflow decides what happens to a new line:
+    OVERFLOW_BLOCK waits for room, OVERFLOW_DROP_OLDEST drops the oldest
+    queued line and OVERFLOW_DROP_NEW drops the new line. Dropped lines are
+    counted in dropped, and lines the stream failed to write in failed.
+
+    loguru stops the sink when its handler is removed, including at exit,
+    which writes the lines still queued. The sink can be added again after.
+    In a forked child, the sink starts empty, with a new writer thread.
+    """
+
+    def __init__(
+        self,
+        stream: Optional[TextIO] = None,
+        max_size: int = 10000,
+        overflow: str = OVERFLOW_BLOCK,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1.")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {', '.join(OVERFLOW_POLICIES)}.")
+        self.stream = sys.stdout if stream is None else stream
+        self.max_size = max_size
+        self.overflow = overflow
+        self.dropped = 0
+        self.failed = 0
+        self._queue: Deque[str] = deque()
+        # Lines taken by the writer thread and not written yet
+        self._writing = 0
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._written = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        reset_after_fork(self)
+
+    def write(self, message: str) -> None:
+        """Queues a log line, called by loguru for every record."""
+        with self._lock:
+            if self._thread is None:
+                self._start()
+            queue = self._queue
+            if len(queue) >= self.max_size:
+                metrics = active_log_metrics()
+                if self.overflow == OVERFLOW_DROP_NEW:
+                    self.dropped += 1
+                    if metrics is not None:
+                        metrics._add_dropped(  # pylint: disable=protected-access
+                            DROPPED_QUEUE_FULL
+                        )
+                    return
+                if self.overflow == OVERFLOW_DROP_OLDEST:
+                    queue.popleft()
+                    self.dropped += 1
+                    if metrics is not None:
+                        metrics._add_dropped(  # pylint: disable=protected-access
+                            DROPPED_QUEUE_FULL
+                        )
+                else:
+                    if metrics is not None:
+                        metrics._add_sink_blocked()  # pylint: disable=protected-access
+                    while len(queue) >= self.max_size:
+                        self._not_full.wait()
+            queue.append(message)
+            if len(queue) == 1:
+                self._not_empty.notify()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until every line queued so far is written.
+        Returns False if it is not after timeout seconds.
+        """
+        with self._lock:
+            return self._written.wait_for(
+                lambda: not self._queue and not self._writing, timeout
+            )
+
+    def stop(self) -> None:
+        """Writes the lines still queued, then stops the writer thread."""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stopping = True
+            self._not_empty.notify()
+        thread.join()
+        with self._lock:
+            self._thread = None
+            self._stopping = False
+
+    def _reset_after_fork(self) -> None:
+        """Drops the lines queued by the parent, which writes them itself."""
+        self._queue = deque()
+        self._writing = 0
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._written = threading.Condition(self._lock)
+        self._thread = None
+        self._stopping = False
+
+    def _start(self) -> None:
+        """Starts the writer thread, once the first line is queued."""
+        self._thread = threading.Thread(
+            target=self._run, name="upils-log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        """Writes every queued line in batches, until stopped."""
+        while True:
+            with self._lock:
+                while not self._queue and not self._stopping:
+                    self._not_empty.wait()
+                if not self._queue:
+                    return
+                batch: List[str] = list(self._queue)
+                self._queue.clear()
+                self._writing = len(batch)
+                self._not_full.notify_all()
+            metrics = active_log_metrics()
+            start = perf_counter()
+            failed = False
+            try:
+                self.stream.write("".join(batch))
+                flush = getattr(self.stream, "flush", None)
+                if flush is not None:
+                    flush()
+            except Exception:  # pylint: disable=broad-exception-caught
+                failed = True
+                with self._lock:
+                    self.failed += len(batch)
+            if metrics is not None:
+                # pylint: disable=protected-access
+                metrics._add_sink_write(perf_counter() - start, failed)
+                if failed:
+                    metrics._add_dropped(DROPPED_WRITE_FAILED, len(batch))
+            with self._lock:
+                self._writing = 0
+                self._written.notify_all()
+
+
+class _BufferedSink:
+    """
+    Base of the sinks buffering log lines and writing them in batches from
+    a background thread, once flush_bytes are buffered, or every
+    flush_interval seconds. Logging calls never wait on the writes.
+    Subclasses write a batch in _write_batch, and close what it opened in
+    _close.
+
+    A batch that fails to be written goes back to the buffer and is retried
+    with the next lines, after retry_interval seconds. A batch failing midway
+    may be written again in part. Beyond max_buffer_bytes buffered, besides
+    the batch being written, the oldest lines are dropped and counted in
+    dropped. Batches written are counted in batches.
+
+    There is no flush method, as loguru would call it after every line.
+    loguru stops the sink when its handler is removed, including at exit,
+    which writes the lines still buffered. In a forked child, the sink starts
+    empty, and opens its own file or connection.
+    """
+
+    def __init__(
+        self,
+        flush_bytes: int,
+        flush_interval: float,
+        max_buffer_bytes: int,
+        retry_interval: float,
+    ) -> None:
+        if flush_bytes < 1:
+            raise ValueError("flush_bytes must be at least 1.")
+        if flush_interval <= 0:
+            raise ValueError("flush_interval must be positive.")
+        if max_buffer_bytes < flush_bytes:
+            raise ValueError("max_buffer_bytes must be at least flush_bytes.")
+        if retry_interval < 0:
+            raise ValueError("retry_interval must not be negative.")
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.max_buffer_bytes = max_buffer_bytes
+        self.retry_interval = retry_interval
+        self.dropped = 0
+        self.batches = 0
+        self._lines: Deque[bytes] = deque()
+        self._size = 0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        # Set once flush_bytes are buffered, to write them before flush_interval
+        self._full = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        reset_after_fork(self)
+
+    def write(self, message: str) -> None:
+        """Buffers a log line, called by loguru for every record."""
+        line = message.encode("utf-8")
+        with self._lock:
+            if self._thread is None:
+                self._start()
+            self._lines.append(line)
+            self._size += len(line)
+            if self._size > self.max_buffer_bytes:
+                self._drop_oldest()
+            full = self._size >= self.flush_bytes
+        if full:
+            self._full.set()
+
+    def stop(self) -> None:
+        """Writes the lines still buffered, then closes the sink."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping.set()
+            self._full.set()
+            thread.join()
+            self._stopping.clear()
+            self._full.clear()
+        self._flush()
+        self._close()
+
+    def _reset_after_fork(self) -> None:
+        """
+        Drops the lines buffered by the parent, which writes them itself, and
+        closes the file or socket copied from it, without closing the parent's.
+        """
+        self._lines = deque()
+        self._size = 0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self._full = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._close()
+
+    def _start(self) -> None:
+        """Starts the writer thread, once the first line is buffered."""
+        self._thread = threading.Thread(
+            target=self._run, name="upils-log-flusher", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        """Writes the buffered lines in batches, until stopped."""
+        stopping = self._stopping
+        while not stopping.is_set():
+            delay = self._retry_at - monotonic()
+            if delay > 0:
+                # Waits for the retry after a failed batch, however full the buffer
+                stopping.wait(delay)
+                continue
+            self._full.wait(self.flush_interval)
+            self._full.clear()
+            if not stopping.is_set():
+                self._flush()
+
+    def _flush(self) -> None:
+        """
+        Writes every buffered line as one batch, without holding the lock, so
+        lines are buffered meanwhile. The batch is buffered again if it fails.
+        """
+        with self._lock:
+            if not self._lines:
+                return
+            lines, size = self._lines, self._size
+            self._lines, self._size = deque(), 0
+        metrics = active_log_metrics()
+        start = perf_counter()
+        try:
+            self._write_batch(b"".join(lines))
+        except Exception:  # pylint: disable=broad-exception-caught
+            if metrics is not None:
+                metrics._add_sink_write(  # pylint: disable=protected-access
+                    perf_counter() - start, failed=True
+                )
+            with self._lock:
+                lines.extend(self._lines)
+                self._lines = lines
+                self._size += size
+                if self._size > self.max_buffer_bytes:
+                    self._drop_oldest()
+                self._retry_at = monotonic() + self.retry_interval
+            return
+        if metrics is not None:
+            metrics._add_sink_write(  # pylint: disable=protected-access
+                perf_counter() - start
+            )
+        self.batches += 1
+
+    def _drop_oldest(self) -> None:
+        """Drops the oldest lines until at most max_buffer_bytes are buffered."""
+        dropped = 0
+        while self._size > self.max_buffer_bytes:
+            self._size -= len(self._lines.popleft())
+            dropped += 1
+        self.dropped += dropped
+        metrics = active_log_metrics()
+        if metrics is not None:
+            metrics._add_dropped(  # pylint: disable=protected-access
+                DROPPED_BUFFER_FULL, dropped
+            )
+
+    def _write_batch(self, data: bytes) -> None:
+        raise NotImplementedError
+
+    def _close(self) -> None:
+        raise NotImplementedError
+
+
+class FileSink(_BufferedSink):
+    """
+    Sink appending log lines to a file in batches, with one write per batch.
+
+    The file is rotated before a batch would make it larger than max_bytes,
+    and every rotate_interval seconds from when the sink opened it. Rotating
+    renames path to path.1, path.1 to path.2 and so on, keeping backup_count
+    old files, or none when it is 0. A file that fails to be written is
+    opened again for the next batch, so it can be moved away by other tools.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: Optional[int] = None,
+        rotate_interval: Optional[float] = None,
+        backup_count: int = 5,
+        flush_bytes: int = 64 * 1024,
+        flush_interval: float = 1.0,
+        max_buffer_bytes: int = 8 * 1024**2,
+        retry_interval: float = 1.0,
+    ) -> None:
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1.")
+        if rotate_interval is not None and rotate_interval <= 0:
+            raise ValueError("rotate_interval must be positive.")
+        if backup_count < 0:
+            raise ValueError("backup_count must not be negative.")
+        super().__init__(flush_bytes, flush_interval, max_buffer_bytes, retry_interval)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self._file = None
+        self._file_size = 0
+        self._rotate_at = 0.0
+
+    def _write_batch(self, data: bytes) -> None:
+        try:
+            if self._file is None:
+                self._open()
+            if self._should_rotate(len(data)):
+                self._rotate()
+            view = memoryview(data)
+            while view:
+                written = self._file.write(view)
+                self._file_size += written
+                view = view[written:]
+        except OSError:
+            self._close()
+            raise
+
+    def _should_rotate(self, size: int) -> bool:
+        """Returns whether the file is rotated before writing size bytes."""
+        if self.rotate_interval is not None and monotonic() >= self._rotate_at:
+            return True
+        return (
+            self.max_bytes is not None
+            and self._file_size > 0
+            and self._file_size + size > self.max_bytes
+        )
+
+    def _open(self) -> None:
+        """Opens the file for appending, without buffering."""
+        # pylint: disable=consider-using-with
+        self._file = open(self.path, "ab", buffering=0)
+        self._file_size = os.fstat(self._file.fileno()).st_size
+        if self.rotate_interval is not None:
+            self._rotate_at = monotonic() + self.rotate_interval
+
+    def _rotate(self) -> None:
+        """Moves the file to the first backup, shifting the older ones."""
+        self._close()
+        if self.backup_count:
+            for index in range(self.backup_count - 1, 0, -1):
+                backup = f"{self.path}.{index}"
+                if os.path.exists(backup):
+                    os.replace(backup, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def _close(self) -> None:
+        if self._file is not None:
+            file, self._file = self._file, None
+            file.close()
+
+
+class SocketSink(_BufferedSink):
+    """
+    Sink sending log lines to a stream socket in batches, with one send per
+    batch. address is the path of a Unix domain socket, or a (host, port)
+    TCP address. The sink connects on the first batch, and connects again
+    for the next batch when sending one fails. Connecting and sending give
+    up after timeout seconds.
+    """
+
+    def __init__(
+        self,
+        address: Union[str, Tuple[str, int]],
+        timeout: float = 5.0,
+        flush_bytes: int = 64 * 1024,
+        flush_interval: float = 1.0,
+        max_buffer_bytes: int = 8 * 1024**2,
+        retry_interval: float = 1.0,
+    ) -> None:
+        super().__init__(flush_bytes, flush_interval, max_buffer_bytes, retry_interval)
+        self.address = address
+        self.timeout = timeout
+        self._socket: Optional[socket.socket] = None
+
+    def _write_batch(self, data: bytes) -> None:
+        try:
+            if self._socket is None:
+                self._socket = self._connect()
+            self._socket.sendall(data)
+        except OSError:
+            self._close()
+            raise
+
+    def _connect(self) -> socket.socket:
+        """Connects to the address."""
+        if not isinstance(self.address, str):
+            return socket.create_connection(self.address, self.timeout)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.timeout)
+            sock.connect(self.address)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _close(self) -> None:
+        if self._socket is not None:
+            sock, self._socket = self._socket, None
+            sock.close()
+
+
+def measured_sink(sink: Any) -> Any:
+    """
+    Wraps a file-like sink to measure its writes while log metrics are
+    enabled. QueuedSink, FileSink and SocketSink measure their batch writes
+    themselves, and are returned as they are, like any other sink.
+    """
+    if active_log_metrics() is None or isinstance(sink, (QueuedSink, _BufferedSink)):
+        return sink
+    if callable(getattr(sink, "write", None)):
+        return _MeteredSink(sink)
+    return sink
@@ -0,0 +1,238 @@
+"""
+Command-line tool to convert Slate documents into plain-text in bulk.
+
+Reads JSONL files of Slate document JSONs, one document per line, from
+stdin, files or directories of *.jsonl files, converts them on a process
+pool and writes one result per document, in input order. A file ending in
+.json, or stdin with --json, is read as a single document. Installed as
+upils-slate-to-text.
+"""
+
+import argparse
+import heapq
+import os
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Deque, Iterator, List, Optional, TextIO, Tuple
+
+from upils import json_backend
+from upils.slate_converter import BATCH_CHUNK_SIZE, batch_to_plain_text
+
+STDIN = "-"
+FORMAT_JSONL = "jsonl"
+FORMAT_TEXT = "text"
+
+
+@dataclass
+class ConversionStats:
+    """
+    Counters of a bulk conversion. slowest holds the seconds taken by the
+    slowest documents and their locations, slowest first.
+    """
+
+    documents: int = 0
+    errors: int = 0
+    bytes_read: int = 0
+    elapsed: float = 0.0
+    slowest: List[Tuple[float, str]] = field(default_factory=list)
+
+    @property
+    def documents_per_second(self) -> float:
+        """Documents converted per second of wall-clock time."""
+        return self.documents / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        """Megabytes of input read per second of wall-clock time."""
+        return self.bytes_read / 1024**2 / self.elapsed if self.elapsed else 0.0
+
+    def report(self) -> str:
+        """Returns the stats as a human-readable report."""
+        lines = [
+            f"documents: {self.documents}",
+            f"errors: {self.errors}",
+            f"elapsed: {self.elapsed:.2f}s",
+            f"documents/s: {self.documents_per_second:.1f}",
+            f"MB/s: {self.megabytes_per_second:.2f}",
+        ]
+        if self.slowest:
+            lines.append("slowest documents:")
+            lines.extend(
+                f"  {seconds * 1000:.1f}ms {location}"
+                for seconds, location in self.slowest
+            )
+        return "\n".join(lines)
+
+
+def iter_documents(
+    paths: List[str], stdin: BinaryIO, stdin_json: bool = False
+) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yields every document of the inputs with its location, as "path:line".
+    Directories are read in name order, and blank lines are skipped. With
+    stdin_json, stdin is read as a single document.
+    """
+    for path in paths or [STDIN]:
+        if path == STDIN:
+            if stdin_json:
+                yield "<stdin>", stdin.read()
+            else:
+                yield from _iter_lines("<stdin>", stdin)
+        elif os.path.isdir(path):
+            for file_path in sorted(Path(path).glob("*.jsonl")):
+                with open(file_path, "rb") as file:
+                    yield from _iter_lines(str(file_path), file)
+        elif path.endswith(".json"):
+            with open(path, "rb") as file:
+                yield path, file.read()
+        else:
+            with open(path, "rb") as file:
+                yield from _iter_lines(path, file)
+
+
+def _iter_lines(name: str, file: BinaryIO) -> Iterator[Tuple[str, bytes]]:
+    """Yields the non-blank lines of a JSONL file with their location."""
+    for line_number, line in enumerate(file, 1):
+        if not line.isspace():
+            yield f"{name}:{line_number}", line
+
+
+def convert(
+    paths: List[str],
+    output: TextIO,
+    output_format: str = FORMAT_JSONL,
+    workers: Optional[int] = None,
+    chunk_size: int = BATCH_CHUNK_SIZE,
+    max_slowest: int = 5,
+    stdin: Optional[BinaryIO] = None,
+    stdin_json: bool = False,
+) -> ConversionStats:
+    """
+    Converts every document of the inputs and writes the results to output.
+
+    With the jsonl format, every document gives a line with its location,
+    and either its text or the error it failed with. With the text format,
+    every document gives its text followed by an empty line, which never
+    occurs inside a text, so the Nth text is the one of the Nth document.
+    A document that fails gives an empty text, like a document without
+    text, and only the jsonl format tells them apart.
+    """
+    stats = ConversionStats()
+    slowest: List[Tuple[float, str]] = []
+    # Locations of the documents sent to the pool, in the order results come back
+    locations: Deque[str] = deque()
+
+    def documents() -> Iterator[bytes]:
+        for location, document_json in iter_documents(
+            paths, stdin or sys.stdin.buffer, stdin_json
+        ):
+            locations.append(location)
+            stats.bytes_read += len(document_json)
+            yield document_json
+
+    start = time.perf_counter()
+    for result in batch_to_plain_text(documents(), workers, chunk_size):
+        location = locations.popleft()
+        stats.documents += 1
+        if result.error is not None:
+            stats.errors += 1
+
+        entry = (result.elapsed, location)
+        if len(slowest) < max_slowest:
+            heapq.heappush(slowest, entry)
+        elif slowest and entry > slowest[0]:
+            heapq.heapreplace(slowest, entry)
+
+        if output_format == FORMAT_TEXT:
+            output.write((result.text or "") + "\n\n")
+        elif result.error is None:
+            output.write(
+                json_backend.dumps({"source": location, "text": result.text}) + "\n"
+            )
+        else:
+            output.write(
+                json_backend.dumps({"source": location, "error": result.error}) + "\n"
+            )
+
+    stats.elapsed = time.perf_counter() - start
+    stats.slowest = sorted(slowest, reverse=True)
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Runs the conversion from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="upils-slate-to-text", description=__doc__.strip().splitlines()[0]
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        help="JSONL files, .json files or directories of .jsonl files, "
+        "or - for stdin, which is the default",
+    )
+    parser.add_argument("-o", "--output", help="output file, defaults to stdout")
+    parser.add_argument(
+        "--format",
+        choices=[FORMAT_JSONL, FORMAT_TEXT],
+        default=FORMAT_JSONL,
+        help="jsonl writes a {source, text or error} object per document, "
+        "text writes the text of every document followed by an empty line, "
+        "with an empty text for documents that fail",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="read stdin as a single document instead of JSONL",
+    )
+    parser.add_argument(
+        "--workers", type=int, help="worker processes, defaults to the CPU count"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=BATCH_CHUNK_SIZE,
+        help="documents sent to a worker at once",
+    )
+    parser.add_argument(
+        "--slowest", type=int, default=5, help="slowest documents to report"
+    )
+    parser.add_argument("--fail-on-error", action="store_true")
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    for path in args.inputs:
+        if path != STDIN and not os.path.exists(path):
+            parser.error(f"{path} does not exist")
+
+    output = (
+        open(args.output, "w", encoding="utf-8")  # pylint: disable=consider-using-with
+        if args.output
+        else sys.stdout
+    )
+    try:
+        stats = convert(
+            args.inputs,
+            output,
+            args.format,
+            args.workers,
+            args.chunk_size,
+            args.slowest,
+            stdin_json=args.json,
+        )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(stats.report(), file=sys.stderr)
+    if args.fail_on_error and stats.errors:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
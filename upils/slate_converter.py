@@ -5,16 +5,50 @@ Based on the go-utils slate_converter
 https://github.com/kumparan/go-utils/blob/master/slate_converter.go
 """
 
+import asyncio
+import hashlib
+import heapq
 import json
+import mmap
+import os
 import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass, field
-from io import StringIO
 from itertools import chain, islice, tee
-from typing import Any, Dict, Iterable, Iterator, List, Tuple
+from operator import attrgetter, methodcaller
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+)
+
+from upils import json_backend
 
 # Regular expressions
 MULTIPLE_DOTS_REGEX = re.compile(r"\.+")
 DOT_SPACE_REGEX = re.compile(r"\.\s")
+# Same results as r"\n+" and MULTIPLE_DOTS_REGEX when replaced by a single
+# character, but only matching where there is something to replace, so
+# text without repeats is returned as it is, without being copied
+REPEATED_NEWLINES_REGEX = re.compile(r"\n\n+")
+REPEATED_DOTS_REGEX = re.compile(r"\.\.+")
+# A sentence, ending with punctuation followed by whitespace, at the end of
+# a line or at the end of the text, without whitespace around it
+SENTENCE_REGEX = re.compile(r"\S(?:[^\n]*?[.!?](?=\s)|[^\n]*\S)?")
 
 # Constants
 COMMA_SEPARATOR = ","
@@ -37,10 +71,55 @@ NODE_TYPE_CAPTION = "caption"
 NODE_TYPE_FIGURE = "figure"
 NODE_TYPE_LINK = "link"
 
+# Node types whose child nodes are left out of the plain-text
+SKIPPED_NODE_TYPES = (NODE_TYPE_HEADING_LARGE, NODE_TYPE_CAPTION, NODE_TYPE_FIGURE)
 
-@dataclass
+# Number of characters read at a time when streaming a Slate document
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Number of documents sent to a worker process at a time in batch conversion
+BATCH_CHUNK_SIZE = 64
+
+# Maximum number of distinct mark lists shared between parsed leaves
+MAX_INTERNED_MARKS = 4096
+
+# Part of every plain-text cache key. Bump it whenever the plain-text output
+# changes, so that texts cached on disk by older versions are not used.
+PLAIN_TEXT_CACHE_VERSION = b"1"
+
+
+class FrozenList(list):
+    """
+    A list that cannot be modified, so a single instance can be shared.
+    It still compares equal to a plain list with the same items.
+    """
+
+    __slots__ = ()
+
+    def _raise_immutable(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is immutable")
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _raise_immutable
+    append = extend = insert = pop = remove = clear = sort = reverse = _raise_immutable
+
+    def __reduce__(self):
+        return type(self), (list(self),)
+
+
+# Shared by every parsed node or leaf without children, leaves or marks
+EMPTY_LIST = FrozenList()
+
+_interned_marks: Dict[Tuple, FrozenList] = {}
+
+
+@dataclass(slots=True)
 class SlateLeaf:
-    """Represents a text element with optional formatting."""
+    """
+    Represents a text element with optional formatting.
+
+    Leaves created by from_dict share their marks with every other leaf
+    that has the same marks, so these must not be modified.
+    """
 
     object: str = "leaf"
     text: str = ""
@@ -49,16 +128,22 @@ class SlateLeaf:
     @classmethod
     def from_dict(cls, leaf: Dict) -> "SlateLeaf":
         """Create an instance of SlateLeaf from a leaf dictionary."""
+        marks = leaf.get("marks")
         return cls(
-            object=leaf.get("object", "leaf"),
-            text=leaf.get("text", ""),
-            marks=leaf.get("marks", []),
+            _intern_string(leaf.get("object", "leaf")),
+            leaf.get("text", ""),
+            _intern_marks(marks) if marks else EMPTY_LIST,
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class SlateNode:
-    """Represents a hierarchical document structure."""
+    """
+    Represents a hierarchical document structure.
+
+    Nodes created by from_dict share EMPTY_LIST when they have no child
+    nodes or leaves, so these can only be modified when non-empty.
+    """
 
     object: str = "block"
     type: str = ""
@@ -67,18 +152,43 @@ class SlateNode:
     is_last_in_list: bool = False
 
     @classmethod
-    def from_dict(cls, node: Dict) -> "SlateNode":
-        """Create an instance of SlateNode from a node dictionary."""
-        nodes = [SlateNode.from_dict(node_data) for node_data in node.get("nodes", [])]
-        leaves = [
-            SlateLeaf.from_dict(leaf_data) for leaf_data in node.get("leaves", [])
-        ]
+    def from_dict(cls, node: Dict, text_only: bool = False) -> "SlateNode":
+        """
+        Create an instance of SlateNode from a node dictionary.
+
+        With text_only, the child nodes of types that are left out of the
+        plain-text are not created, see PRUNED_NODES.
+        """
+        nodes_data = node.get("nodes")
+        leaves_data = node.get("leaves")
+        node_type = _intern_string(node.get("type", ""))
+
+        if (
+            text_only
+            and nodes_data
+            and _NODE_HANDLERS.get(node_type, _DEFAULT_NODE_HANDLER).kind
+            == _KIND_SKIPPED
+        ):
+            return cls(
+                _intern_string(node.get("object", "block")),
+                node_type,
+                PRUNED_NODES,
+                EMPTY_LIST,
+            )
 
         return cls(
-            object=node.get("object", "block"),
-            type=node.get("type", ""),
-            nodes=nodes,
-            leaves=leaves,
+            _intern_string(node.get("object", "block")),
+            node_type,
+            (
+                [SlateNode.from_dict(node_data, text_only) for node_data in nodes_data]
+                if nodes_data
+                else EMPTY_LIST
+            ),
+            (
+                [SlateLeaf.from_dict(leaf_data) for leaf_data in leaves_data]
+                if leaves_data
+                else EMPTY_LIST
+            ),
         )
 
     def ensure_ends_with_punctuation(self) -> None:
@@ -98,119 +208,1578 @@ class SlateNode:
             last_node.leaves[-1] = _ensure_leaf_punctuation(last_slate_leaf)
 
 
-@dataclass
+# Stands in for the child nodes of a node parsed in text-only mode, whose
+# children are left out of the plain-text. Being non-empty, the node is
+# still skipped by the serializer exactly as if all its children were there.
+PRUNED_NODES = FrozenList([SlateNode()])
+
+
+@dataclass(slots=True)
 class SlateDocument:
     """Represents the root structure of a Slate document."""
 
     nodes: List[SlateNode] = field(default_factory=list)
+    _plain_text: Optional[str] = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     @classmethod
-    def from_dict(cls, document: Dict) -> "SlateDocument":
-        """Create an instance of SlateDocument from a document dictionary."""
+    def from_dict(cls, document: Dict, text_only: bool = False) -> "SlateDocument":
+        """
+        Create an instance of SlateDocument from a document dictionary.
+
+        :param text_only: skip creating nodes that are left out of the plain-text.
+        The result gives the same to_plain_text, but is not a full copy of the document.
+        """
         document = document.get("document", {"nodes": []})
         nodes = [
-            SlateNode.from_dict(node_data) for node_data in document.get("nodes", [])
+            SlateNode.from_dict(node_data, text_only)
+            for node_data in document.get("nodes", [])
         ]
         return cls(nodes=nodes)
 
     @classmethod
-    def parse(cls, document_json: str) -> "SlateDocument":
-        """Parses a Slate document JSON string into a SlateDocument struct."""
+    def parse(
+        cls, document_json: json_backend.JSONInput, text_only: bool = False
+    ) -> "SlateDocument":
+        """
+        Parses a Slate document JSON into a SlateDocument struct.
+        The JSON can be a string, or bytes, bytearray or memoryview of its encoding.
+        """
         try:
-            document_dict = json.loads(document_json)
-            return cls.from_dict(document_dict)
+            document_dict = json_backend.loads(document_json)
+            return cls.from_dict(document_dict, text_only)
         except json.JSONDecodeError as error:
             raise error
 
+    def freeze(self) -> "SlateDocument":
+        """
+        Returns a copy of the document that can be shared between threads.
+
+        Node and leaf lists of the copy are FrozenList, and its plain-text is
+        converted once here, so to_plain_text on the copy is only a lookup.
+        The nodes and leaves of the copy must not be modified.
+        """
+        document = SlateDocument(nodes=_freeze_nodes(self.nodes))
+        document._plain_text = document.to_plain_text()
+        return document
+
     def to_plain_text(self) -> str:
-        """Converts a Slate document into a plain-text format."""
+        """
+        Converts a Slate document into a plain-text format.
+        The document is not modified, so this gives the same text every time.
+        """
+        if self._plain_text is not None:
+            return self._plain_text
         text = serialize_slate_nodes(self.nodes, NEWLINE, SPACE_SEPARATOR, True)
-        text = re.sub(r"\n+", NEWLINE, text)
-        return text.strip()
+        return _normalize_plain_text(text)
+
+    def extract_text(self) -> "SlateTextExtraction":
+        """
+        Converts a Slate document into a plain-text format, collecting the
+        offsets of its blocks and sentences and its statistics in the same pass.
+        The text is the same as to_plain_text.
+        """
+        return _extract_text(self.nodes)
+
+    def to_block_texts(self) -> "SlateBlockTexts":
+        """
+        Converts a Slate document into a plain-text format, keeping the text of
+        every top-level block so that later edits can be re-converted with
+        update_block_texts.
+        """
+        return _convert_blocks(self.nodes, [], [], _INITIAL_BLOCK_STATE)
+
+    def update_block_texts(
+        self, previous: "SlateDocument", previous_texts: "SlateBlockTexts"
+    ) -> "SlateBlockTexts":
+        """
+        Converts an edited document, reusing previous_texts of the previous
+        document wherever its top-level blocks did not change.
+
+        Only the changed blocks are converted again, and the blocks after them
+        only until they are written exactly as before. A block is unchanged when
+        it is the same node, or an equal one, as in the previous document, so
+        documents parsed again on every edit are compared block by block. The
+        text is always the same as to_plain_text, as long as previous is not
+        modified after previous_texts are converted.
+        """
+        old_nodes, new_nodes = previous.nodes, self.nodes
+        if len(previous_texts.blocks) != len(old_nodes):
+            raise ValueError("previous_texts were not converted from previous.")
+
+        # Blocks at the start and at the end that did not change
+        prefix = 0
+        shortest = min(len(old_nodes), len(new_nodes))
+        while prefix < shortest and _same_node(old_nodes[prefix], new_nodes[prefix]):
+            prefix += 1
+        suffix = 0
+        while suffix < shortest - prefix and _same_node(
+            old_nodes[-suffix - 1], new_nodes[-suffix - 1]
+        ):
+            suffix += 1
+
+        state = previous_texts.states[prefix - 1] if prefix else _INITIAL_BLOCK_STATE
+        return _convert_blocks(
+            new_nodes[prefix : len(new_nodes) - suffix],
+            list(previous_texts.blocks[:prefix]),
+            list(previous_texts.states[:prefix]),
+            state,
+            previous_texts,
+            len(old_nodes) - suffix,
+            new_nodes[len(new_nodes) - suffix :],
+        )
+
+
+@dataclass
+class SlateTextExtraction:
+    """
+    Plain-text of a Slate document, with what indexing it needs besides the text.
+    Offsets are (start, end) character positions in text.
+    """
+
+    text: str
+    # Offsets of the text of every top-level node, without surrounding
+    # whitespace. Nodes without text get an empty span where they would be.
+    block_offsets: List[Tuple[int, int]]
+    # Offsets of every sentence, ending with .!? followed by whitespace,
+    # before a newline or at the end of the text
+    sentence_offsets: List[Tuple[int, int]]
+    word_count: int
+    char_count: int
+    # Number of nodes by type. Child nodes left out of the plain-text, like
+    # those of figures or medium headings, are not counted.
+    node_type_counts: Dict[str, int]
+
+
+def _extract_text(nodes: List[SlateNode]) -> SlateTextExtraction:
+    """
+    Writes top-level nodes one at a time, and collects the offsets and word
+    count of each piece of normalized text as it is produced.
+    """
+    writer = _SlateTextWriter(NEWLINE, SPACE_SEPARATOR, True)
+    writer.node_type_counts = {}
+    normalizer = _PlainTextNormalizer()
+    pieces: List[str] = []
+    block_offsets: List[Tuple[int, int]] = []
+    sentence_offsets: List[Tuple[int, int]] = []
+    sentences = _SentenceSplitter()
+    length = word_count = 0
+
+    for node in nodes:
+        writer.write_nodes((node,))
+        piece = normalizer.feed(writer.getvalue())
+        writer.output.clear()
+        if not piece:
+            block_offsets.append((length, length))
+            continue
+
+        leading = len(piece) - len(piece.lstrip())
+        block_offsets.append((length + leading, length + len(piece)))
+        word_count += len(piece.split())
+        # Pieces end with a word, which continues when the next piece starts with one
+        if leading == 0 and pieces:
+            word_count -= 1
+
+        sentence_offsets.extend(sentences.feed(piece))
+        pieces.append(piece)
+        length += len(piece)
+
+    sentence_offsets.extend(sentences.close())
+    text = "".join(pieces)
+    return SlateTextExtraction(
+        text,
+        block_offsets,
+        sentence_offsets,
+        word_count,
+        len(text),
+        writer.node_type_counts,
+    )
+
+
+@dataclass(frozen=True)
+class SlateBlockTexts:
+    """
+    Plain-text of a Slate document, together with the text written for every
+    top-level block and the serializer state after it, so that an edited
+    document can be re-converted block by block.
+    """
+
+    text: str
+    blocks: Tuple[str, ...]
+    # Node separator, and whether a newline is still needed, after every block
+    states: Tuple[Tuple[str, bool], ...]
+
+
+# Serializer state before the first top-level block of a document
+_INITIAL_BLOCK_STATE = (NEWLINE, False)
+
+
+def _convert_blocks(
+    nodes: List[SlateNode],
+    blocks: List[str],
+    states: List[Tuple[str, bool]],
+    state: Tuple[str, bool],
+    previous_texts: Optional[SlateBlockTexts] = None,
+    previous_index: int = 0,
+    unchanged_nodes: List[SlateNode] = EMPTY_LIST,
+) -> SlateBlockTexts:
+    """
+    Converts top-level nodes one at a time from state, appending to blocks and states.
+
+    The unchanged_nodes, which follow nodes, were written before as the blocks
+    of previous_texts from previous_index. Their text is reused from the first
+    one that starts from the same state as it did then, as from there on they
+    are written exactly the same.
+    """
+    writer = _SlateTextWriter(NEWLINE, SPACE_SEPARATOR, True)
+    writer.state = state
+
+    def convert(node: SlateNode) -> None:
+        writer.write_nodes((node,))
+        blocks.append(writer.getvalue())
+        states.append(writer.state)
+        writer.output.clear()
+
+    for node in nodes:
+        convert(node)
+    for index, node in enumerate(unchanged_nodes, previous_index):
+        if writer.state == (
+            previous_texts.states[index - 1] if index else _INITIAL_BLOCK_STATE
+        ):
+            blocks.extend(previous_texts.blocks[index:])
+            states.extend(previous_texts.states[index:])
+            break
+        convert(node)
+
+    text = _normalize_plain_text("".join(blocks))
+    return SlateBlockTexts(text, tuple(blocks), tuple(states))
+
+
+def _same_node(old: SlateNode, new: SlateNode) -> bool:
+    """Whether a top-level block did not change, checking identity before equality."""
+    if old is new:
+        return True
+    try:
+        # Dataclass equality is the fastest check, but it recurses
+        return old == new
+    except RecursionError:
+        return _same_nested_node(old, new)
+
+
+def _same_nested_node(old: SlateNode, new: SlateNode) -> bool:
+    """Compares two nodes without recursion, for nesting deeper than the limit."""
+    pairs = [(old, new)]
+    while pairs:
+        old, new = pairs.pop()
+        if old is new:
+            continue
+        if (
+            old.object != new.object
+            or old.type != new.type
+            or old.leaves != new.leaves
+            or old.is_last_in_list != new.is_last_in_list
+            or len(old.nodes) != len(new.nodes)
+        ):
+            return False
+        pairs.extend(zip(old.nodes, new.nodes))
+    return True
+
+
+@dataclass
+class SlateConversionResult:
+    """
+    Result of converting a single document in a batch.
+    Either text is set, or error describes why the document failed.
+    elapsed is the time the conversion took in seconds, when it is measured.
+    """
+
+    text: Optional[str] = None
+    error: Optional[str] = None
+    elapsed: float = field(default=0.0, compare=False)
+
+
+def batch_to_plain_text(
+    documents: Iterable[Union[str, bytes]],
+    max_workers: Optional[int] = None,
+    chunk_size: int = BATCH_CHUNK_SIZE,
+    mp_context: Any = None,
+) -> Iterator[SlateConversionResult]:
+    """
+    Converts many Slate document JSONs into plain-text on a process pool.
+
+    Documents are sent to the workers in chunks of chunk_size, and only a few
+    chunks per worker are in flight at once, so documents can be a lazy
+    iterable of any length. Results are yielded in input order, and a
+    document that fails to convert yields a result with error set instead
+    of aborting the batch.
+
+    :param max_workers: number of worker processes, defaults to the CPU count.
+    :param mp_context: multiprocessing context used to start the workers.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1.")
+
+    documents = iter(documents)
+    chunks = iter(lambda: list(islice(documents, chunk_size)), [])
+    executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context)
+    try:
+        # Keep every worker busy while the previous chunk is being consumed
+        max_in_flight = 2 * max_workers
+        in_flight = deque(
+            executor.submit(_batch_to_plain_text, chunk)
+            for chunk in islice(chunks, max_in_flight)
+        )
+        while in_flight:
+            results = in_flight.popleft().result()
+            for chunk in islice(chunks, 1):
+                in_flight.append(executor.submit(_batch_to_plain_text, chunk))
+            yield from results
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _batch_to_plain_text(
+    documents: List[Union[str, bytes]],
+) -> List[SlateConversionResult]:
+    """Converts a chunk of documents in a worker process."""
+    results = []
+    for document_json in documents:
+        start = time.perf_counter()
+        try:
+            result = SlateConversionResult(
+                text=document_json_to_plain_text(document_json)
+            )
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            result = SlateConversionResult(error=f"{type(error).__name__}: {error}")
+        result.elapsed = time.perf_counter() - start
+        results.append(result)
+    return results
+
+
+class AsyncSlateConverter:
+    """
+    Converts Slate document JSONs into plain-text from asyncio code, without
+    blocking the event loop.
+
+    Conversions run on executor, a process pool of max_concurrency workers
+    by default, and at most max_concurrency of them run at once. A conversion
+    that is cancelled or times out before it starts is not run at all, and
+    one that already started keeps its slot until it finishes.
+
+    A converter must only be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """
+        :param executor: thread or process executor running the conversions.
+        It is not shut down by close, unlike the default process pool.
+        :param max_concurrency: maximum number of conversions in flight,
+        defaults to the CPU count.
+        :param timeout: default timeout of every conversion in seconds,
+        including the time spent waiting for a free slot.
+        """
+        if max_concurrency is None:
+            max_concurrency = os.cpu_count() or 1
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._owns_executor = executor is None
+        self._executor = executor or ProcessPoolExecutor(max_workers=max_concurrency)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self) -> "AsyncSlateConverter":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    async def to_plain_text(
+        self, document_json: Union[str, bytes], timeout: Optional[float] = None
+    ) -> str:
+        """
+        Returns the same text as SlateDocument.parse(document_json).to_plain_text().
+        Raises asyncio.TimeoutError after timeout seconds, defaulting to self.timeout.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        return await asyncio.wait_for(self._convert(document_json), timeout)
+
+    async def to_plain_texts(
+        self, documents: Iterable[Union[str, bytes]], timeout: Optional[float] = None
+    ) -> List[SlateConversionResult]:
+        """
+        Converts documents concurrently, within max_concurrency. Results are in
+        input order, and a document that fails, times out or is cancelled, like
+        by close, gives a result with error set, like in batch_to_plain_text.
+        """
+        texts = await asyncio.gather(
+            *(self.to_plain_text(document, timeout) for document in documents),
+            return_exceptions=True,
+        )
+        return [
+            (
+                SlateConversionResult(error=f"{type(text).__name__}: {text}")
+                if isinstance(text, BaseException)
+                else SlateConversionResult(text=text)
+            )
+            for text in texts
+        ]
+
+    def close(self) -> None:
+        """Shuts down the default process pool, cancelling conversions not started yet."""
+        if self._owns_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _convert(self, document_json: Union[str, bytes]) -> str:
+        """Converts a document on the executor once there is a free slot."""
+        await self._semaphore.acquire()
+        try:
+            future = self._executor.submit(document_json_to_plain_text, document_json)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        # The slot is freed when the conversion ends, even if it is no longer awaited
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(lambda _: self._release(loop))
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+    def _release(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Frees a slot from the thread that finished a conversion."""
+        try:
+            loop.call_soon_threadsafe(self._semaphore.release)
+        except RuntimeError:
+            # The event loop is already closed, so no one waits for the slot
+            pass
+
+
+@dataclass
+class SlateLineResult:
+    """
+    Result of converting one line of a JSONL file, numbered from 1.
+    Either text is set, or error describes why the line failed.
+    """
+
+    line_number: int
+    text: Optional[str] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class SlateJSONLStats:
+    """
+    Progress of a SlateJSONLReader. slowest holds the seconds taken by the
+    slowest lines and their line numbers, slowest first.
+    """
+
+    documents: int = 0
+    errors: int = 0
+    bytes_read: int = 0
+    total_bytes: int = 0
+    elapsed: float = 0.0
+    slowest: List[Tuple[float, int]] = field(default_factory=list)
+
+    @property
+    def documents_per_second(self) -> float:
+        """Documents converted per second of wall-clock time."""
+        return self.documents / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        """Megabytes of the file read per second of wall-clock time."""
+        return self.bytes_read / 1024**2 / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def progress(self) -> float:
+        """Share of the file read so far, from 0 to 1."""
+        return self.bytes_read / self.total_bytes if self.total_bytes else 1.0
+
+
+class SlateJSONLReader:
+    """
+    Converts a JSONL file of Slate documents into plain-text, one line at a time.
+
+    The file is memory-mapped, and every line is decoded straight from the
+    mapping, so the file is never loaded whole and the memory used only
+    depends on the longest line. Blank lines are skipped, and a line that
+    fails to convert yields a result with error set.
+
+    While iterating, stats is kept up to date, and progress is called with it
+    every progress_interval seconds and once more at the end.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, "os.PathLike[str]"],
+        progress: Optional[Callable[[SlateJSONLStats], None]] = None,
+        progress_interval: float = 1.0,
+        max_slowest: int = 5,
+    ) -> None:
+        self.path = path
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.max_slowest = max_slowest
+        self.stats = SlateJSONLStats()
+
+    def __iter__(self) -> Iterator[SlateLineResult]:
+        self.stats = SlateJSONLStats()
+        with open(self.path, "rb") as file:
+            self.stats.total_bytes = os.fstat(file.fileno()).st_size
+            if not self.stats.total_bytes:
+                # Empty files cannot be memory-mapped
+                self._report(time.perf_counter(), [])
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield from self._convert_lines(mapped, view)
+                finally:
+                    # The mapping cannot be closed while the view is exported
+                    view.release()
+
+    def _convert_lines(
+        self, mapped: mmap.mmap, view: memoryview
+    ) -> Iterator[SlateLineResult]:
+        """Converts every line of the mapping, updating stats and reporting progress."""
+        stats = self.stats
+        slowest: List[Tuple[float, int]] = []
+        start = last_report = time.perf_counter()
+        size = stats.total_bytes
+        position = 0
+        line_number = 0
+        while position < size:
+            end = mapped.find(b"\n", position)
+            if end == -1:
+                end = size
+            line_number += 1
+            line_start, position = position, end + 1
+            if _is_blank_line(mapped, line_start, end):
+                continue
+
+            line_time = time.perf_counter()
+            with view[line_start:end] as line:
+                try:
+                    result = SlateLineResult(
+                        line_number, text=document_json_to_plain_text(line)
+                    )
+                except Exception as error:  # pylint: disable=broad-exception-caught
+                    result = SlateLineResult(
+                        line_number, error=f"{type(error).__name__}: {error}"
+                    )
+                    stats.errors += 1
+            now = time.perf_counter()
+            stats.documents += 1
+            stats.bytes_read = min(position, size)
+            stats.elapsed = now - start
+            entry = (now - line_time, line_number)
+            if len(slowest) < self.max_slowest:
+                heapq.heappush(slowest, entry)
+            elif slowest and entry > slowest[0]:
+                heapq.heapreplace(slowest, entry)
+            if (
+                self.progress is not None
+                and now - last_report >= self.progress_interval
+            ):
+                last_report = now
+                self._report(start, slowest)
+            yield result
+
+        stats.bytes_read = size
+        self._report(start, slowest)
+
+    def _report(self, start: float, slowest: List[Tuple[float, int]]) -> None:
+        """Brings stats up to date and calls progress with it."""
+        self.stats.elapsed = time.perf_counter() - start
+        self.stats.slowest = sorted(slowest, reverse=True)
+        if self.progress is not None:
+            self.progress(self.stats)
+
+
+def _is_blank_line(mapped: mmap.mmap, start: int, end: int) -> bool:
+    """Whether a line is empty or only whitespace, without copying most lines."""
+    return end == start or (mapped[start] in b" \t\r" and mapped[start:end].isspace())
+
+
+@dataclass
+class SlateCacheStats:
+    """Counters of a SlatePlainTextCache."""
+
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class SlatePlainTextCache:
+    """
+    Caches the plain-text of Slate document JSONs, keyed by a hash of the JSON
+    and of the node types registered with register_node_type.
+
+    Texts are kept in a bounded in-memory LRU, and optionally in a SQLite
+    file at path, which survives restarts and is not bounded. A text found
+    on disk is moved back into memory.
+
+    The cache can be shared between threads.
+    """
+
+    def __init__(self, max_entries: int = 1024, path: Optional[str] = None) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, str]" = OrderedDict()
+        self._stats = SlateCacheStats()
+        self._lock = threading.Lock()
+        self._connection = None
+        if path is not None:
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            with self._connection:
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS plain_text "
+                    "(key BLOB PRIMARY KEY, text TEXT NOT NULL)"
+                )
+
+    def __enter__(self) -> "SlatePlainTextCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def stats(self) -> SlateCacheStats:
+        """Returns a copy of the cache counters."""
+        with self._lock:
+            return SlateCacheStats(**vars(self._stats))
+
+    def to_plain_text(self, document_json: Union[str, bytes]) -> str:
+        """
+        Returns the same text as SlateDocument.parse(document_json).to_plain_text(),
+        converting the document only when it is not cached yet.
+        """
+        key = _plain_text_cache_key(document_json)
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                self._stats.hits += 1
+                return text
+            text = self._load(key)
+            if text is not None:
+                self._stats.disk_hits += 1
+                self._remember(key, text)
+                return text
+            self._stats.misses += 1
+
+        # Convert without holding the lock, so other documents are not blocked
+        text = document_json_to_plain_text(document_json)
+        with self._lock:
+            self._store(key, text)
+            self._remember(key, text)
+        return text
+
+    def clear(self) -> None:
+        """Removes every cached text, from memory and from disk."""
+        with self._lock:
+            self._entries.clear()
+            if self._connection is not None:
+                with self._connection:
+                    self._connection.execute("DELETE FROM plain_text")
+
+    def close(self) -> None:
+        """Closes the SQLite file. The in-memory texts can still be used."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _remember(self, key: bytes, text: str) -> None:
+        """Adds a text to the in-memory LRU, evicting the least recently used."""
+        self._entries[key] = text
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats.evictions += 1
+
+    def _load(self, key: bytes) -> Optional[str]:
+        """Returns the text cached on disk, if any."""
+        if self._connection is None:
+            return None
+        row = self._connection.execute(
+            "SELECT text FROM plain_text WHERE key = ?", (key,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def _store(self, key: bytes, text: str) -> None:
+        """Writes a text to disk, if there is an on-disk tier."""
+        if self._connection is None:
+            return
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO plain_text (key, text) VALUES (?, ?)",
+                (key, text),
+            )
+
+
+def document_json_to_plain_text(document_json: json_backend.JSONInput) -> str:
+    """Converts a Slate document JSON into a plain-text format."""
+    return plain_text_from_dict(json_backend.loads(document_json))
+
+
+def _plain_text_cache_key(document_json: Union[str, bytes]) -> bytes:
+    """
+    Hashes a document JSON, so the same content always gives the same key,
+    as long as the same node types are registered.
+    """
+    if isinstance(document_json, str):
+        document_json = document_json.encode("utf-8", "surrogatepass")
+    return hashlib.blake2b(
+        document_json,
+        digest_size=20,
+        person=PLAIN_TEXT_CACHE_VERSION,
+        salt=_node_handlers_fingerprint,
+    ).digest()
 
 
 def serialize_slate_nodes(
     nodes: List[SlateNode],
     node_separator: str,
     leaf_separator: str,
-    is_root_level: bool = False,  # Recursive calls sets this as false
+    is_root_level: bool = False,
 ) -> str:
-    """Recursively processes nodes and its content into a plain-text format."""
-    result = []
-    modified_slate_node_separator = node_separator
+    """Processes nodes and its content into a plain-text format."""
+    writer = _SlateTextWriter(node_separator, leaf_separator, is_root_level)
+    writer.write_nodes(nodes)
+    return writer.getvalue()
 
-    for node in nodes:
-        # Handle paragraph nodes by ensuring they end with punctuation.
-        if node.type == NODE_TYPE_PARAGRAPH:
-            node.ensure_ends_with_punctuation()
-
-        # Recursively process child nodes.
-        if node.nodes:
-            if node.type in [
-                NODE_TYPE_HEADING_LARGE,
-                NODE_TYPE_CAPTION,
-                NODE_TYPE_FIGURE,
-            ]:
-                continue
-            if node.type == NODE_TYPE_HEADING_MEDIUM:
-                modified_slate_node_separator = SENTENCE_SEPARATOR
-            elif node.type in [NODE_TYPE_BULLETED_LIST, NODE_TYPE_NUMBERED_LIST]:
-                node.nodes[-1].is_last_in_list = True
-                temp = serialize_slate_nodes(
-                    node.nodes, modified_slate_node_separator, leaf_separator
-                )
-                cleaned = clean_up_list(temp)
-                result.append(cleaned)
+
+def plain_text_from_dict(document: Dict) -> str:
+    """
+    Converts a Slate document dictionary into a plain-text format.
+
+    Gives the same text as SlateDocument.from_dict(document).to_plain_text(),
+    but reads the dictionaries directly instead of creating nodes and leaves.
+    """
+    document = document.get("document", {"nodes": []})
+    writer = _SlateTextWriter(NEWLINE, SPACE_SEPARATOR, True, fields=_SLATE_DICT_FIELDS)
+    writer.write_nodes(document.get("nodes", []))
+    return _normalize_plain_text(writer.getvalue())
+
+
+def _normalize_plain_text(text: str) -> str:
+    """
+    Collapses newlines and strips the serialized text, in a single pass that
+    only copies the text when there is something to remove.
+    """
+    return REPEATED_NEWLINES_REGEX.sub(NEWLINE, text.strip())
+
+
+class _SlateFields(NamedTuple):
+    """Reads the fields that the serializer needs from a node or a leaf."""
+
+    nodes: Callable[[Any], Any]
+    type: Callable[[Any], Any]
+    leaves: Callable[[Any], Any]
+    is_last_in_list: Callable[[Any], Any]
+    text: Callable[[Any], Any]
+    marks: Callable[[Any], Any]
+
+
+_SLATE_OBJECT_FIELDS = _SlateFields(
+    attrgetter("nodes"),
+    attrgetter("type"),
+    attrgetter("leaves"),
+    attrgetter("is_last_in_list"),
+    attrgetter("text"),
+    attrgetter("marks"),
+)
+
+# Same defaults as SlateNode.from_dict and SlateLeaf.from_dict
+_SLATE_DICT_FIELDS = _SlateFields(
+    methodcaller("get", "nodes"),
+    methodcaller("get", "type", ""),
+    methodcaller("get", "leaves"),
+    methodcaller("get", "is_last_in_list", False),
+    methodcaller("get", "text", ""),
+    methodcaller("get", "marks"),
+)
+
+
+# Kinds of nested node lists, deciding how their text is finished once written
+_NESTED_LIST = "list"
+_NESTED_INLINE = "inline"
+_NESTED_LINK = "link"
+_NESTED_LIST_ITEM = "list-item"
+_NESTED_DEFAULT = "default"
+# Kinds of nodes whose children are not written as a nested list
+_KIND_SKIPPED = "skipped"
+_KIND_SENTENCE_END = "sentence-end"
+_KIND_RENDERED = "rendered"
+
+
+class _NodeHandler(NamedTuple):
+    """How nodes of a type are written, see register_node_type."""
+
+    kind: str
+    # Separator of the child nodes, only used by the _NESTED_DEFAULT kind
+    separator: str = SPACE_SEPARATOR
+    # Whether the last leaf of the node must end with punctuation
+    is_paragraph: bool = False
+    render: Optional[Callable[[Any], str]] = None
+
+
+_DEFAULT_NODE_HANDLER = _NodeHandler(_NESTED_DEFAULT)
+_BUILTIN_NODE_HANDLERS: Dict[str, _NodeHandler] = {
+    **{node_type: _NodeHandler(_KIND_SKIPPED) for node_type in SKIPPED_NODE_TYPES},
+    NODE_TYPE_HEADING_MEDIUM: _NodeHandler(_KIND_SENTENCE_END),
+    NODE_TYPE_BULLETED_LIST: _NodeHandler(_NESTED_LIST),
+    NODE_TYPE_NUMBERED_LIST: _NodeHandler(_NESTED_LIST),
+    NODE_TYPE_INLINE: _NodeHandler(_NESTED_INLINE),
+    NODE_TYPE_LINK: _NodeHandler(_NESTED_LINK),
+    NODE_TYPE_LIST_ITEM: _NodeHandler(_NESTED_LIST_ITEM),
+    NODE_TYPE_PARAGRAPH: _NodeHandler(_NESTED_DEFAULT, is_paragraph=True),
+}
+# Looked up once for every node written; types not in it use _DEFAULT_NODE_HANDLER
+_NODE_HANDLERS: Dict[str, _NodeHandler] = dict(_BUILTIN_NODE_HANDLERS)
+# Part of the plain-text cache keys, empty while only built-in types are handled
+_node_handlers_fingerprint = b""
+
+
+def register_node_type(
+    node_type: str,
+    like: str = "",
+    separator: Optional[str] = None,
+    render: Optional[Callable[[Any], str]] = None,
+) -> None:
+    """
+    Registers how nodes of node_type are written into plain-text, replacing
+    any previous handling of that type.
+
+    The nodes are written like nodes of type like, a built-in or registered
+    type, which defaults to how unknown types are written: their children are
+    written one after another. Any other like raises ValueError.
+    separator replaces the separator of those children. With NEWLINE every
+    child block ends with a newline, and with COMMA_SEPARATOR with a comma.
+    With render, nodes are written as the text returned by render(node)
+    instead, and their children are not visited. render gets a SlateNode, or
+    the node dictionary when converting dictionaries like plain_text_from_dict.
+
+    Registrations are global and only apply to the current process, so
+    register node types at import time, before any document is converted.
+    Worker processes started with spawn must register them again. Documents
+    already parsed with text_only keep the child nodes pruned at parse time.
+
+    Plain-text cache keys include the registered types, including the name
+    of render, so texts cached before a registration are not used. Rename
+    render, or bump PLAIN_TEXT_CACHE_VERSION, when it writes a different text.
+    """
+    if like and like not in _NODE_HANDLERS:
+        raise ValueError(f"Unknown node type {like!r}.")
+    handler = _NODE_HANDLERS[like] if like else _DEFAULT_NODE_HANDLER
+    if render is not None:
+        handler = _NodeHandler(_KIND_RENDERED, render=render)
+    elif separator is not None:
+        if handler.kind != _NESTED_DEFAULT:
+            raise ValueError(f"Nodes written like {like!r} do not use a separator.")
+        handler = handler._replace(separator=separator)
+    _NODE_HANDLERS[node_type] = handler
+    _update_node_handlers_fingerprint()
+
+
+def unregister_node_type(node_type: str) -> None:
+    """Restores the built-in handling of node_type, undoing register_node_type."""
+    if node_type in _BUILTIN_NODE_HANDLERS:
+        _NODE_HANDLERS[node_type] = _BUILTIN_NODE_HANDLERS[node_type]
+    else:
+        _NODE_HANDLERS.pop(node_type, None)
+    _update_node_handlers_fingerprint()
+
+
+def _update_node_handlers_fingerprint() -> None:
+    """Hashes the handlers that differ from the built-in ones, by type."""
+    global _node_handlers_fingerprint  # pylint: disable=global-statement
+    changed = sorted(
+        (
+            node_type,
+            handler.kind,
+            handler.separator,
+            handler.is_paragraph,
+            (
+                None
+                if handler.render is None
+                else f"{handler.render.__module__}.{handler.render.__qualname__}"
+            ),
+        )
+        for node_type, handler in _NODE_HANDLERS.items()
+        if _BUILTIN_NODE_HANDLERS.get(node_type) != handler
+    )
+    _node_handlers_fingerprint = (
+        hashlib.blake2b(repr(changed).encode(), digest_size=16).digest()
+        if changed
+        else b""
+    )
+
+
+@dataclass
+class SlateNodeTypeStats:
+    """
+    Nodes of one type written while profiling. seconds and output_chars
+    include the time and the text of their child nodes. output_chars counts
+    the text as the node wrote it, before its parents change it, like lists
+    replacing the punctuation of their items.
+    """
+
+    count: int = 0
+    seconds: float = 0.0
+    output_chars: int = 0
+
+
+class SlateProfile:
+    """
+    Statistics of the Slate nodes written while profiling is enabled, by
+    node type. Nodes without a type, like text nodes, are counted as "text".
+    max_depth is the deepest nesting of nodes reached.
+
+    Conversions from any thread are recorded, but not the ones running in
+    other processes, like batch_to_plain_text workers.
+    """
+
+    def __init__(self) -> None:
+        self.node_types: Dict[str, SlateNodeTypeStats] = {}
+        self.max_depth = 0
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the statistics as a dictionary, which can be encoded as JSON."""
+        with self._lock:
+            return {
+                "max_depth": self.max_depth,
+                "node_types": {
+                    node_type: vars(stats).copy()
+                    for node_type, stats in self.node_types.items()
+                },
+            }
+
+    def reset(self) -> None:
+        """Clears the statistics recorded so far."""
+        with self._lock:
+            self.node_types.clear()
+            self.max_depth = 0
+
+    def _merge(self, records: Dict[str, List], max_depth: int) -> None:
+        """Adds the records of a _NodeProfiler."""
+        with self._lock:
+            for node_type, (count, seconds, output_chars) in records.items():
+                stats = self.node_types.get(node_type)
+                if stats is None:
+                    stats = self.node_types[node_type] = SlateNodeTypeStats()
+                stats.count += count
+                stats.seconds += seconds
+                stats.output_chars += output_chars
+            self.max_depth = max(self.max_depth, max_depth)
+
+
+# Profile recording every conversion, set by enable_slate_profiling
+_active_profile: Optional[SlateProfile] = None
+
+
+def enable_slate_profiling(profile: Optional[SlateProfile] = None) -> SlateProfile:
+    """
+    Starts recording every conversion in profile, or in a new SlateProfile,
+    and returns it. Conversions already running are not recorded.
+    """
+    global _active_profile  # pylint: disable=global-statement
+    _active_profile = profile or SlateProfile()
+    return _active_profile
+
+
+def disable_slate_profiling() -> None:
+    """Stops recording conversions. Writers only check this when created."""
+    global _active_profile  # pylint: disable=global-statement
+    _active_profile = None
+
+
+@contextmanager
+def slate_profiling(
+    profile: Optional[SlateProfile] = None,
+) -> Iterator[SlateProfile]:
+    """
+    Records the conversions run inside the with block, then restores the
+    profiling that was enabled before, if any.
+    """
+    previous = _active_profile
+    try:
+        yield enable_slate_profiling(profile)
+    finally:
+        if previous is None:
+            disable_slate_profiling()
+        else:
+            enable_slate_profiling(previous)
+
+
+class _NodeProfiler:
+    """
+    Measures the nodes written by a single writer, without locking, and adds
+    them to its SlateProfile once the writer is done with a list of nodes.
+    """
+
+    def __init__(self, profile: SlateProfile) -> None:
+        self.profile = profile
+        # Node type to [count, seconds, output characters]
+        self.records: Dict[str, List] = {}
+        # Nodes not finished yet, as (depth, type, start time, output start)
+        self.open_nodes: List[Tuple[int, str, float, int]] = []
+        self.max_depth = 0
+
+    def start(self, node_type: str, depth: int, output: List[str]) -> None:
+        """Starts measuring a node, finishing its previous sibling."""
+        self.finish(depth, output)
+        if depth > self.max_depth:
+            self.max_depth = depth
+        self.open_nodes.append(
+            (depth, node_type or "text", time.perf_counter(), len(output))
+        )
+
+    def finish(self, depth: int, output: List[str]) -> None:
+        """Finishes the nodes at depth and deeper."""
+        open_nodes = self.open_nodes
+        now = time.perf_counter()
+        while open_nodes and open_nodes[-1][0] >= depth:
+            _, node_type, start, output_start = open_nodes.pop()
+            record = self.records.get(node_type)
+            if record is None:
+                record = self.records[node_type] = [0, 0.0, 0]
+            record[0] += 1
+            record[1] += now - start
+            record[2] += sum(map(len, output[output_start:]))
+
+    def flush(self, output: List[str]) -> None:
+        """Finishes every node, and adds the records to the profile."""
+        self.finish(0, output)
+        self.profile._merge(  # pylint: disable=protected-access
+            self.records, self.max_depth
+        )
+        self.records = {}
+        self.max_depth = 0
+
+
+class _SlateTextWriter:
+    """
+    Serializes nodes into a single shared output buffer.
+
+    Nested nodes are walked with an explicit stack instead of recursion, so
+    nesting depth is not limited by the interpreter, and text is written once
+    instead of being joined and copied again at every nesting level.
+    """
+
+    def __init__(
+        self,
+        node_separator: str,
+        leaf_separator: str,
+        is_root_level: bool = False,
+        fields: _SlateFields = _SLATE_OBJECT_FIELDS,
+    ) -> None:
+        self.output: List[str] = []
+        # Nodes are read through fields, so they can be SlateNode or dictionaries
+        self.fields = fields
+        self.node_separator = node_separator
+        self.leaf_separator = leaf_separator
+        self.is_root_level = is_root_level
+        # Whether the last top-level text written does not end with a newline
+        self._needs_newline = False
+        # Number of nodes written by type, only counted when set to a dictionary
+        self.node_type_counts: Optional[Dict[str, int]] = None
+        profile = _active_profile
+        self._profiler = None if profile is None else _NodeProfiler(profile)
+
+    def getvalue(self) -> str:
+        """Returns the text written so far."""
+        return "".join(self.output)
+
+    @property
+    def state(self) -> Tuple[str, bool]:
+        """
+        Node separator of the top-level nodes, and whether a newline is still
+        needed. The text of the next top-level nodes only depends on this state.
+        """
+        return self.node_separator, self._needs_newline
+
+    @state.setter
+    def state(self, state: Tuple[str, bool]) -> None:
+        self.node_separator, self._needs_newline = state
+
+    def write_nodes(self, nodes: Iterable[SlateNode]) -> None:
+        """
+        Writes nodes as siblings. Successive calls continue the same sibling
+        list, keeping the node separator changed by the previous nodes.
+        Nodes are only read, never modified.
+        """
+        output = self.output
+        node_type_counts = self.node_type_counts
+        get_nodes, get_type, get_leaves, get_is_last_in_list = self.fields[:4]
+        handlers, default_handler = _NODE_HANDLERS, _DEFAULT_NODE_HANDLER
+        profiler = self._profiler
+        # A frame is [nodes, index of the next node, node separator,
+        # nested kind, output start, whether the parent is a paragraph]
+        if not isinstance(nodes, (list, tuple)):
+            nodes = list(nodes)
+        root_frame = [nodes, 0, self.node_separator, None, 0, False]
+        stack = [root_frame]
+
+        while stack:
+            frame = stack[-1]
+            siblings, index = frame[0], frame[1]
+            if index == len(siblings):
+                stack.pop()
+                if stack:
+                    self._finish_nested(frame, stack[-1][2], len(stack) == 1)
+                    if profiler is not None:
+                        profiler.finish(len(stack), output)
                 continue
-            elif node.type == NODE_TYPE_INLINE:
-                modified_slate_node_separator = SPACE_SEPARATOR
-                serialized_inline = (
-                    serialize_slate_nodes(
-                        node.nodes, modified_slate_node_separator, leaf_separator
+            frame[1] = index + 1
+            node = siblings[index]
+            node_type = get_type(node)
+            child_nodes = get_nodes(node)
+            is_last = index == len(siblings) - 1
+            is_root_level = self.is_root_level and len(stack) == 1
+            if node_type_counts is not None:
+                node_type_counts[node_type] = node_type_counts.get(node_type, 0) + 1
+            if profiler is not None:
+                profiler.start(node_type, len(stack), output)
+
+            handler = handlers.get(node_type, default_handler)
+            kind = handler.kind
+
+            # Continue with child nodes, finishing this node once they are written.
+            if child_nodes and kind != _KIND_RENDERED:
+                if kind == _NESTED_DEFAULT:
+                    stack.append(
+                        [
+                            child_nodes,
+                            0,
+                            handler.separator,
+                            _NESTED_DEFAULT,
+                            len(output),
+                            handler.is_paragraph,
+                        ]
                     )
-                    + leaf_separator
-                )
-                result.append(serialized_inline)
-            elif node.type == NODE_TYPE_LINK:
-                modified_slate_node_separator = SPACE_SEPARATOR
-                serialized_link = serialize_slate_nodes(
-                    node.nodes, modified_slate_node_separator, leaf_separator
-                )
-                result.append(serialized_link)
-            elif node.type == NODE_TYPE_LIST_ITEM:
-                modified_slate_node_separator = COMMA_SEPARATOR
-                if node.is_last_in_list:
-                    modified_slate_node_separator = SENTENCE_SEPARATOR
-                serialized_list_item = (
-                    serialize_slate_nodes(
-                        node.nodes, modified_slate_node_separator, leaf_separator
+                    continue
+                if kind == _KIND_SKIPPED:
+                    if profiler is not None:
+                        profiler.finish(len(stack), output)
+                    continue
+                if kind == _KIND_SENTENCE_END:
+                    frame[2] = SENTENCE_SEPARATOR
+                elif kind == _NESTED_LIST:
+                    stack.append(
+                        [child_nodes, 0, frame[2], _NESTED_LIST, len(output), False]
                     )
-                    + leaf_separator
-                )
-                result.append(serialized_list_item)
+                    continue
+                else:
+                    if kind == _NESTED_LIST_ITEM:
+                        frame[2] = COMMA_SEPARATOR
+                        if get_is_last_in_list(node) or (
+                            frame[3] == _NESTED_LIST and is_last
+                        ):
+                            frame[2] = SENTENCE_SEPARATOR
+                    else:
+                        frame[2] = SPACE_SEPARATOR
+                    stack.append([child_nodes, 0, frame[2], kind, len(output), False])
+                    continue
+            elif kind == _KIND_RENDERED:
+                start = len(output)
+                text = handler.render(node)
+                if text:
+                    output.append(text)
+                if is_root_level:
+                    self._end_top_level_text(start)
             else:
-                serialized_default_type = serialize_slate_nodes(
-                    node.nodes, SPACE_SEPARATOR, leaf_separator
-                )
-                serialized_default_type = serialized_default_type.strip()
-                if (
-                    modified_slate_node_separator == COMMA_SEPARATOR
-                    and ends_with_punctuation(serialized_default_type)
-                ):
-                    serialized_default_type = (
-                        serialized_default_type[:-1] + modified_slate_node_separator
+                leaves = get_leaves(node)
+                if leaves:
+                    # A paragraph ends with punctuation, which is checked both by
+                    # the paragraph itself and by its parent paragraph.
+                    punctuation_fixes = handler.is_paragraph
+                    punctuation_fixes += frame[5] and is_last
+                    start = len(output)
+                    _write_slate_leaves(
+                        leaves,
+                        self.leaf_separator,
+                        output,
+                        punctuation_fixes,
+                        self.fields,
                     )
-                elif modified_slate_node_separator == NEWLINE:
-                    serialized_default_type += modified_slate_node_separator
-                result.append(serialized_default_type)
-        elif node.leaves:
-            result.append(serialize_slate_leaves(node.leaves, leaf_separator))
+                    if is_root_level:
+                        self._end_top_level_text(start)
+
+            # The node is done, before its parent writes anything after it
+            if profiler is not None:
+                profiler.finish(len(stack), output)
+            if is_root_level:
+                self._ensure_top_level_newline()
+
+        self.node_separator = root_frame[2]
+        if profiler is not None:
+            profiler.flush(output)
+
+    def _finish_nested(
+        self, frame: List[Any], parent_separator: str, is_root_level: bool
+    ) -> None:
+        """Finishes the text of a node once all of its child nodes are written."""
+        output = self.output
+        kind, start = frame[3], frame[4]
+        is_root_level = self.is_root_level and is_root_level
+
+        if kind == _NESTED_LIST:
+            cleaned = clean_up_list("".join(output[start:]))
+            del output[start:]
+            if cleaned:
+                output.append(cleaned)
+            if is_root_level:
+                self._end_top_level_text(start)
+            return
+
+        if kind in (_NESTED_INLINE, _NESTED_LIST_ITEM):
+            if self.leaf_separator:
+                output.append(self.leaf_separator)
+        elif kind == _NESTED_DEFAULT:
+            _strip_output(output, start)
+            if parent_separator == COMMA_SEPARATOR:
+                if len(output) > start and ends_with_punctuation(output[-1]):
+                    output[-1] = output[-1][:-1] + parent_separator
+            elif parent_separator == NEWLINE:
+                output.append(parent_separator)
+
+        if is_root_level:
+            self._end_top_level_text(start)
+            self._ensure_top_level_newline()
+
+    def _end_top_level_text(self, start: int) -> None:
+        """Records whether the top-level text written from start ends with a newline."""
+        output = self.output
+        self._needs_newline = not (len(output) > start and output[-1].endswith(NEWLINE))
+
+    def _ensure_top_level_newline(self) -> None:
+        """Ensure a newline between top-level paragraphs."""
+        if self._needs_newline:
+            self.output.append(NEWLINE)
+            self._needs_newline = False
+
+
+def _strip_output(output: List[str], start: int) -> None:
+    """Strips the text written to output from start, touching only the parts at its edges."""
+    while len(output) > start:
+        part = output[-1].rstrip()
+        if part:
+            output[-1] = part
+            break
+        output.pop()
+
+    end = start
+    while end < len(output):
+        part = output[end].lstrip()
+        if part:
+            output[end] = part
+            break
+        end += 1
+    del output[start:end]
+
+
+def iter_plain_text(
+    source: Union[str, TextIO], chunk_size: int = STREAM_CHUNK_SIZE
+) -> Iterator[str]:
+    """
+    Converts a Slate document JSON into plain-text, one top-level block at a time.
+
+    The source can be a JSON string or a text file object. Only a single
+    top-level node is decoded and converted at once, so memory is bounded by
+    the largest top-level block instead of the whole document. Joining the
+    yielded pieces gives the same text as SlateDocument.parse().to_plain_text().
+    """
+    nodes = _iter_top_level_node_dicts(_JSONStreamReader(source, chunk_size))
+    for text in _iter_plain_text_pieces(nodes, _SLATE_DICT_FIELDS):
+        if text:
+            yield text
+
 
-        # Ensure a newline between top-level paragraphs
-        if is_root_level and result and not result[-1].endswith(NEWLINE):
-            result.append(NEWLINE)
+def iter_plain_text_chunks(
+    source: Union[SlateDocument, str, TextIO],
+    max_chars: int,
+    overlap: int = 0,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> Iterator[str]:
+    """
+    Converts a Slate document into plain-text chunks of at most max_chars
+    characters, breaking between sentences, see SENTENCE_REGEX. Sentences
+    longer than max_chars are broken between words, or anywhere when a
+    single word is longer.
+
+    Chunks are produced while the document is converted, one top-level block
+    at a time, so only the text of the current chunk is kept. The source can
+    be a SlateDocument, or a JSON string or text file object like in
+    iter_plain_text. Every chunk is a part of the to_plain_text of the document.
+
+    :param overlap: maximum number of characters of the previous chunk, as
+    whole sentences, repeated at the start of the next chunk.
+    """
+    if max_chars < 1:
+        raise ValueError("max_chars must be at least 1.")
+    if not 0 <= overlap < max_chars:
+        raise ValueError("overlap must be at least 0 and less than max_chars.")
+
+    if isinstance(source, SlateDocument):
+        pieces = _iter_plain_text_pieces(source.nodes, _SLATE_OBJECT_FIELDS)
+    else:
+        nodes = _iter_top_level_node_dicts(_JSONStreamReader(source, chunk_size))
+        pieces = _iter_plain_text_pieces(nodes, _SLATE_DICT_FIELDS)
+
+    # Units of the current chunk, as (whitespace before, text) pairs
+    units: "deque[Tuple[str, str]]" = deque()
+    size = 0
+    for separator, unit in _iter_sentence_units(pieces, max_chars):
+        if units and size + len(separator) + len(unit) > max_chars:
+            yield units[0][1] + "".join(chain.from_iterable(islice(units, 1, None)))
+            # Keep the last units that fit within overlap, and before the new unit
+            while units and (
+                size > overlap or size + len(separator) + len(unit) > max_chars
+            ):
+                size -= len(units.popleft()[1])
+                if units:
+                    size -= len(units[0][0])
+        size += len(unit) + (len(separator) if units else 0)
+        units.append((separator, unit))
+
+    if units:
+        yield units[0][1] + "".join(chain.from_iterable(islice(units, 1, None)))
+
+
+def _iter_plain_text_pieces(
+    nodes: Iterable[Any], fields: _SlateFields
+) -> Iterator[str]:
+    """
+    Writes top-level nodes one at a time, yielding the normalized text of each,
+    see _PlainTextNormalizer. Joining the pieces gives the to_plain_text.
+    """
+    normalizer = _PlainTextNormalizer()
+    writer = _SlateTextWriter(NEWLINE, SPACE_SEPARATOR, True, fields=fields)
+    for node in nodes:
+        writer.write_nodes((node,))
+        text = normalizer.feed(writer.getvalue())
+        writer.output.clear()
+        yield text
+
+
+def _iter_sentence_units(
+    pieces: Iterable[str], max_chars: int
+) -> Iterator[Tuple[str, str]]:
+    """
+    Yields the sentences of the text made of pieces, as (whitespace before,
+    sentence) pairs, breaking sentences longer than max_chars into units.
+    """
+    sentences = _SentenceSplitter()
+    # Text from the end of the last sentence yielded, at offset start
+    text, start = "", 0
+    for piece in chain(pieces, [None]):
+        if piece is None:
+            spans = sentences.close()
+        else:
+            text += piece
+            spans = sentences.feed(piece)
+        end = 0
+        for sentence_start, sentence_end in spans:
+            separator = text[end : sentence_start - start]
+            sentence = text[sentence_start - start : sentence_end - start]
+            end = sentence_end - start
+            while len(sentence) > max_chars:
+                # Break after the last word that fits, or within the word
+                cut = sentence.rfind(SPACE_SEPARATOR, 1, max_chars + 1)
+                head = sentence[: cut if cut > 0 else max_chars].rstrip()
+                yield separator, head
+                rest = sentence[len(head) :]
+                sentence = rest.lstrip()
+                separator = rest[: len(rest) - len(sentence)]
+            yield separator, sentence
+        if end:
+            text, start = text[end:], start + end
+
+
+class _SentenceSplitter:
+    """
+    Finds the sentences of a text that arrives in pieces, see SENTENCE_REGEX.
+    Every piece must end with a non-whitespace character, like the pieces
+    given by _PlainTextNormalizer.
+    """
+
+    def __init__(self) -> None:
+        # The last sentence, which may continue in the next piece, and its offset
+        self._text = ""
+        self._start = 0
+
+    def feed(self, piece: str) -> List[Tuple[int, int]]:
+        """Returns the offsets of the sentences that end within text fed so far."""
+        text = self._text + piece
+        spans = [match.span() for match in SENTENCE_REGEX.finditer(text)]
+        # The last sentence reaches the end of the piece, so it may continue
+        last_start = spans.pop()[0] if spans else len(text)
+        start = self._start
+        self._text = text[last_start:]
+        self._start += last_start
+        return [
+            (start + span_start, start + span_end) for span_start, span_end in spans
+        ]
 
-    return "".join(result)
+    def close(self) -> List[Tuple[int, int]]:
+        """Returns the offsets of the last sentence, once all pieces are fed."""
+        if not self._text:
+            return []
+        return [(self._start, self._start + len(self._text))]
+
+
+class _PlainTextNormalizer:
+    """
+    Applies the newline collapsing and stripping of to_plain_text on text
+    that arrives in pieces. Trailing whitespace is held back until more text
+    follows it, so it is dropped at the end of the document.
+    """
+
+    def __init__(self) -> None:
+        self._pending = ""
+        self._started = False
+
+    def feed(self, text: str) -> str:
+        """Returns the part of text that can already be emitted."""
+        text = REPEATED_NEWLINES_REGEX.sub(NEWLINE, self._pending + text)
+        if not self._started:
+            text = text.lstrip()
+        emitted = text.rstrip()
+        self._pending = text[len(emitted) :]
+        if emitted:
+            self._started = True
+        return emitted
+
+
+class _JSONStreamReader:
+    """Reads JSON values one at a time from a string or a text file object."""
+
+    def __init__(self, source: Union[str, TextIO], chunk_size: int) -> None:
+        self._decoder = json.JSONDecoder()
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        if isinstance(source, str):
+            self._file = None
+            self._buffer = source
+        else:
+            self._file = source
+
+    def _fill(self) -> bool:
+        """Reads more data into the buffer. Returns False at the end of the source."""
+        if self._file is None:
+            return False
+        # Read at least as much as is buffered, so retries on a large value stay linear
+        unread = len(self._buffer) - self._pos
+        chunk = self._file.read(max(self._chunk_size, unread))
+        if not chunk:
+            self._file = None
+            return False
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Returns the next non-whitespace character, or an empty string at the end."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos].isspace():
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self._fill():
+                return self._buffer[self._pos : self._pos + 1]
+
+    def expect(self, characters: str) -> str:
+        """Consumes the next non-whitespace character, which must be one of characters."""
+        character = self.peek()
+        if not character or character not in characters:
+            raise json.JSONDecodeError(
+                f"Expecting one of {characters!r}", self._buffer, self._pos
+            )
+        self._pos += 1
+        return character
+
+    def expect_end(self) -> None:
+        """Checks that only whitespace is left, like json.loads does."""
+        if self.peek():
+            raise json.JSONDecodeError("Extra data", self._buffer, self._pos)
+
+    def decode(self) -> Any:
+        """Decodes the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the end of the buffer may continue in the next chunk
+            if (
+                end == len(self._buffer)
+                and isinstance(value, (int, float))
+                and self._fill()
+            ):
+                continue
+            self._pos = end
+            return value
+
+
+def _iter_object_keys(reader: _JSONStreamReader) -> Iterator[str]:
+    """Yields the keys of the JSON object under the reader, leaving each value unread."""
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.expect("}")
+        return
+    while True:
+        key = reader.decode()
+        reader.expect(":")
+        yield key
+        if reader.expect(",}") == "}":
+            return
+
+
+def _iter_top_level_node_dicts(reader: _JSONStreamReader) -> Iterator[Dict]:
+    """Yields the top-level node dictionaries of a Slate document JSON."""
+    for key in _iter_object_keys(reader):
+        if key != "document":
+            reader.decode()
+        elif reader.peek() != "{":
+            yield from reader.decode().get("nodes", [])
+        else:
+            for document_key in _iter_object_keys(reader):
+                if document_key != "nodes":
+                    reader.decode()
+                elif reader.peek() != "[":
+                    yield from reader.decode()
+                else:
+                    reader.expect("[")
+                    if reader.peek() == "]":
+                        reader.expect("]")
+                        continue
+                    while True:
+                        yield reader.decode()
+                        if reader.expect(",]") == "]":
+                            break
+    reader.expect_end()
 
 
 def serialize_slate_leaves(leaves: List[SlateLeaf], separator: str) -> str:
@@ -224,51 +1793,81 @@ def serialize_slate_leaves(leaves: List[SlateLeaf], separator: str) -> str:
     - Only next leaf has marks → strip leading space.
     - No marked neighbors → keep text as is.
     """
-    leaf_texts = []
-    for prev_leaf, current_leaf, next_leaf in previous_and_next_item(leaves):
-        if not current_leaf.text:
+    output: List[str] = []
+    profile = _active_profile
+    if profile is None:
+        _write_slate_leaves(leaves, separator, output)
+    else:
+        profiler = _NodeProfiler(profile)
+        profiler.start("text", 1, output)
+        _write_slate_leaves(leaves, separator, output)
+        profiler.flush(output)
+    return "".join(output)
+
+
+def _write_slate_leaves(
+    leaves: List[Any],
+    separator: str,
+    output: List[str],
+    punctuation_fixes: int = 0,
+    fields: _SlateFields = _SLATE_OBJECT_FIELDS,
+) -> None:
+    """
+    Writes serialized Slate leaves into output, see serialize_slate_leaves.
+    The last leaf text goes through _ensure_text_punctuation punctuation_fixes times.
+    """
+    get_text, get_marks = fields[4:]
+    marked = [bool(get_marks(leaf)) for leaf in leaves]
+    last_index = len(leaves) - 1
+    prev_text = None
+    for index, current_leaf in enumerate(leaves):
+        text = get_text(current_leaf)
+        if index == last_index:
+            for _ in range(punctuation_fixes):
+                text = _ensure_text_punctuation(text)
+        if not text:
             continue
 
-        prev_leaf_has_marks = bool(getattr(prev_leaf, "marks", []))
-        current_leaf_has_marks = bool(getattr(current_leaf, "marks", []))
-        next_leaf_has_marks = bool(getattr(next_leaf, "marks", []))
+        prev_leaf_has_marks = index > 0 and marked[index - 1]
+        current_leaf_has_marks = marked[index]
+        next_leaf_has_marks = index < last_index and marked[index + 1]
 
         # Condition 1: If previous and next leaf has marks, or current leaf has marks,
         # then strip whitespaces in front and in the end
         if current_leaf_has_marks or (prev_leaf_has_marks and next_leaf_has_marks):
-            clean_text = current_leaf.text.strip()
+            clean_text = text.strip()
         # Condition 2: If previous leaf has marks, then strip leading whitespace
         elif prev_leaf_has_marks:
-            clean_text = current_leaf.text.lstrip()
+            clean_text = text.lstrip()
         # Condition 3: If next leaf has marks, then strip trailing whitespace
         elif next_leaf_has_marks:
-            clean_text = current_leaf.text.rstrip()
+            clean_text = text.rstrip()
         # Condition 4: If previous and next leaf has no marks, then append text as is
         else:
-            clean_text = current_leaf.text
+            clean_text = text
 
         if not clean_text:
             continue
-        leaf_texts.append(clean_text)
-
-    text = StringIO()
-    for index, part in enumerate(leaf_texts):
-        if index > 0:
-            prev = leaf_texts[index - 1]
+        if prev_text is not None and separator:
             should_insert_separator = not (
-                prev.endswith(NO_SPACE_AFTER) or part.startswith(NO_SPACE_BEFORE)
+                prev_text.endswith(NO_SPACE_AFTER)
+                or clean_text.startswith(NO_SPACE_BEFORE)
             )
             if should_insert_separator:
-                text.write(separator)
-        text.write(part)
-
-    return text.getvalue()
+                output.append(separator)
+        output.append(clean_text)
+        prev_text = clean_text
 
 
 def clean_up_list(text: str) -> str:
-    """Cleans up the serialized list by removing excessive punctuation."""
-    cleaned = MULTIPLE_DOTS_REGEX.sub(SENTENCE_SEPARATOR, text)
-    return DOT_SPACE_REGEX.sub(DOT_SEPARATOR, cleaned)
+    """
+    Cleans up the serialized list by removing excessive punctuation.
+
+    Replacing dots with '. ' and then '.' followed by whitespace with '.',
+    as go-utils does, leaves a single dot for every run of dots, which is
+    done here in a single pass.
+    """
+    return REPEATED_DOTS_REGEX.sub(DOT_SEPARATOR, text)
 
 
 def ends_with_punctuation(text: str) -> bool:
@@ -280,14 +1879,77 @@ def ends_with_punctuation(text: str) -> bool:
 
 def _ensure_leaf_punctuation(slate_leaf: SlateLeaf):
     """Checks if slate leaf text tends with punctuation."""
-    if slate_leaf.text:
-        slate_leaf.text = slate_leaf.text.rstrip()
-        if not ends_with_punctuation(slate_leaf.text):
-            slate_leaf.text += SENTENCE_SEPARATOR
-
+    slate_leaf.text = _ensure_text_punctuation(slate_leaf.text)
     return slate_leaf
 
 
+def _ensure_text_punctuation(text: str) -> str:
+    """Returns text without trailing spaces, ending with punctuation."""
+    if text:
+        text = text.rstrip()
+        if not ends_with_punctuation(text):
+            text += SENTENCE_SEPARATOR
+    return text
+
+
+def _freeze_nodes(nodes: List[SlateNode]) -> FrozenList:
+    """Copies nodes with their children and leaves into FrozenList."""
+    return FrozenList(
+        SlateNode(
+            node.object,
+            node.type,
+            _freeze_nodes(node.nodes) if node.nodes else EMPTY_LIST,
+            (
+                FrozenList(
+                    SlateLeaf(leaf.object, leaf.text, leaf.marks)
+                    for leaf in node.leaves
+                )
+                if node.leaves
+                else EMPTY_LIST
+            ),
+            node.is_last_in_list,
+        )
+        for node in nodes
+    )
+
+
+def _intern_string(value: Any) -> Any:
+    """Returns a shared copy of a string, as node types and objects repeat a lot."""
+    return sys.intern(value) if type(value) is str else value
+
+
+def _intern_marks(marks: Any) -> Any:
+    """
+    Returns a shared, immutable copy of a list of marks.
+    Marks that cannot be hashed, or that come after the interning table is
+    full, are returned as they are.
+    """
+    if not marks:
+        return EMPTY_LIST
+    try:
+        key = _freeze(marks)
+        interned = _interned_marks.get(key)
+    except TypeError:
+        return marks
+    if interned is None:
+        if len(_interned_marks) >= MAX_INTERNED_MARKS:
+            return marks
+        interned = _interned_marks.setdefault(key, FrozenList(marks))
+    return interned
+
+
+def _freeze(value: Any) -> Any:
+    """
+    Converts nested lists and dictionaries into tuples, so they can be hashed.
+    Types are kept in the result, so that e.g. 1 and True do not collide.
+    """
+    if isinstance(value, dict):
+        return dict, tuple((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return list, tuple(_freeze(item) for item in value)
+    return type(value), value
+
+
 def previous_and_next_item(items: Iterable[Any]) -> Iterator[Tuple[Any, Any, Any]]:
     """Yield (previous, current, next) tuples from the given iterable."""
 